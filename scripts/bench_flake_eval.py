@@ -0,0 +1,119 @@
+#!/usr/bin/env -S uv run
+# scripts/bench_flake_eval.py
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "nix-devenv-wrapper",
+#     "httpx>=0.25",
+#     "pydantic>=2.0",
+# ]
+# ///
+"""Compare nix eval time and memory between the standard and fast-eval flake modes."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.generators import generate_flake_nix
+from nix_devenv_wrapper.models import FlakeConfig, FlakeMode
+
+# Files that belong to the flake itself and are regenerated per mode.
+FLAKE_FILES = {"flake.nix", "flake.lock", ".git", "result"}
+
+
+def current_system() -> str:
+    return subprocess.run(
+        ["nix", "eval", "--impure", "--raw", "--expr", "builtins.currentSystem"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def prepare(config: FlakeConfig, source: Path, mode: FlakeMode, workdir: Path) -> Path:
+    """Copy the wrapper into workdir/<mode> with a flake.nix generated in that mode, and lock it."""
+    target = workdir / mode.value
+    shutil.copytree(source, target, ignore=lambda _, names: [name for name in names if name in FLAKE_FILES])
+    (target / "flake.nix").write_text(generate_flake_nix(config.model_copy(update={"flake_mode": mode})))
+    subprocess.run(["nix", "flake", "lock", f"path:{target}"], check=True, capture_output=True)
+    return target
+
+
+def measure(flake: Path, attr: str) -> dict[str, float]:
+    """Evaluate one attribute without the eval cache and return time and memory figures."""
+    with tempfile.NamedTemporaryFile(suffix=".json") as stats_file, tempfile.TemporaryFile() as stderr:
+        env = {**os.environ, "NIX_SHOW_STATS": "1", "NIX_SHOW_STATS_PATH": stats_file.name}
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            ["nix", "eval", "--option", "eval-cache", "false", "--raw", f"path:{flake}#{attr}"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        # wait4 reports the resource usage of this child alone.
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"nix eval failed for {flake}#{attr}:\n{stderr.read().decode()}")
+        stats = json.loads(Path(stats_file.name).read_text() or "{}")
+
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    max_rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return {
+        "wall": wall,
+        "cpu": float(stats.get("cpuTime", 0.0)),
+        "heap": float(stats.get("gc", {}).get("heapSize", 0)),
+        "rss": float(max_rss),
+        "thunks": float(stats.get("nrThunks", 0)),
+    }
+
+
+def summarize(samples: list[dict[str, float]]) -> dict[str, float]:
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-c", "--config", default="wrapper.toml", help="Path to wrapper.toml")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Evaluations per mode (median is reported)")
+    parser.add_argument("--system", help="System to evaluate for (default: current system)")
+    parser.add_argument("--attr", help="Flake attribute to evaluate (default: packages.<system>.default.drvPath)")
+    args = parser.parse_args()
+
+    config_path = Path(args.config)
+    if not config_path.exists():
+        print(f"Error: {config_path} not found", file=sys.stderr)
+        return 1
+    config = load_config(config_path)
+    attr = args.attr or f"packages.{args.system or current_system()}.default.drvPath"
+
+    results: dict[FlakeMode, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory(prefix="ndw-bench-") as tmp:
+        for mode in FlakeMode:
+            flake = prepare(config, config_path.parent, mode, Path(tmp))
+            measure(flake, attr)  # warm the store and fetcher caches
+            results[mode] = summarize([measure(flake, attr) for _ in range(args.runs)])
+
+    print(f"nix eval {attr} (median of {args.runs})")
+    print(f"{'mode':<12}{'wall s':>10}{'cpu s':>10}{'GC heap MiB':>14}{'max RSS MiB':>14}{'thunks':>12}")
+    for mode, result in results.items():
+        print(
+            f"{mode.value:<12}{result['wall']:>10.2f}{result['cpu']:>10.2f}"
+            f"{result['heap'] / 2**20:>14.1f}{result['rss'] / 2**20:>14.1f}{result['thunks']:>12.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
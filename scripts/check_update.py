@@ -14,8 +14,7 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
-from nix_devenv_wrapper.config import load_config
-from nix_devenv_wrapper.updater import Updater
+from nix_devenv_wrapper.cli.client import forward
 
 
 def main() -> int:
@@ -24,6 +23,15 @@ def main() -> int:
         print("Error: wrapper.toml not found", file=sys.stderr)
         return 1
 
+    # A running `ndw serve` answers with warm caches and connections.
+    exit_code = forward(["check"])
+    if exit_code is not None:
+        return exit_code
+
+    # Imported only when running in-process, so forwarding skips pydantic/httpx start-up.
+    from nix_devenv_wrapper.config import load_config
+    from nix_devenv_wrapper.updater import Updater
+
     config = load_config(config_path)
     updater = Updater(config)
     result = updater.check_for_updates()
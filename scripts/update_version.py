@@ -12,23 +12,26 @@
 from __future__ import annotations
 
 import argparse
-import subprocess
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from nix_devenv_wrapper.config import load_config
-from nix_devenv_wrapper.updater import Updater
+from nix_devenv_wrapper.cli.client import forward
 
+if TYPE_CHECKING:
+    from nix_devenv_wrapper.models import BuildResult
+
+
+def verify_build(backup: dict[Path, str | None] | None = None) -> BuildResult:
+    """Run nix build to verify the update works, restoring the backed-up package files on failure."""
+    from nix_devenv_wrapper.fleet import Wrapper
+    from nix_devenv_wrapper.verification import VerificationScheduler
 
-def verify_build() -> bool:
-    """Run nix build to verify the update works."""
     print("\nVerifying build...")
-    result = subprocess.run(
-        ["nix", "build", "--no-link"],
-        capture_output=True,
-        text=True,
-    )
-    return result.returncode == 0
+    wrapper = Wrapper.from_dir(Path("."))
+    snapshots = {wrapper.root: backup} if backup is not None else None
+    scheduler = VerificationScheduler(max_jobs=1, on_output=lambda _, line: print(line))
+    return scheduler.verify([wrapper], snapshots)[0]
 
 
 def main() -> int:
@@ -42,8 +45,20 @@ def main() -> int:
         print("Error: wrapper.toml not found", file=sys.stderr)
         return 1
 
+    # A running `ndw serve` performs the update with warm caches and connections.
+    version_args = ["--version", args.version] if args.version else []
+    exit_code = forward(["update", *version_args, *([] if args.no_verify else ["--verify", "--jobs", "1"])])
+    if exit_code is not None:
+        return exit_code
+
+    # Imported only when running in-process, so forwarding skips pydantic/httpx start-up.
+    from nix_devenv_wrapper.config import load_config
+    from nix_devenv_wrapper.updater import Updater
+    from nix_devenv_wrapper.verification import snapshot_files
+
     config = load_config(config_path)
     updater = Updater(config)
+    backup = snapshot_files(updater.package_file_paths())
 
     target_version = args.version
     if target_version:
@@ -61,11 +76,14 @@ def main() -> int:
     print(f"Hash: {result.new_hash}")
 
     if not args.no_verify:
-        if verify_build():
+        build = verify_build(backup)
+        if build.success:
             print("\n✅ Build successful!")
         else:
             print("\n❌ Build failed. Check the error messages above.", file=sys.stderr)
-            print("You may need to revert changes to package.nix", file=sys.stderr)
+            print(f"Build log: {build.log_path}", file=sys.stderr)
+            if build.rolled_back:
+                print("The package files have been restored to the previous version", file=sys.stderr)
             return 1
 
     print("\nDon't forget to:")
@@ -0,0 +1,261 @@
+"""Shared on-disk store for downloaded release artifacts."""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import httpx
+
+from nix_devenv_wrapper.cache import default_cache_dir
+from nix_devenv_wrapper.hashing import nix_base32
+from nix_devenv_wrapper.transport import Session, borrow
+
+DEFAULT_MAX_BYTES = 10 * 1024**3
+CHUNK_SIZE = 1 << 20
+
+
+def _url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def _write_json_atomic(path: Path, data: dict[str, object]) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as handle:
+        json.dump(data, handle)
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    """Content-addressed artifact cache keyed by URL and sha256 digest.
+
+    Blobs live under ``blobs/<sha256>`` and URL records under ``urls/``.
+    Downloads go to a ``.part`` file that is resumed with HTTP range requests
+    after an interruption, and are moved into place with an atomic rename once
+    complete and verified. A per-URL file lock keeps concurrent processes from
+    downloading the same artifact twice. Least recently used blobs are evicted
+    once the store grows past ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        root: Path | None = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        client: httpx.Client | Session | None = None,
+    ):
+        self.root = root or default_cache_dir("artifacts")
+        self.max_bytes = max_bytes
+        self._client = client
+        for subdir in ("blobs", "urls", "partial"):
+            (self.root / subdir).mkdir(parents=True, exist_ok=True)
+
+    def lookup(self, url: str) -> Path | None:
+        """Return the cached blob for a URL without downloading."""
+        record = self._read_record(url)
+        if record is None:
+            return None
+        blob = self._blob_path(str(record["digest"]))
+        if not blob.exists():
+            return None
+        os.utime(blob)
+        return blob
+
+    def digest(self, url: str) -> str | None:
+        """Return the recorded sha256 hex digest for a cached URL."""
+        record = self._read_record(url)
+        if record is None or not self._blob_path(str(record["digest"])).exists():
+            return None
+        return str(record["digest"])
+
+    def validator(self, url: str) -> str | None:
+        """Return the ETag or Last-Modified value the cached copy of a URL was downloaded with."""
+        record = self._read_record(url)
+        validator = record.get("validator") if record else None
+        return str(validator) if validator else None
+
+    def fetch(
+        self,
+        url: str,
+        expected_digest: str | None = None,
+        timeout: float | None = None,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> Path:
+        """Return a local copy of a URL, downloading or resuming it if needed.
+
+        Args:
+            url: Artifact URL
+            expected_digest: Optional sha256 hex digest the content must match
+            timeout: Overall deadline for the download in seconds
+            cancelled: Polled between chunks; returning True aborts the download
+        """
+        cached = self._cached(url, expected_digest)
+        if cached is not None:
+            return cached
+
+        with self._locked(url):
+            # Another process may have finished the download while we waited.
+            cached = self._cached(url, expected_digest)
+            if cached is not None:
+                return cached
+            digest = self._download(url, timeout, cancelled)
+
+        if expected_digest is not None and digest != expected_digest:
+            raise ValueError(f"Digest mismatch for {url}: expected {expected_digest}, got {digest}")
+        self.evict(keep=digest)
+        return self._blob_path(digest)
+
+    def nix_hash(self, url: str, timeout: float | None = None, cancelled: Callable[[], bool] | None = None) -> str:
+        """Return the nix base32 sha256 of a URL, as nix-prefetch-url would print it.
+
+        The artifact is also added to the Nix store (when available) under the
+        same name fetchurl uses, so builds don't download it again.
+        """
+        path = self.fetch(url, timeout=timeout, cancelled=cancelled)
+        digest = self.digest(url)
+        assert digest is not None
+        self.seed_nix_store(url, path)
+        return nix_base32(bytes.fromhex(digest))
+
+    def seed_nix_store(self, url: str, path: Path | None = None) -> str | None:
+        """Add a cached artifact to the Nix store as a fixed-output path.
+
+        Returns the store path, or None if nix-store is unavailable or fails.
+        """
+        path = path or self.lookup(url)
+        if path is None or shutil.which("nix-store") is None:
+            return None
+        name = unquote(Path(urlparse(url).path).name) or "source"
+        with tempfile.TemporaryDirectory(dir=self.root / "partial") as tmp:
+            named = Path(tmp) / name
+            try:
+                os.link(path, named)
+            except OSError:
+                shutil.copyfile(path, named)
+            result = subprocess.run(
+                ["nix-store", "--add-fixed", "sha256", str(named)],
+                capture_output=True,
+                text=True,
+            )
+        if result.returncode != 0:
+            return None
+        return result.stdout.strip()
+
+    def evict(self, max_bytes: int | None = None, keep: str | None = None) -> int:
+        """Delete least recently used blobs until the store fits; return bytes freed.
+
+        The blob with digest ``keep`` (typically the one just fetched) is never evicted.
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        blobs = [
+            (entry.stat(), entry) for entry in (self.root / "blobs").iterdir() if entry.is_file() and entry.name != keep
+        ]
+        total = self.total_size()
+        freed = 0
+        for stat, entry in sorted(blobs, key=lambda item: item[0].st_mtime):
+            if total - freed <= limit:
+                break
+            entry.unlink(missing_ok=True)
+            freed += stat.st_size
+        return freed
+
+    def total_size(self) -> int:
+        """Return the combined size of all cached blobs in bytes."""
+        return sum(entry.stat().st_size for entry in (self.root / "blobs").iterdir() if entry.is_file())
+
+    def _cached(self, url: str, expected_digest: str | None) -> Path | None:
+        if expected_digest is not None:
+            blob = self._blob_path(expected_digest)
+            if blob.exists():
+                self._write_record(url, expected_digest, blob.stat().st_size)
+                os.utime(blob)
+                return blob
+        cached = self.lookup(url)
+        if cached is not None and (expected_digest is None or cached.name == expected_digest):
+            return cached
+        return None
+
+    def _download(self, url: str, timeout: float | None, cancelled: Callable[[], bool] | None) -> str:
+        key = _url_key(url)
+        part = self.root / "partial" / f"{key}.part"
+        meta_path = self.root / "partial" / f"{key}.json"
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        headers: dict[str, str] = {}
+        offset = part.stat().st_size if part.exists() else 0
+        if offset and meta_path.exists():
+            validator = json.loads(meta_path.read_text()).get("validator")
+            headers["Range"] = f"bytes={offset}-"
+            if validator:
+                headers["If-Range"] = validator
+        else:
+            offset = 0
+
+        client = self._client or borrow(timeout=60.0)
+        with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            if response.status_code == 416 and offset:
+                # The partial file is unusable (e.g. upstream shrank); start over.
+                part.unlink(missing_ok=True)
+                return self._download(url, timeout, cancelled)
+            response.raise_for_status()
+            resumed = offset > 0 and response.status_code == 206
+            validator = response.headers.get("etag") or response.headers.get("last-modified")
+            _write_json_atomic(meta_path, {"url": url, "validator": validator})
+
+            digest = hashlib.sha256()
+            if resumed:
+                with part.open("rb") as existing:
+                    while chunk := existing.read(CHUNK_SIZE):
+                        digest.update(chunk)
+            with part.open("ab" if resumed else "wb") as handle:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if cancelled is not None and cancelled():
+                        raise CancelledError(f"Download of {url} was cancelled")
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise TimeoutError(f"Download of {url} timed out after {timeout} seconds")
+                    handle.write(chunk)
+                    digest.update(chunk)
+
+        hexdigest = digest.hexdigest()
+        os.replace(part, self._blob_path(hexdigest))
+        meta_path.unlink(missing_ok=True)
+        self._write_record(url, hexdigest, self._blob_path(hexdigest).stat().st_size, validator)
+        return hexdigest
+
+    @contextmanager
+    def _locked(self, url: str) -> Iterator[None]:
+        lock_path = self.root / "partial" / f"{_url_key(url)}.lock"
+        with lock_path.open("w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest
+
+    def _read_record(self, url: str) -> dict[str, object] | None:
+        path = self.root / "urls" / f"{_url_key(url)}.json"
+        try:
+            record: dict[str, object] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        return record if record.get("url") == url else None
+
+    def _write_record(self, url: str, digest: str, size: int, validator: str | None = None) -> None:
+        if validator is None:
+            validator = self.validator(url) if self.digest(url) == digest else None
+        _write_json_atomic(
+            self.root / "urls" / f"{_url_key(url)}.json",
+            {"url": url, "digest": digest, "size": size, "validator": validator},
+        )
@@ -0,0 +1,199 @@
+"""Fleet-wide audit of pinned artifact hashes against upstream."""
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from pydantic import BaseModel
+
+from nix_devenv_wrapper.artifacts import CHUNK_SIZE, ArtifactStore
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.hashing import PLACEHOLDER_HASH, file_sha256, nix_base32, parse_sha256, prefetch_url
+from nix_devenv_wrapper.models import PackageRegistry
+from nix_devenv_wrapper.transport import Session, borrow
+from nix_devenv_wrapper.updater import Updater
+
+_WHEEL_PIN_RE = re.compile(r'url\s*=\s*"([^"]+)";\s*sha256\s*=\s*"([^"]+)";')
+
+
+class AuditStatus(str, Enum):
+    """Outcome of auditing one pinned artifact."""
+
+    OK = "ok"
+    MISMATCH = "mismatch"
+    ERROR = "error"
+    SKIPPED = "skipped"
+
+
+class AuditResult(BaseModel):
+    """Pinned and upstream hash of one artifact referenced by a package file."""
+
+    wrapper: str
+    package_file: str
+    status: AuditStatus
+    version: str | None = None
+    url: str | None = None
+    expected: str | None = None
+    actual: str | None = None
+    revalidated: bool = False
+    duration: float = 0.0
+    error: str | None = None
+
+    class Config:
+        frozen = True
+
+
+class HashAuditor:
+    """Re-hash the artifacts pinned in package files and compare them with the pins.
+
+    Artifacts are streamed through sha256 without touching the disk, with at
+    most ``max_workers`` downloads in flight; a URL pinned by several package
+    files is downloaded once. When an artifact store holds a copy that was
+    downloaded with an ETag or Last-Modified validator, a conditional request
+    answered with 304 reuses the cached digest instead of downloading again.
+
+    ``fetchFromGitHub`` pins the NAR hash of the unpacked source tree rather
+    than the hash of the archive, so GitHub sources are hashed with
+    ``nix-prefetch-url --unpack``; without it they are reported as skipped.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        store: ArtifactStore | None = None,
+        timeout: float = 600.0,
+        session: Session | None = None,
+    ):
+        self.max_workers = max_workers
+        self.store = store
+        self.timeout = timeout
+        self._session = session or borrow(timeout=timeout)
+        self._lock = threading.Lock()
+        self._digests: dict[tuple[str, bool], Future[tuple[bytes, bool]]] = {}
+
+    def audit(self, wrappers: Sequence[Wrapper]) -> list[AuditResult]:
+        """Audit every package file of every wrapper; results follow input order."""
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as executor:
+            batches = list(executor.map(self._audit_wrapper, wrappers))
+        return [result for batch in batches for result in batch]
+
+    def _audit_wrapper(self, wrapper: Wrapper) -> list[AuditResult]:
+        try:
+            updater = Updater(load_config(wrapper.config_path), wrapper.package_nix)
+            updaters = [updater, *updater.channel_updaters().values()]
+        except Exception as exc:  # noqa: BLE001 - one bad wrapper must not hide the rest
+            return [self._failed(wrapper, wrapper.package_nix.name, exc)]
+        results = []
+        for package_updater in updaters:
+            if package_updater.package_nix_path.exists():
+                results.extend(self._audit_package(wrapper, package_updater))
+        return results
+
+    def _audit_package(self, wrapper: Wrapper, updater: Updater) -> list[AuditResult]:
+        package_file = updater.package_nix_path.name
+        try:
+            version = updater.get_current_version()
+            if updater.uses_npm_lockfile:
+                # Dependencies are pinned by lockfile integrity hashes, which npm verifies itself.
+                return [
+                    AuditResult(
+                        wrapper=str(wrapper.root),
+                        package_file=package_file,
+                        status=AuditStatus.SKIPPED,
+                        version=version,
+                        error="npm lockfile mode",
+                    )
+                ]
+            if updater.uses_wheels:
+                pins = _WHEEL_PIN_RE.findall(updater.package_nix_path.read_text())
+            else:
+                pins = [(updater.get_version_info(version).tarball_url, updater.get_current_hash())]
+        except Exception as exc:  # noqa: BLE001 - reported per package file
+            return [self._failed(wrapper, package_file, exc)]
+        unpack = updater.config.source.registry == PackageRegistry.GITHUB_RELEASE
+        return [self._audit_pin(wrapper, package_file, version, url, expected, unpack) for url, expected in pins]
+
+    def _audit_pin(
+        self, wrapper: Wrapper, package_file: str, version: str, url: str, expected: str, unpack: bool = False
+    ) -> AuditResult:
+        started = time.monotonic()
+        fields = {
+            "wrapper": str(wrapper.root),
+            "package_file": package_file,
+            "version": version,
+            "url": url,
+            "expected": expected,
+        }
+        if expected == PLACEHOLDER_HASH:
+            return AuditResult(**fields, status=AuditStatus.SKIPPED, error="placeholder hash")
+        try:
+            pinned = parse_sha256(expected)
+            digest, revalidated = self._digest(url, unpack)
+        except Exception as exc:  # noqa: BLE001 - reported per artifact
+            if unpack and isinstance(exc, FileNotFoundError):
+                # Hashing the archive itself would always disagree with a NAR hash pin.
+                return AuditResult(
+                    **fields, status=AuditStatus.SKIPPED, error=f"NAR hash needs nix-prefetch-url --unpack: {exc}"
+                )
+            return AuditResult(
+                **fields, status=AuditStatus.ERROR, duration=time.monotonic() - started, error=str(exc)
+            )
+        return AuditResult(
+            **fields,
+            status=AuditStatus.OK if digest == pinned else AuditStatus.MISMATCH,
+            actual=nix_base32(digest),
+            revalidated=revalidated,
+            duration=time.monotonic() - started,
+        )
+
+    def _digest(self, url: str, unpack: bool = False) -> tuple[bytes, bool]:
+        """Return the sha256 of a URL and whether it came from a revalidated cache entry, once per URL."""
+        with self._lock:
+            future = self._digests.get((url, unpack))
+            owner = future is None
+            if owner:
+                future = self._digests[(url, unpack)] = Future()
+        assert future is not None
+        if owner:
+            try:
+                future.set_result(self._unpacked_digest(url) if unpack else self._stream_digest(url))
+            except Exception as exc:  # noqa: BLE001 - re-raised to every caller below
+                future.set_exception(exc)
+        return future.result()
+
+    def _unpacked_digest(self, url: str) -> tuple[bytes, bool]:
+        sha256, _ = prefetch_url(url, timeout=self.timeout, unpack=True)
+        return parse_sha256(sha256), False
+
+    def _stream_digest(self, url: str) -> tuple[bytes, bool]:
+        if url.startswith("file://"):
+            # Local artifacts are read in full, bypassing the stat-keyed hash cache.
+            return file_sha256(url2pathname(urlsplit(url).path)), False
+        headers: dict[str, str] = {}
+        cached = self.store.digest(url) if self.store is not None else None
+        validator = self.store.validator(url) if self.store is not None and cached else None
+        if validator:
+            is_etag = validator.startswith(('"', "W/"))
+            headers["If-None-Match" if is_etag else "If-Modified-Since"] = validator
+
+        with self._session.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            if response.status_code == 304 and cached:
+                return bytes.fromhex(cached), True
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            for chunk in response.iter_bytes(CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.digest(), False
+
+    def _failed(self, wrapper: Wrapper, package_file: str, exc: Exception) -> AuditResult:
+        return AuditResult(
+            wrapper=str(wrapper.root), package_file=package_file, status=AuditStatus.ERROR, error=str(exc)
+        )
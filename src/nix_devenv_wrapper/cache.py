@@ -0,0 +1,18 @@
+"""Locations of on-disk caches."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def default_cache_dir(*parts: str) -> Path:
+    """Return a directory under the nix-devenv-wrapper cache root.
+
+    The root is ``$NDW_CACHE_DIR``, else ``$XDG_CACHE_HOME/nix-devenv-wrapper``,
+    else ``~/.cache/nix-devenv-wrapper``.
+    """
+    root = os.environ.get("NDW_CACHE_DIR")
+    if root is None:
+        xdg = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+        root = str(Path(xdg) / "nix-devenv-wrapper")
+    return Path(root).joinpath(*parts)
@@ -0,0 +1,92 @@
+"""Thin ``ndw`` entry point that forwards commands to a running ``ndw serve``.
+
+Only the standard library is imported here, so forwarding a command costs
+neither the pydantic/httpx imports nor cold TLS connections. Without a
+reachable server, or with input piped to stdin, the command runs in-process
+as usual.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import stat
+import sys
+from collections.abc import Sequence
+
+from nix_devenv_wrapper import __version__
+from nix_devenv_wrapper.cache import default_cache_dir
+
+# Set to any non-empty value to always run in-process.
+NO_SERVER_ENV = "NDW_NO_SERVER"
+
+
+def socket_path() -> str:
+    """Return the server socket: ``$NDW_SOCKET``, else in ``$XDG_RUNTIME_DIR``, else in the cache directory."""
+    explicit = os.environ.get("NDW_SOCKET")
+    if explicit:
+        return explicit
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "nix-devenv-wrapper.sock")
+    return str(default_cache_dir("server.sock"))
+
+
+def forward(argv: Sequence[str], cwd: str | None = None) -> int | None:
+    """Run a command on the server and relay its output; return its exit code, or None if no server took it."""
+    path = socket_path()
+    if os.environ.get(NO_SERVER_ENV) or not os.path.exists(path) or _stdin_has_input():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+
+    request = {"argv": list(argv), "cwd": cwd or os.getcwd(), "env": dict(os.environ), "version": __version__}
+    started = False
+    with sock, sock.makefile("rb") as replies:
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            for line in replies:
+                message = json.loads(line)
+                if "exit" in message:
+                    return int(message["exit"])
+                if "refused" in message:
+                    # e.g. a server started from another version; nothing has run yet.
+                    return None
+                started = True
+                stream = sys.stderr if "stderr" in message else sys.stdout
+                stream.write(message.get("stderr", message.get("stdout", "")))
+                stream.flush()
+        except (OSError, ValueError):
+            pass
+    if not started:
+        return None
+    print("Error: lost connection to the ndw server", file=sys.stderr)
+    return 1
+
+
+def _stdin_has_input() -> bool:
+    """Whether stdin is a pipe or file, whose contents the server can't read."""
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return False
+    return stat.S_ISFIFO(mode) or stat.S_ISREG(mode)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if "serve" not in argv:
+        exit_code = forward(argv)
+        if exit_code is not None:
+            return exit_code
+    from nix_devenv_wrapper.cli.main import main as run_in_process
+
+    return run_in_process(argv)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
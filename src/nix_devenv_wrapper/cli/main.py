@@ -2,105 +2,699 @@
 from __future__ import annotations
 
 import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tarfile
+import time
+import tomllib
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from nix_devenv_wrapper.config import load_config
-from nix_devenv_wrapper.generators import generate_devenv_nix, generate_flake_nix, generate_package_nix
+import httpx
+
+from nix_devenv_wrapper.artifacts import ArtifactStore
+from nix_devenv_wrapper.audit import AuditStatus, HashAuditor
+from nix_devenv_wrapper.cli.client import socket_path
+from nix_devenv_wrapper.config import add_config_defaults, config_from_data, load_config
+from nix_devenv_wrapper.dryrun import dry_run
+from nix_devenv_wrapper.events import Event, EventHandler, EventType, NdjsonWriter
+from nix_devenv_wrapper.fleet import Wrapper, discover_wrappers
+from nix_devenv_wrapper.generators import generate_aggregate_flake_nix
+from nix_devenv_wrapper.hashing import PrefetchPool
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import EXIT_UPDATE_AVAILABLE, BuildResult, FlakeConfig, UpdateResult
+from nix_devenv_wrapper.pipeline import GENERATE_TARGETS, Pipeline, add_generate_tasks
+from nix_devenv_wrapper.schedule import plan_polls
+from nix_devenv_wrapper.transport import shutdown_transport
 from nix_devenv_wrapper.updater import Updater
+from nix_devenv_wrapper.verification import VerificationScheduler, snapshot_files
+from nix_devenv_wrapper.versions import release_index_cache
 
 
-def _latest_or_pinned_version(updater: Updater) -> str:
-    config_version = updater.config.source.version
-    if config_version:
-        return config_version
-    return updater.get_version_info().version
+# Failures of a single wrapper (bad config, registry errors, timeouts, failed prefetches) that must not stop a fleet.
+WRAPPER_ERRORS = (ValueError, OSError, httpx.HTTPError, subprocess.SubprocessError)
 
 
 def _write_file(path: Path, content: str) -> None:
     path.write_text(content)
 
 
-def cmd_check(args: argparse.Namespace) -> int:
-    """Check if updates are available."""
-    config = load_config(args.config)
-    updater = Updater(config)
-    result = updater.check_for_updates()
+def _wrappers(args: argparse.Namespace) -> list[Wrapper]:
+    """Return the wrappers a command operates on: the --fleet set or the single configured one."""
+    if args.fleet:
+        return discover_wrappers(args.fleet)
+    config_path = Path(args.config)
+    return [
+        Wrapper(
+            root=config_path.parent,
+            config_path=config_path,
+            package_nix=Path(args.package_nix),
+            flake_nix=Path(args.flake_nix),
+            devenv_nix=Path(args.devenv_nix),
+        )
+    ]
+
+
+def _prefix(args: argparse.Namespace, wrapper: Wrapper) -> str:
+    return f"[{wrapper.name}] " if args.fleet else ""
+
+
+def _event_handler(args: argparse.Namespace) -> EventHandler | None:
+    """Return the NDJSON event writer when ``--format ndjson`` is selected."""
+    return NdjsonWriter() if getattr(args, "format", "text") == "ndjson" else None
+
+
+def _report_failure(on_event: EventHandler | None, wrapper: Wrapper, exc: Exception) -> None:
+    """Report a wrapper that failed before any of its package files could be processed."""
+    if on_event is not None:
+        on_event(Event(event=EventType.FAILED, wrapper=str(wrapper.root), error=str(exc)))
+
+
+def _handled_errors(on_event: EventHandler | None) -> type[Exception] | tuple[type[Exception], ...]:
+    """Errors reported per wrapper instead of aborting; with events, every failure was already reported."""
+    return Exception if on_event is not None else WRAPPER_ERRORS
+
+
+def _report_builds(args: argparse.Namespace, wrappers: list[Wrapper], results: list[BuildResult]) -> bool:
+    on_event = _event_handler(args)
+    if on_event is not None:
+        for wrapper, result in zip(wrappers, results):
+            reason = None if result.success else _build_failure(result)
+            on_event(
+                Event(
+                    event=EventType.BUILT if result.success else EventType.FAILED,
+                    wrapper=str(wrapper.root),
+                    paths=[str(result.log_path)] if result.log_path else None,
+                    error=reason,
+                    duration=result.duration,
+                )
+            )
+        return all(result.success for result in results)
+
+    for wrapper, result in zip(wrappers, results):
+        if result.success:
+            print(f"{_prefix(args, wrapper)}Build succeeded ({result.duration:.1f}s)")
+            continue
+        reason = _build_failure(result)
+        print(f"{_prefix(args, wrapper)}Build failed: {reason}, log: {result.log_path}", file=sys.stderr)
+        if result.rolled_back:
+            print(f"{_prefix(args, wrapper)}Rolled back the package files of {wrapper.root}", file=sys.stderr)
+    return all(result.success for result in results)
+
+
+def _build_failure(result: BuildResult) -> str:
+    if result.error:
+        return result.error
+    return "timed out" if result.timed_out else f"exit code {result.returncode}"
+
+
+def _scheduler(args: argparse.Namespace) -> VerificationScheduler:
+    return VerificationScheduler(
+        max_jobs=args.jobs,
+        timeout=args.timeout,
+        log_dir=Path(args.log_dir) if args.log_dir else None,
+    )
+
+
+def _channels(updater: Updater) -> list[tuple[str, Updater]]:
+    """Return (label prefix, updater) for the main package and every generated channel package."""
+    channels = [("", updater)]
+    for channel, channel_updater in updater.channel_updaters().items():
+        if channel_updater.package_nix_path.exists():
+            channels.append((f"{channel}: ", channel_updater))
+    return channels
+
+
+def _due_wrappers(args: argparse.Namespace, wrappers: list[Wrapper], on_event: EventHandler | None) -> list[Wrapper]:
+    """Drop fleet wrappers whose adaptive polling interval hasn't elapsed, reporting each as skipped.
+
+    Single-wrapper runs, ``--all`` and runs without history check everything.
+    A wrapper whose history already holds an update it hasn't applied is
+    always due, so an update run right after a check still applies it.
+    """
+    if not args.fleet or args.all or args.history is None:
+        return wrappers
+    candidates: list[tuple[Wrapper, FlakeConfig]] = []
+    due = []
+    for wrapper in wrappers:
+        try:
+            candidates.append((wrapper, load_config(wrapper.config_path)))
+        except Exception:  # noqa: BLE001 - the command reports the broken config
+            due.append(wrapper)
+    now = time.time()
+    polls = plan_polls([config for _, config in candidates], args.history, budget=args.budget, now=now)
+    for (wrapper, config), poll in zip(candidates, polls):
+        if poll.due(now) or _has_pending_update(args, wrapper, config):
+            due.append(wrapper)
+        elif on_event is not None:
+            on_event(Event(event=EventType.SKIPPED, wrapper=str(wrapper.root), next_check=poll.next_check))
+        else:
+            hours = (poll.next_check - now) / 3600
+            print(f"{_prefix(args, wrapper)}Not due for a check (next in {hours:.1f}h)")
+    return [wrapper for wrapper in wrappers if wrapper in due]
+
+
+def _has_pending_update(args: argparse.Namespace, wrapper: Wrapper, config: FlakeConfig) -> bool:
+    try:
+        updater = Updater(config, wrapper.package_nix, history=args.history)
+        return any(channel.check_for_updates(offline=True).update_available for _, channel in _channels(updater))
+    except (OSError, ValueError):
+        return False
 
-    if result.update_available:
-        print(f"Update available: {result.current_version} -> {result.latest_version}")
-        return 0
 
-    print(f"Already at latest version ({result.current_version})")
-    return 0
+def cmd_check(args: argparse.Namespace) -> int:
+    """Check if updates are available.
+
+    Wrappers are checked concurrently; with ``--format ndjson`` each result
+    is printed as soon as its registry answers. Fleet runs skip wrappers
+    that aren't due according to their release cadence.
+    """
+    on_event = _event_handler(args)
+    wrappers = _wrappers(args) if args.offline else _due_wrappers(args, _wrappers(args), on_event)
+
+    def check(wrapper: Wrapper) -> list[tuple[str, UpdateResult]]:
+        try:
+            config = load_config(wrapper.config_path)
+            updater = Updater(config, wrapper.package_nix, history=args.history, on_event=on_event)
+            channels = _channels(updater)
+        except Exception as exc:
+            _report_failure(on_event, wrapper, exc)
+            raise
+        return [(label, channel_updater.check_for_updates(offline=args.offline)) for label, channel_updater in channels]
+
+    with ThreadPoolExecutor() as executor:
+        futures = [executor.submit(check, wrapper) for wrapper in wrappers]
+
+    exit_code = 0
+    for wrapper, future in zip(wrappers, futures):
+        try:
+            results = future.result()
+        except _handled_errors(on_event) as exc:
+            if on_event is None:
+                print(f"{_prefix(args, wrapper)}Error: {exc}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        for label, result in results:
+            prefix = _prefix(args, wrapper) + label
+            if result.update_available:
+                if on_event is None:
+                    print(f"{prefix}Update available: {result.current_version} -> {result.latest_version}")
+                if args.exit_code and exit_code == 0:
+                    exit_code = EXIT_UPDATE_AVAILABLE
+                continue
+
+            if on_event is None:
+                print(f"{prefix}Already at latest version ({result.current_version})")
+    return exit_code
 
 
 def cmd_update(args: argparse.Namespace) -> int:
     """Update package.nix to the latest or specified version."""
-    config = load_config(args.config)
-    updater = Updater(config)
-    result = updater.update_to_version(args.version)
-
-    if not result.update_available:
-        print(f"Already at version {result.current_version}")
-        return 0
-
-    print(f"Updated: {result.current_version} -> {result.latest_version}")
-    print(f"Hash: {result.new_hash}")
-    return 0
+    # A warm server may hold release indexes from an earlier command; updates list releases afresh.
+    release_index_cache.clear()
+    wrappers = _wrappers(args)
+    if args.dry_run:
+        return _print_dry_run(args, wrappers)
+    on_event = _event_handler(args)
+    if args.version is None:
+        wrappers = _due_wrappers(args, wrappers, on_event)
+    snapshots: dict[Path, dict[Path, str | None]] = {}
+
+    def update(wrapper: Wrapper) -> list[tuple[str, UpdateResult]]:
+        try:
+            config = load_config(wrapper.config_path)
+            updater = Updater(config, wrapper.package_nix, prefetch_pool=pool, history=args.history, on_event=on_event)
+            if args.verify:
+                # Everything the update can write, including lockfiles and channel packages, is restored on failure.
+                channels = _channels(updater)
+                snapshots[wrapper.root] = snapshot_files(
+                    path for _, channel_updater in channels for path in channel_updater.package_file_paths()
+                )
+        except Exception as exc:
+            _report_failure(on_event, wrapper, exc)
+            raise
+        allow_downgrade = args.allow_downgrade or None
+        results = [("", updater.update_to_version(args.version, allow_downgrade, regenerate=args.regenerate))]
+        # An explicit --version targets the main package; channels follow their own spec.
+        if args.version is None:
+            for label, channel_updater in _channels(updater)[1:]:
+                results.append((label, channel_updater.update_to_version(regenerate=args.regenerate)))
+        return results
+
+    # Wrappers resolve concurrently; the shared pool bounds and de-duplicates prefetches.
+    store = ArtifactStore(max_bytes=args.artifact_cache_size * 1024**2) if args.artifact_cache else None
+    with PrefetchPool(max_workers=args.prefetch_jobs, store=store) as pool, ThreadPoolExecutor() as executor:
+        futures = [executor.submit(update, wrapper) for wrapper in wrappers]
+
+    updated: list[Wrapper] = []
+    exit_code = 0
+    for wrapper, future in zip(wrappers, futures):
+        try:
+            results = future.result()
+        except _handled_errors(on_event) as exc:
+            if on_event is None:
+                print(f"{_prefix(args, wrapper)}Error: {exc}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        # With events, each phase was already reported as it finished.
+        for label, result in results if on_event is None else []:
+            prefix = _prefix(args, wrapper) + label
+            if not result.update_available:
+                print(f"{prefix}Already at version {result.current_version}")
+                continue
+
+            print(f"{prefix}Updated: {result.current_version} -> {result.latest_version}")
+            print(f"{prefix}Hash: {result.new_hash}")
+            for warning in result.warnings:
+                print(f"{prefix}Warning: {warning}", file=sys.stderr)
+        if any(result.update_available for _, result in results):
+            updated.append(wrapper)
+
+    if args.verify and updated:
+        results = _scheduler(args).verify(updated, snapshots)
+        if not _report_builds(args, updated, results):
+            exit_code = 1
+    return exit_code
+
+
+def _print_dry_run(args: argparse.Namespace, wrappers: list[Wrapper]) -> int:
+    exit_code = 0
+    results = dry_run(wrappers, args.version, args.allow_downgrade or None, args.regenerate, args.history)
+    for wrapper, result in zip(wrappers, results):
+        prefix = _prefix(args, wrapper)
+        if result.error:
+            print(f"{prefix}Error: {result.error}", file=sys.stderr)
+            exit_code = 1
+            continue
+        if result.current_version != result.target_version:
+            print(f"{prefix}Would update: {result.current_version} -> {result.target_version}")
+        elif not result.changed:
+            print(f"{prefix}No changes ({result.current_version})")
+        for diff in result.diffs:
+            print(diff, end="")
+        for warning in result.warnings:
+            print(f"{prefix}Warning: {warning}", file=sys.stderr)
+    return exit_code
+
+
+def cmd_rollback(args: argparse.Namespace) -> int:
+    """Move back to the previous known release, resolved from the local history."""
+    exit_code = 0
+    for wrapper in _wrappers(args):
+        prefix = _prefix(args, wrapper)
+        try:
+            updater = Updater(load_config(wrapper.config_path), wrapper.package_nix, history=args.history)
+            result = updater.rollback(args.version)
+        except WRAPPER_ERRORS as exc:
+            print(f"{prefix}Error: {exc}", file=sys.stderr)
+            exit_code = 1
+            continue
+        if result.update_available:
+            print(f"{prefix}Rolled back: {result.current_version} -> {result.latest_version}")
+        else:
+            print(f"{prefix}Already at version {result.current_version}")
+    return exit_code
+
+
+def cmd_history(args: argparse.Namespace) -> int:
+    """List known releases from the local history, newest first."""
+    exit_code = 0
+    for wrapper in _wrappers(args):
+        prefix = _prefix(args, wrapper)
+        try:
+            updater = Updater(load_config(wrapper.config_path), wrapper.package_nix, history=args.history)
+            current_version = updater.get_current_version() if wrapper.package_nix.exists() else None
+            index = updater.get_release_index(refresh=True) if args.refresh else updater.get_release_index(offline=True)
+        except WRAPPER_ERRORS as exc:
+            print(f"{prefix}Error: {exc}", file=sys.stderr)
+            exit_code = 1
+            continue
+
+        releases = index.newer_than(current_version) if args.new and current_version else index.releases
+        for release in reversed(releases):
+            marker = "*" if release.version == current_version else " "
+            print(f"{prefix}{marker} {release.version:<20} {release.published_at or '-':<26} {release.sha256 or '-'}")
+    return exit_code
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    """Build wrappers concurrently to verify they still work."""
+    wrappers = _wrappers(args)
+    results = _scheduler(args).verify(wrappers)
+    return 0 if _report_builds(args, wrappers, results) else 1
+
+
+def cmd_audit(args: argparse.Namespace) -> int:
+    """Re-hash the artifacts pinned in every package file and report mismatches."""
+    store = ArtifactStore() if args.artifact_cache else None
+    results = HashAuditor(max_workers=args.jobs, store=store).audit(_wrappers(args))
+
+    if args.json:
+        print(json.dumps([result.model_dump(mode="json") for result in results], indent=2))
+    else:
+        for result in results:
+            name = f"{Path(result.wrapper).name}/{result.package_file}" if args.fleet else result.package_file
+            prefix = f"[{name}] "
+            if result.status == AuditStatus.OK:
+                print(f"{prefix}OK {result.version}")
+            elif result.status == AuditStatus.MISMATCH:
+                print(
+                    f"{prefix}MISMATCH {result.version}: {result.url} "
+                    f"pinned {result.expected}, upstream {result.actual}",
+                    file=sys.stderr,
+                )
+            elif result.status == AuditStatus.SKIPPED:
+                print(f"{prefix}Skipped {result.version}: {result.error}")
+            else:
+                print(f"{prefix}Error: {result.error}", file=sys.stderr)
+
+    failed = any(result.status in (AuditStatus.MISMATCH, AuditStatus.ERROR) for result in results)
+    return 1 if failed else 0
 
 
 def cmd_generate(args: argparse.Namespace) -> int:
-    """Regenerate nix files from config."""
-    config = load_config(args.config)
-    updater = Updater(config)
-
-    version = _latest_or_pinned_version(updater)
-    sha256 = updater.fetch_hash(version)
-
-    targets = args.targets or ["package", "flake", "devenv"]
-
-    if "package" in targets:
-        _write_file(Path(args.package_nix), generate_package_nix(config, version, sha256))
-    if "flake" in targets:
-        _write_file(Path(args.flake_nix), generate_flake_nix(config))
-    if "devenv" in targets and config.devenv_enabled:
-        _write_file(Path(args.devenv_nix), generate_devenv_nix(config))
-
-    print("Generated: " + ", ".join(targets))
+    """Regenerate nix files from config.
+
+    Generation runs as one pipeline across every wrapper: metadata lookups,
+    prefetches and writes of different wrappers overlap, and files that don't
+    need the hash are written while it is computed.
+    """
+    on_event = _event_handler(args)
+    pipeline = Pipeline()
+    planned: list[tuple[Wrapper, list[str], list[str]]] = []
+    exit_code = 0
+    with PrefetchPool(max_workers=args.prefetch_jobs) as pool:
+        for wrapper in _wrappers(args):
+            try:
+                config = load_config(wrapper.config_path)
+                targets = list(args.targets or ["package", "flake", "devenv"])
+                if not args.targets and config.github_actions:
+                    targets.append("workflow")
+                tasks = add_generate_tasks(
+                    pipeline, wrapper, config, targets, prefetch_pool=pool, history=args.history, on_event=on_event
+                )
+            except (OSError, ValueError) as exc:
+                _report_failure(on_event, wrapper, exc)
+                if on_event is None:
+                    print(f"{_prefix(args, wrapper)}Error: {exc}", file=sys.stderr)
+                exit_code = 1
+                continue
+            planned.append((wrapper, targets, tasks))
+        futures = pipeline.run()
+
+    for wrapper, targets, tasks in planned:
+        errors = [futures[task].exception() for task in tasks if futures[task].exception() is not None]
+        if errors:
+            exit_code = 1
+        if on_event is not None:
+            continue
+        if errors:
+            for error in dict.fromkeys(map(str, errors)):
+                print(f"{_prefix(args, wrapper)}Error: {error}", file=sys.stderr)
+            continue
+        print(f"{_prefix(args, wrapper)}Generated: " + ", ".join(targets))
+    return exit_code
+
+
+def _generate_target(value: str) -> str:
+    if value not in GENERATE_TARGETS:
+        raise argparse.ArgumentTypeError(f"invalid choice: {value!r} (choose from {', '.join(GENERATE_TARGETS)})")
+    return value
+
+
+def cmd_aggregate(args: argparse.Namespace) -> int:
+    """Generate one flake.nix exposing every wrapper in the fleet."""
+    if not args.fleet:
+        print("Error: aggregate requires --fleet DIR", file=sys.stderr)
+        return 1
+    output = Path(args.output) if args.output else Path(args.fleet[0]) / "flake.nix"
+    wrappers = _wrappers(args)
+    base = output.parent.resolve()
+    entries = []
+    for wrapper in wrappers:
+        try:
+            config = load_config(wrapper.config_path)
+        except WRAPPER_ERRORS as exc:
+            print(f"{_prefix(args, wrapper)}Error: {exc}", file=sys.stderr)
+            continue
+        entries.append((Path(os.path.relpath(wrapper.root.resolve(), base)).as_posix(), config))
+    # A partial aggregate would silently drop packages from every consumer.
+    if len(entries) < len(wrappers):
+        return 1
+    try:
+        content = generate_aggregate_flake_nix(entries)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    _write_file(output, content)
+    print(f"Generated {output} with {len(entries)} packages")
     return 0
 
 
 def cmd_init(args: argparse.Namespace) -> int:
     """Initialize nix files from config."""
-    return cmd_generate(args)
+    exit_code = 0
+    if args.detect:
+        for wrapper in _wrappers(args):
+            try:
+                _detect_binaries(args, wrapper)
+            except (OSError, ValueError, tarfile.TarError, httpx.HTTPError) as exc:
+                print(f"{_prefix(args, wrapper)}Error: {exc}", file=sys.stderr)
+                exit_code = 1
+    return max(exit_code, cmd_generate(args))
+
+
+def _detect_binaries(args: argparse.Namespace, wrapper: Wrapper) -> None:
+    """Fill in a missing binary_name/entry_point from the release archive, and check configured ones."""
+    prefix = _prefix(args, wrapper)
+    data = tomllib.loads(wrapper.config_path.read_text())
+    configured = data.get("wrapper", {})
+    missing = [key for key in ("binary_name", "entry_point") if key not in configured]
+    # Placeholders let the rest of the config resolve the release; they are never written.
+    placeholders = {"binary_name": data.get("flake_name", ""), "entry_point": ""}
+    config = config_from_data({**data, "wrapper": {**placeholders, **configured}}, wrapper.config_path.parent)
+    updater = Updater(config, wrapper.package_nix, history=args.history)
+    version = updater.resolve_version()
+    if not missing:
+        for warning in updater.check_binaries(version):
+            print(f"{prefix}Warning: {warning}", file=sys.stderr)
+        return
+
+    detected = updater.inspect_binaries(version)
+    chosen = detected.default(configured.get("binary_name", config.flake_name))
+    if chosen is None:
+        raise ValueError(f"No binaries found in {config.source.name} {version}; set binary_name and entry_point")
+    defaults = {key: value for key, value in zip(("binary_name", "entry_point"), chosen) if key in missing}
+    add_config_defaults(wrapper.config_path, "wrapper", defaults)
+    if args.format == "text":
+        found = ", ".join(f"{key} = {value!r}" for key, value in defaults.items())
+        print(f"{prefix}Detected from {detected.source} of {version}: {found}")
+
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Run the background server that answers ndw commands over a Unix socket."""
+    from nix_devenv_wrapper.server import WarmServer
+
+    path = args.socket or socket_path()
+    try:
+        server = WarmServer(path, idle_timeout=args.idle_timeout or None)
+    except (OSError, RuntimeError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Serving on {path}", flush=True)
+    # Stop cleanly (removing the socket) on SIGTERM as on Ctrl-C.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+    return 0
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="nix-devenv-wrapper CLI")
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ndw", description="nix-devenv-wrapper CLI")
     parser.add_argument("-c", "--config", default="wrapper.toml", help="Path to wrapper.toml")
     parser.add_argument("--package-nix", default="package.nix", help="Path to package.nix")
     parser.add_argument("--flake-nix", default="flake.nix", help="Path to flake.nix")
     parser.add_argument("--devenv-nix", default="devenv.nix", help="Path to devenv.nix")
+    parser.add_argument(
+        "--fleet",
+        action="append",
+        metavar="DIR",
+        help="Operate on every wrapper in DIR (a wrapper directory or a parent of several); repeatable",
+    )
+
+    parser.add_argument(
+        "--no-history", action="store_true", help="Do not read or update the local release history"
+    )
+
+    format_options = argparse.ArgumentParser(add_help=False)
+    format_options.add_argument(
+        "--format",
+        choices=["text", "ndjson"],
+        default="text",
+        help="Output format; ndjson prints one event per wrapper and phase as soon as it happens",
+    )
+
+    build_options = argparse.ArgumentParser(add_help=False)
+    build_options.add_argument("-j", "--jobs", type=int, help="Concurrent builds (default: fit CPUs and memory)")
+    build_options.add_argument("--timeout", type=float, default=3600.0, help="Per-build timeout in seconds")
+    build_options.add_argument("--log-dir", help="Directory for build logs")
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    check_parser = subparsers.add_parser("check", help="Check for updates")
-    check_parser.set_defaults(func=cmd_check)
-
-    update_parser = subparsers.add_parser("update", help="Update to latest or specific version")
-    update_parser.add_argument("-v", "--version", help="Version to update to")
-    update_parser.set_defaults(func=cmd_update)
-
-    init_parser = subparsers.add_parser("init", help="Initialize nix files from config")
-    init_parser.add_argument("targets", nargs="*", choices=["package", "flake", "devenv"])
-    init_parser.set_defaults(func=cmd_init)
-
-    generate_parser = subparsers.add_parser("generate", help="Generate nix files from config")
-    generate_parser.add_argument("targets", nargs="*", choices=["package", "flake", "devenv"])
-    generate_parser.set_defaults(func=cmd_generate)
-
-    args = parser.parse_args()
-    return args.func(args)
+    schedule_options = argparse.ArgumentParser(add_help=False)
+    schedule_options.add_argument(
+        "--all", action="store_true", help="With --fleet, check every wrapper, not only those due for a check"
+    )
+    schedule_options.add_argument(
+        "--budget",
+        type=float,
+        help="With --fleet, registry checks per hour for the whole fleet; polling intervals stretch to fit",
+    )
+
+    check_parser = subparsers.add_parser(
+        "check", parents=[format_options, schedule_options], help="Check for updates"
+    )
+    check_parser.add_argument(
+        "--exit-code",
+        action="store_true",
+        help=f"Exit with status {EXIT_UPDATE_AVAILABLE} when an update is available (for CI)",
+    )
+    check_parser.add_argument(
+        "--offline", action="store_true", help="Answer from the local release history without network access"
+    )
+    check_parser.set_defaults(func=cmd_check, uses_history=True)
+
+    update_parser = subparsers.add_parser(
+        "update",
+        parents=[build_options, format_options, schedule_options],
+        help="Update to latest or specific version",
+    )
+    update_parser.add_argument("-v", "--version", help="Version or version constraint to update to")
+    update_parser.add_argument("--allow-downgrade", action="store_true", help="Allow moving to an older version")
+    update_parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="Render package.nix anew from wrapper.toml instead of updating it in place (drops hand edits)",
+    )
+    update_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Resolve versions from metadata only and print diffs of the nix files that would change",
+    )
+    update_parser.add_argument(
+        "--verify", action="store_true", help="Build updated wrappers and roll back their package files on failure"
+    )
+    update_parser.add_argument(
+        "--prefetch-jobs", type=int, default=4, help="Maximum concurrent nix-prefetch-url processes"
+    )
+    update_parser.add_argument(
+        "--artifact-cache",
+        action="store_true",
+        help="Download through the shared, resumable artifact cache instead of nix-prefetch-url",
+    )
+    update_parser.add_argument(
+        "--artifact-cache-size", type=int, default=10240, help="Artifact cache size limit in MiB"
+    )
+    update_parser.set_defaults(func=cmd_update, uses_history=True)
+
+    rollback_parser = subparsers.add_parser("rollback", help="Move back to the previous known release")
+    rollback_parser.add_argument("-v", "--version", help="Exact version to roll back to")
+    rollback_parser.set_defaults(func=cmd_rollback, uses_history=True)
+
+    history_parser = subparsers.add_parser("history", help="List known releases from the local history")
+    history_parser.add_argument("--new", action="store_true", help="Only releases newer than the current version")
+    history_parser.add_argument("--refresh", action="store_true", help="Fetch the version list before listing")
+    history_parser.set_defaults(func=cmd_history, uses_history=True)
+
+    verify_parser = subparsers.add_parser("verify", parents=[build_options], help="Verify wrappers build")
+    verify_parser.set_defaults(func=cmd_verify)
+
+    audit_parser = subparsers.add_parser(
+        "audit", help="Check that pinned hashes still match the upstream artifacts"
+    )
+    audit_parser.add_argument("-j", "--jobs", type=int, default=16, help="Maximum concurrent downloads")
+    audit_parser.add_argument("--json", action="store_true", help="Print results as a JSON array")
+    audit_parser.add_argument(
+        "--artifact-cache",
+        action="store_true",
+        help="Reuse cached artifacts that upstream confirms unchanged (conditional requests)",
+    )
+    audit_parser.set_defaults(func=cmd_audit)
+
+    aggregate_parser = subparsers.add_parser(
+        "aggregate", help="Generate one flake.nix exposing every --fleet wrapper"
+    )
+    aggregate_parser.add_argument("-o", "--output", help="Output path (default: flake.nix in the first --fleet DIR)")
+    aggregate_parser.set_defaults(func=cmd_aggregate)
+
+    generate_options = argparse.ArgumentParser(add_help=False, parents=[format_options])
+    # Validated by type rather than choices: argparse checks an empty "*" list against choices.
+    generate_options.add_argument(
+        "targets", nargs="*", type=_generate_target, metavar="{" + ",".join(GENERATE_TARGETS) + "}"
+    )
+    generate_options.add_argument(
+        "--prefetch-jobs", type=int, default=4, help="Maximum concurrent nix-prefetch-url processes"
+    )
+
+    init_parser = subparsers.add_parser("init", parents=[generate_options], help="Initialize nix files from config")
+    init_parser.add_argument(
+        "--detect",
+        action="store_true",
+        help="Fill in a missing wrapper binary_name/entry_point from the release archive and check configured ones",
+    )
+    init_parser.set_defaults(func=cmd_init, uses_history=True)
+
+    generate_parser = subparsers.add_parser(
+        "generate", parents=[generate_options], help="Generate nix files from config"
+    )
+    generate_parser.set_defaults(func=cmd_generate, uses_history=True)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="Keep configs, connections and caches warm and answer ndw commands over a Unix socket"
+    )
+    serve_parser.add_argument("--socket", help="Socket path (default: $NDW_SOCKET, else in $XDG_RUNTIME_DIR)")
+    serve_parser.add_argument(
+        "--idle-timeout", type=float, default=3600.0, help="Exit after this many idle seconds (0: never)"
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def run(argv: Sequence[str] | None = None, history: ReleaseHistory | None = None) -> int:
+    """Parse and run one command.
+
+    Commands that consult the release history get ``history``, one owned by
+    the caller (the server keeps one open); otherwise one is opened and closed
+    around the command.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "dry_run", False) and args.format == "ndjson":
+        parser.error("--dry-run prints diffs and does not support --format ndjson")
+    wants_history = getattr(args, "uses_history", False) and not args.no_history
+    owned = ReleaseHistory() if wants_history and history is None else None
+    args.history = (history or owned) if wants_history else None
+    try:
+        return args.func(args)
+    finally:
+        if owned is not None:
+            owned.close()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    try:
+        return run(argv)
+    finally:
+        shutdown_transport()
 
 
 if __name__ == "__main__":
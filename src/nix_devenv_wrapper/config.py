@@ -1,6 +1,9 @@
 """TOML configuration loading and saving."""
 from __future__ import annotations
 
+import os
+import re
+import threading
 from pathlib import Path
 from typing import Any
 
@@ -9,14 +12,21 @@ import tomllib
 from nix_devenv_wrapper.models import (
     CachixConfig,
     FlakeConfig,
+    FlakeMode,
     GitHubActionsConfig,
     PackageMeta,
+    PackageRegistry,
     PackageSource,
+    PollingConfig,
     RuntimeConfig,
     WrapperConfig,
 )
 
 
+_configs: dict[Path, tuple[tuple[int, int], FlakeConfig]] = {}
+_configs_lock = threading.Lock()
+
+
 def _load_toml(path: Path) -> dict[str, Any]:
     data = tomllib.loads(path.read_text())
     if not isinstance(data, dict):
@@ -25,11 +35,38 @@ def _load_toml(path: Path) -> dict[str, Any]:
 
 
 def load_config(path: str | Path) -> FlakeConfig:
-    """Load wrapper.toml and return a FlakeConfig."""
+    """Load wrapper.toml and return a FlakeConfig.
+
+    Parsed configs are kept for the life of the process and reused while the
+    file's mtime and size are unchanged, so a long-running server parses each
+    wrapper.toml once.
+    """
     config_path = Path(path)
-    data = _load_toml(config_path)
+    stat = config_path.stat()
+    key, stamp = config_path.resolve(), (stat.st_mtime_ns, stat.st_size)
+    with _configs_lock:
+        cached = _configs.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    config = _parse_config(config_path)
+    with _configs_lock:
+        _configs[key] = (stamp, config)
+    return config
+
+
+def _parse_config(config_path: Path) -> FlakeConfig:
+    return config_from_data(_load_toml(config_path), config_path.parent)
+
+
+def config_from_data(data: dict[str, Any], base_dir: Path | None = None) -> FlakeConfig:
+    """Build a FlakeConfig from parsed wrapper.toml data.
 
+    A relative local artifact path is taken relative to ``base_dir``, the
+    directory of the wrapper.toml, rather than the working directory.
+    """
     source = PackageSource(**data["source"])
+    if source.registry == PackageRegistry.LOCAL and base_dir is not None and not os.path.isabs(source.name):
+        source = source.model_copy(update={"name": os.path.join(os.path.abspath(base_dir), source.name)})
     runtime = RuntimeConfig(**data["runtime"])
     wrapper = WrapperConfig(**data["wrapper"])
     meta = PackageMeta(**data["meta"])
@@ -49,8 +86,11 @@ def load_config(path: str | Path) -> FlakeConfig:
         meta=meta,
         cachix=cachix,
         github_actions=github_actions,
+        polling=PollingConfig(**data.get("polling", {})),
         flake_name=data["flake_name"],
         devenv_enabled=data.get("devenv_enabled", True),
+        flake_mode=data.get("flake_mode", FlakeMode.STANDARD),
+        mirrors=data.get("mirrors", {}),
     )
 
 
@@ -61,30 +101,61 @@ def save_config(config: FlakeConfig, path: str | Path) -> None:
     data: dict[str, Any] = {
         "flake_name": config.flake_name,
         "devenv_enabled": config.devenv_enabled,
-        "source": config.source.model_dump(),
-        "runtime": config.runtime.model_dump(by_alias=True),
-        "wrapper": config.wrapper.model_dump(),
-        "meta": config.meta.model_dump(),
+        "flake_mode": config.flake_mode.value,
+        "source": config.source.model_dump(mode="json"),
+        "runtime": config.runtime.model_dump(mode="json", by_alias=True),
+        "wrapper": config.wrapper.model_dump(mode="json"),
+        "meta": config.meta.model_dump(mode="json"),
     }
 
     if config.cachix:
-        data["cachix"] = config.cachix.model_dump()
+        data["cachix"] = config.cachix.model_dump(mode="json")
     if config.github_actions:
-        data["github_actions"] = config.github_actions.model_dump()
+        data["github_actions"] = config.github_actions.model_dump(mode="json")
+    if config.polling != PollingConfig():
+        data["polling"] = config.polling.model_dump(mode="json")
+    if config.mirrors:
+        data["mirrors"] = config.mirrors
 
     lines: list[str] = []
     for key, value in data.items():
         if isinstance(value, dict):
             lines.append(f"[{key}]")
             for subkey, subvalue in value.items():
-                lines.append(_format_toml_entry(subkey, subvalue))
+                # TOML has no null; unset optional fields are left out.
+                if subvalue is not None:
+                    lines.append(_format_toml_entry(subkey, subvalue))
             lines.append("")
         else:
             lines.append(_format_toml_entry(key, value))
     config_path.write_text("\n".join(lines).rstrip() + "\n")
 
 
+def add_config_defaults(path: str | Path, table: str, values: dict[str, Any]) -> None:
+    """Add keys to a table of wrapper.toml in place, keeping the file's comments and layout.
+
+    Keys go right below the table header, or into a new table at the end of
+    the file if there is none.
+    """
+    config_path = Path(path)
+    lines = config_path.read_text().splitlines()
+    entries = [_format_toml_entry(key, value) for key, value in values.items()]
+    header = re.compile(rf"\s*\[\s*{re.escape(table)}\s*\]\s*(#.*)?")
+    for index, line in enumerate(lines):
+        if header.fullmatch(line):
+            lines[index + 1:index + 1] = entries
+            break
+    else:
+        lines += ["", f"[{table}]", *entries]
+    config_path.write_text("\n".join(lines) + "\n")
+
+
+def _format_toml_key(key: str) -> str:
+    return key if re.fullmatch(r"[A-Za-z0-9_-]+", key) else f"\"{key}\""
+
+
 def _format_toml_entry(key: str, value: Any) -> str:
+    key = _format_toml_key(key)
     if isinstance(value, str):
         return f"{key} = \"{value}\""
     if isinstance(value, bool):
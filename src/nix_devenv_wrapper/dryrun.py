@@ -0,0 +1,108 @@
+"""Metadata-only previews of what an update would change."""
+from __future__ import annotations
+
+import difflib
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.hashing import PLACEHOLDER_HASH
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.updater import Updater
+
+
+class DryRunResult(BaseModel):
+    """Candidate changes for one wrapper."""
+
+    wrapper: str
+    current_version: str | None
+    target_version: str | None
+    diffs: list[str] = []
+    warnings: list[str] = []
+    error: str | None = None
+
+    class Config:
+        frozen = True
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.diffs)
+
+
+def _diff(path: Path, candidate: str) -> str:
+    current = path.read_text() if path.exists() else ""
+    return "".join(
+        difflib.unified_diff(
+            current.splitlines(keepends=True),
+            candidate.splitlines(keepends=True),
+            fromfile=f"a/{path}",
+            tofile=f"b/{path}",
+        )
+    )
+
+
+def dry_run_wrapper(
+    wrapper: Wrapper,
+    version: str | None = None,
+    allow_downgrade: bool | None = None,
+    regenerate: bool = False,
+    history: ReleaseHistory | None = None,
+) -> DryRunResult:
+    """Resolve the update target from metadata and diff the files an update would write against disk.
+
+    Arguments mean what they do for ``Updater.update_to_version``; without an
+    explicit version, channel packages are previewed too. No artifact is
+    downloaded for hashing: changed package files show a placeholder hash
+    unless the registry publishes it. (Crates are streamed up to the
+    Cargo.lock they ship.)
+    """
+    updater = Updater(load_config(wrapper.config_path), wrapper.package_nix, history=history)
+    updaters = [updater]
+    if version is None:
+        updaters += [channel for channel in updater.channel_updaters().values() if channel.package_nix_path.exists()]
+
+    current_version = target_version = None
+    diffs: list[str] = []
+    warnings: list[str] = []
+    for position, package_updater in enumerate(updaters):
+        current, target, unchanged = package_updater.plan_update(version, allow_downgrade)
+        if position == 0:
+            current_version, target_version = current, target
+        if unchanged:
+            continue
+        sha256 = package_updater.published_hash(target) if package_updater.pins_from_metadata else PLACEHOLDER_HASH
+        files, file_warnings = package_updater.package_file_edits(target, sha256, regenerate)
+        diffs += [diff for path, content in files.items() if (diff := _diff(path, content))]
+        warnings += file_warnings
+
+    return DryRunResult(
+        wrapper=str(wrapper.root),
+        current_version=current_version,
+        target_version=target_version,
+        diffs=diffs,
+        warnings=warnings,
+    )
+
+
+def dry_run(
+    wrappers: Sequence[Wrapper],
+    version: str | None = None,
+    allow_downgrade: bool | None = None,
+    regenerate: bool = False,
+    history: ReleaseHistory | None = None,
+    max_workers: int = 32,
+) -> list[DryRunResult]:
+    """Dry-run many wrappers concurrently, returning results in input order."""
+
+    def run(wrapper: Wrapper) -> DryRunResult:
+        try:
+            return dry_run_wrapper(wrapper, version, allow_downgrade, regenerate, history)
+        except Exception as exc:  # noqa: BLE001 - one bad wrapper must not hide the rest
+            return DryRunResult(wrapper=str(wrapper.root), current_version=None, target_version=None, error=str(exc))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(wrappers)))) as executor:
+        return list(executor.map(run, wrappers))
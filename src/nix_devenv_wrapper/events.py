@@ -0,0 +1,63 @@
+"""Structured progress events for machine-readable (NDJSON) CLI output."""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections.abc import Callable
+from enum import Enum
+from typing import TextIO
+
+from pydantic import BaseModel, Field
+
+
+class EventType(str, Enum):
+    """Phase a wrapper's package file has just completed (or, for skipped, a wrapper not due for a check)."""
+
+    RESOLVED = "resolved"
+    HASHED = "hashed"
+    WRITTEN = "written"
+    BUILT = "built"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class Event(BaseModel):
+    """One finished phase of one package file (or, for flake/devenv/workflow files, one wrapper)."""
+
+    event: EventType
+    wrapper: str
+    package_file: str | None = None
+    version: str | None = None
+    current_version: str | None = None
+    update_available: bool | None = None
+    sha256: str | None = None
+    paths: list[str] | None = None
+    warnings: list[str] | None = None
+    error: str | None = None
+    next_check: float | None = Field(None, description="Unix time a skipped wrapper is next due for a check")
+    duration: float = Field(0.0, description="Seconds spent in this phase")
+    timestamp: float = Field(default_factory=time.time, description="Unix time the phase finished")
+
+    class Config:
+        frozen = True
+
+
+EventHandler = Callable[[Event], None]
+
+
+class NdjsonWriter:
+    """Event handler writing one JSON object per line, flushed as soon as it is emitted.
+
+    Safe to call from several threads; lines are never interleaved.
+    """
+
+    def __init__(self, stream: TextIO | None = None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        line = event.model_dump_json(exclude_none=True)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
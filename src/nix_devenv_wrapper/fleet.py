@@ -0,0 +1,60 @@
+"""Discovery of wrapper directories for fleet-wide operations."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from pydantic import BaseModel
+
+CONFIG_FILENAME = "wrapper.toml"
+
+
+class Wrapper(BaseModel):
+    """Paths making up a single wrapper repository."""
+
+    root: Path
+    config_path: Path
+    package_nix: Path
+    flake_nix: Path
+    devenv_nix: Path
+
+    class Config:
+        frozen = True
+
+    @classmethod
+    def from_dir(cls, root: str | Path) -> Wrapper:
+        """Return the wrapper rooted at a directory using default file names."""
+        root = Path(root)
+        return cls(
+            root=root,
+            config_path=root / CONFIG_FILENAME,
+            package_nix=root / "package.nix",
+            flake_nix=root / "flake.nix",
+            devenv_nix=root / "devenv.nix",
+        )
+
+    @property
+    def name(self) -> str:
+        """Human-readable name for logs and reports."""
+        return self.root.resolve().name
+
+
+def discover_wrappers(paths: Iterable[str | Path]) -> list[Wrapper]:
+    """Find wrappers in the given paths.
+
+    Each path is either a wrapper directory itself (it contains wrapper.toml) or
+    a parent whose immediate subdirectories are scanned for wrappers.
+    """
+    wrappers: list[Wrapper] = []
+    seen: set[Path] = set()
+    for path in map(Path, paths):
+        if (path / CONFIG_FILENAME).is_file():
+            candidates = [path]
+        else:
+            candidates = sorted(child for child in path.iterdir() if (child / CONFIG_FILENAME).is_file())
+        for candidate in candidates:
+            resolved = candidate.resolve()
+            if resolved not in seen:
+                seen.add(resolved)
+                wrappers.append(Wrapper.from_dir(candidate))
+    return wrappers
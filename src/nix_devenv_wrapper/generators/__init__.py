@@ -1,8 +1,20 @@
 """Nix file generators."""
 from __future__ import annotations
 
+from nix_devenv_wrapper.generators.aggregate_flake import generate_aggregate_flake_nix
 from nix_devenv_wrapper.generators.devenv import generate_devenv_nix
 from nix_devenv_wrapper.generators.flake_nix import generate_flake_nix
-from nix_devenv_wrapper.generators.package_nix import generate_package_nix
+from nix_devenv_wrapper.generators.npm_lock import generate_npm_lockfile, generate_npm_package_json
+from nix_devenv_wrapper.generators.package_nix import generate_package_nix, splice_python_sections
+from nix_devenv_wrapper.generators.workflow import generate_update_workflow
 
-__all__ = ["generate_devenv_nix", "generate_flake_nix", "generate_package_nix"]
+__all__ = [
+    "generate_aggregate_flake_nix",
+    "generate_devenv_nix",
+    "generate_flake_nix",
+    "generate_npm_lockfile",
+    "generate_npm_package_json",
+    "generate_package_nix",
+    "generate_update_workflow",
+    "splice_python_sections",
+]
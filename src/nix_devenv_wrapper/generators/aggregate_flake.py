@@ -0,0 +1,100 @@
+"""Generator for a single flake.nix exposing many wrappers."""
+from __future__ import annotations
+
+from collections.abc import Sequence
+from pathlib import PurePosixPath
+from textwrap import dedent
+
+from nix_devenv_wrapper.models import FlakeConfig
+
+
+def generate_aggregate_flake_nix(
+    wrappers: Sequence[tuple[str, FlakeConfig]],
+    description: str = "Nix wrapper packages",
+) -> str:
+    """Generate one flake.nix that combines many wrappers.
+
+    ``wrappers`` pairs each wrapper's directory, relative to the aggregate
+    flake, with its config. nixpkgs is imported once per system with a single
+    overlay holding every package, so consumers evaluate nixpkgs once instead
+    of once per wrapper flake. Release channels of a wrapper are exposed as
+    ``<flake_name>-<channel>`` like in the wrapper's own flake.
+    """
+    packages = [
+        (directory, package)
+        for directory, config in wrappers
+        for package in [config, *(config.for_channel(channel) for channel in config.source.channels)]
+    ]
+    names: dict[str, str] = {}
+    for directory, config in packages:
+        if config.flake_name in names:
+            raise ValueError(
+                f"Duplicate flake_name {config.flake_name!r} in {names[config.flake_name]} and {directory}"
+            )
+        if PurePosixPath(directory).is_absolute() or ".." in PurePosixPath(directory).parts:
+            raise ValueError(f"Wrapper directory must be inside the aggregate flake: {directory}")
+        names[config.flake_name] = directory
+
+    overlay_entries = "\n".join(
+        f"                {config.flake_name} = final.callPackage "
+        f"./{PurePosixPath(directory) / config.package_file} {{ }};"
+        for directory, config in packages
+    )
+    package_entries = "\n".join(
+        f"                  {config.flake_name} = pkgs.{config.flake_name};" for _, config in packages
+    )
+    app_entries = "\n".join(
+        f"""                  {config.flake_name} = {{
+                    type = "app";
+                    program = "${{pkgs.{config.flake_name}}}/bin/{config.wrapper.binary_name}";
+                  }};"""
+        for _, config in packages
+    )
+    per_package_overlays = "\n".join(
+        f"                  {config.flake_name} = final: prev: {{ inherit (overlay final prev) {config.flake_name}; }};"
+        for _, config in packages
+    )
+
+    return dedent(
+        f"""\
+        # flake.nix - auto-generated by nix-devenv-wrapper (aggregate of {len(wrappers)} wrappers)
+        {{
+          description = "{description}";
+
+          inputs = {{
+            nixpkgs.url = "github:NixOS/nixpkgs/nixpkgs-unstable";
+            flake-utils.url = "github:numtide/flake-utils";
+          }};
+
+          outputs = {{ self, nixpkgs, flake-utils }}:
+            let
+              overlay = final: prev: {{
+{overlay_entries}
+              }};
+            in
+            flake-utils.lib.eachDefaultSystem (system:
+              let
+                # One nixpkgs instance per system, shared by every wrapper.
+                pkgs = import nixpkgs {{
+                  inherit system;
+                  config.allowUnfree = true;
+                  overlays = [ overlay ];
+                }};
+              in
+              {{
+                packages = {{
+{package_entries}
+                }};
+
+                apps = {{
+{app_entries}
+                }};
+              }}) // {{
+                overlays = {{
+                  default = overlay;
+{per_package_overlays}
+                }};
+              }};
+        }}
+        """
+    )
@@ -3,22 +3,55 @@ from __future__ import annotations
 
 from textwrap import dedent
 
-from nix_devenv_wrapper.models import FlakeConfig
+from nix_devenv_wrapper.models import FlakeConfig, FlakeMode
+
+# Systems exposed by fast-eval flakes (the same set as flake-utils' defaults).
+FLAKE_SYSTEMS = ["x86_64-linux", "aarch64-linux", "x86_64-darwin", "aarch64-darwin"]
+
+
+def _package_outputs(config: FlakeConfig) -> list[tuple[str, str]]:
+    """Return (attribute name, package file) for the main package and each channel."""
+    outputs = [(config.flake_name, config.package_file)]
+    for channel in config.source.channels:
+        channel_config = config.for_channel(channel)
+        outputs.append((channel_config.flake_name, channel_config.package_file))
+    return outputs
 
 
 def generate_flake_nix(config: FlakeConfig) -> str:
-    """Generate a flake.nix file based on the configuration."""
+    """Generate a flake.nix file based on the configuration.
+
+    Each of ``source.channels`` gets its own package, app and overlay
+    attribute (``<flake_name>-<channel>``) next to the main package.
+    """
+    if config.flake_mode == FlakeMode.FAST_EVAL:
+        return _generate_fast_eval_flake(config)
+
     description = f"Nix wrapper package for {config.source.name}"
     overlay_name = config.flake_name
     binary_name = config.wrapper.binary_name
+    outputs = _package_outputs(config)
+    overlay_entries = "\n".join(
+        f"                {name} = final.callPackage ./{path} {{ }};" for name, path in outputs
+    )
+    package_entries = "\n".join(f"                  {name} = pkgs.{name};" for name, _ in outputs)
+    channel_apps = "".join(
+        f"""
+                  {name} = {{
+                    type = "app";
+                    program = "${{pkgs.{name}}}/bin/{binary_name}";
+                  }};"""
+        for name, _ in outputs[1:]
+    )
 
     devenv_section = ""
     if config.devenv_enabled:
         devenv_section = """
-        devShells.default = devenv.lib.mkShell {
-          inherit inputs pkgs;
-          modules = [ ./devenv.nix ];
-        };"""
+
+                devShells.default = devenv.lib.mkShell {
+                  inherit inputs pkgs;
+                  modules = [ ./devenv.nix ];
+                };"""
 
     return dedent(
         f"""\
@@ -40,7 +73,7 @@ def generate_flake_nix(config: FlakeConfig) -> str:
           outputs = {{ self, nixpkgs, flake-utils, devenv }}@inputs:
             let
               overlay = final: prev: {{
-                {overlay_name} = final.callPackage ./package.nix {{ }};
+{overlay_entries}
               }};
             in
             flake-utils.lib.eachDefaultSystem (system:
@@ -54,19 +87,114 @@ def generate_flake_nix(config: FlakeConfig) -> str:
               {{
                 packages = {{
                   default = pkgs.{overlay_name};
-                  {overlay_name} = pkgs.{overlay_name};
+{package_entries}
                 }};
 
                 apps = {{
                   default = {{
                     type = "app";
                     program = "${{pkgs.{overlay_name}}}/bin/{binary_name}";
-                  }};
-                }};
-                {devenv_section}
+                  }};{channel_apps}
+                }};{devenv_section}
               }}) // {{
                 overlays.default = overlay;
               }};
         }}
         """
     )
+
+
+def _generate_fast_eval_flake(config: FlakeConfig) -> str:
+    """Generate a flake.nix optimized for evaluating ``packages`` only.
+
+    Packages under a free license (as nixpkgs' ``lib.licenses`` classifies
+    it) are built from the shared ``nixpkgs.legacyPackages`` instance rather
+    than a private ``import nixpkgs``; others import nixpkgs once per system,
+    and only when first used. Package outputs call package.nix
+    directly instead of applying the overlay, and the devenv input is
+    referenced only from ``devShells``, so package-only consumers never fetch
+    or evaluate it.
+    """
+    description = f"Nix wrapper package for {config.source.name}"
+    name = config.flake_name
+    binary_name = config.wrapper.binary_name
+    systems = " ".join(f'"{system}"' for system in FLAKE_SYSTEMS)
+    outputs = _package_outputs(config)
+    overlay_entries = "\n".join(
+        f"                {attr} = final.callPackage ./{path} {{ }};" for attr, path in outputs
+    )
+    package_entries = "\n".join(
+        f"                {attr} = pkgsFor.${{system}}.callPackage ./{path} {{ }};" for attr, path in outputs
+    )
+    channel_apps = "".join(
+        f"""
+                {attr} = {{
+                  type = "app";
+                  program = "${{self.packages.${{system}}.{attr}}}/bin/{binary_name}";
+                }};"""
+        for attr, _ in outputs[1:]
+    )
+
+    # nixpkgs knows which licenses are free (unfree, unfreeRedistributable, bsl11, ...).
+    pkgs_for = f"""pkgsFor =
+                if nixpkgs.lib.licenses.{config.meta.license}.free
+                then nixpkgs.legacyPackages
+                else forAllSystems (system: import nixpkgs {{
+                  inherit system;
+                  config.allowUnfree = true;
+                }});"""
+
+    devenv_input = ""
+    devenv_args = ""
+    devenv_section = ""
+    if config.devenv_enabled:
+        devenv_input = """
+            devenv.url = "github:cachix/devenv";
+            devenv.inputs.nixpkgs.follows = "nixpkgs";"""
+        devenv_args = ", devenv"
+        devenv_section = """
+
+              # Only dev shells touch devenv; package evaluation never forces it.
+              devShells = forAllSystems (system: {
+                default = devenv.lib.mkShell {
+                  inherit inputs;
+                  pkgs = pkgsFor.${system};
+                  modules = [ ./devenv.nix ];
+                };
+              });"""
+
+    return dedent(
+        f"""\
+        # flake.nix - auto-generated by nix-devenv-wrapper (fast-eval)
+        {{
+          description = "{description}";
+
+          inputs = {{
+            nixpkgs.url = "github:NixOS/nixpkgs/nixpkgs-unstable";{devenv_input}
+          }};
+
+          outputs = {{ self, nixpkgs{devenv_args} }}@inputs:
+            let
+              forAllSystems = nixpkgs.lib.genAttrs [ {systems} ];
+              {pkgs_for}
+            in
+            {{
+              overlays.default = final: prev: {{
+{overlay_entries}
+              }};
+
+              packages = forAllSystems (system: rec {{
+{package_entries}
+                default = {name};
+              }});
+
+              apps = forAllSystems (system: {{
+                default = {{
+                  type = "app";
+                  program = "${{self.packages.${{system}}.{name}}}/bin/{binary_name}";
+                }};{channel_apps}
+              }});{devenv_section}
+            }};
+        }}
+        """
+    )
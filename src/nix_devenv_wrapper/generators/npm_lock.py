@@ -0,0 +1,73 @@
+"""Generator for the npm project used by lockfile-mode package.nix files."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from nix_devenv_wrapper.models import FlakeConfig, NpmDependency
+
+NPM_PROJECT_DIR = "npm"
+
+
+def npm_project_dir(config: FlakeConfig) -> str:
+    """Directory of the npm project, relative to the package expression (one per channel)."""
+    return f"{NPM_PROJECT_DIR}-{config.channel}" if config.channel else NPM_PROJECT_DIR
+
+
+def _project_name(config: FlakeConfig) -> str:
+    return f"{config.pname}-wrapper"
+
+
+def generate_npm_package_json(config: FlakeConfig, version: str) -> str:
+    """Generate the package.json that depends on the wrapped package."""
+    data = {
+        "name": _project_name(config),
+        "version": version,
+        "private": True,
+        "dependencies": {config.source.name: version},
+    }
+    return json.dumps(data, indent=2) + "\n"
+
+
+def generate_npm_lockfile(config: FlakeConfig, version: str, dependencies: list[NpmDependency]) -> str:
+    """Generate a lockfileVersion 3 package-lock.json for the resolved tree."""
+    packages: dict[str, dict[str, Any]] = {
+        "": {
+            "name": _project_name(config),
+            "version": version,
+            "dependencies": {config.source.name: version},
+        }
+    }
+    for dependency in dependencies:
+        entry: dict[str, Any] = {"version": dependency.version, "resolved": dependency.resolved}
+        if dependency.integrity:
+            entry["integrity"] = dependency.integrity
+        install_name = dependency.path.rpartition("node_modules/")[2]
+        if install_name != dependency.name:
+            entry["name"] = dependency.name
+        if dependency.optional:
+            entry["optional"] = True
+        if dependency.has_install_script:
+            entry["hasInstallScript"] = True
+        if dependency.dependencies:
+            entry["dependencies"] = dependency.dependencies
+        if dependency.optional_dependencies:
+            entry["optionalDependencies"] = dependency.optional_dependencies
+        if dependency.peer_dependencies:
+            entry["peerDependencies"] = dependency.peer_dependencies
+        if dependency.bin:
+            entry["bin"] = dependency.bin
+        if dependency.os:
+            entry["os"] = dependency.os
+        if dependency.cpu:
+            entry["cpu"] = dependency.cpu
+        packages[dependency.path] = entry
+
+    data = {
+        "name": _project_name(config),
+        "version": version,
+        "lockfileVersion": 3,
+        "requires": True,
+        "packages": packages,
+    }
+    return json.dumps(data, indent=2) + "\n"
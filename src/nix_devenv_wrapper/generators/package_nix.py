@@ -1,24 +1,70 @@
 """Generator for package.nix files."""
 from __future__ import annotations
 
+import os
+import re
 from textwrap import dedent
 
-from nix_devenv_wrapper.models import FlakeConfig, PackageRegistry
-
-
-def generate_package_nix(config: FlakeConfig, version: str, sha256: str) -> str:
-    """Generate a package.nix file for the given configuration."""
+from packaging.markers import Marker
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.utils import canonicalize_name
+
+from nix_devenv_wrapper.generators.npm_lock import npm_project_dir
+from nix_devenv_wrapper.models import (
+    FlakeConfig,
+    LocalFetchMode,
+    NpmDependencyMode,
+    PackageRegistry,
+    PythonDistribution,
+    PythonMetadata,
+    WheelFile,
+)
+from nix_devenv_wrapper.wheels import python_version_for
+
+
+def generate_package_nix(
+    config: FlakeConfig,
+    version: str,
+    sha256: str,
+    wheels: dict[str, WheelFile] | None = None,
+    tag_template: str | None = None,
+    local_path: str | None = None,
+    python_metadata: PythonMetadata | None = None,
+    cargo_lock: str | None = None,
+) -> str:
+    """Generate a package.nix file for the given configuration.
+
+    ``wheels`` maps Nix systems to the selected wheel and is required for
+    PyPI packages in wheel mode. ``tag_template`` is a GitHub repository's
+    tag convention, e.g. ``"release-{version}"``. ``local_path`` is the
+    absolute path of a local-registry artifact. ``python_metadata`` supplies
+    a PyPI package's dependencies and console scripts. ``cargo_lock`` is the
+    file name, next to package.nix, of the Cargo.lock a crate ships.
+    """
     if config.source.registry == PackageRegistry.NPM:
         return _generate_npm_package(config, version, sha256)
     if config.source.registry == PackageRegistry.PYPI:
-        return _generate_pypi_package(config, version, sha256)
+        if config.runtime.python_distribution == PythonDistribution.WHEEL:
+            if not wheels:
+                raise ValueError("Wheel mode requires the selected wheels for each system")
+            return _generate_pypi_wheel_package(config, version, wheels, python_metadata)
+        return _generate_pypi_package(config, version, sha256, python_metadata)
     if config.source.registry == PackageRegistry.GITHUB_RELEASE:
-        return _generate_github_package(config, version, sha256)
+        return _generate_github_package(config, version, sha256, tag_template)
+    if config.source.registry == PackageRegistry.CARGO:
+        return _generate_cargo_package(config, version, sha256, cargo_lock)
+    if config.source.registry == PackageRegistry.LOCAL:
+        if not local_path:
+            raise ValueError("The local registry requires the artifact's path")
+        return _generate_local_package(config, version, sha256, local_path)
     raise NotImplementedError(f"Registry {config.source.registry} not yet supported")
 
 
 def _generate_npm_package(config: FlakeConfig, version: str, sha256: str) -> str:
     """Generate package.nix for an npm package."""
+    if config.runtime.npm_dependencies == NpmDependencyMode.LOCKFILE:
+        return _generate_npm_lockfile_package(config, version)
+
     package_name = config.source.name
     runtime_pkg = config.runtime.nix_package
     binary_name = config.wrapper.binary_name
@@ -112,11 +158,143 @@ def _generate_npm_package(config: FlakeConfig, version: str, sha256: str) -> str
     )
 
 
-def _generate_pypi_package(config: FlakeConfig, version: str, sha256: str) -> str:
-    """Generate package.nix for a PyPI package."""
+def _generate_npm_lockfile_package(config: FlakeConfig, version: str) -> str:
+    """Generate package.nix that installs an npm package from a generated lockfile.
+
+    Each lockfile entry becomes its own fetchurl via importNpmLock, so
+    dependencies that don't change between versions stay in the Nix store.
+    """
     package_name = config.source.name
     runtime_pkg = config.runtime.nix_package
     binary_name = config.wrapper.binary_name
+    entry_point = config.wrapper.entry_point
+    module_path = f"$out/lib/node_modules/{package_name}"
+    project_dir = npm_project_dir(config)
+
+    env_exports = []
+    if config.wrapper.disable_auto_update:
+        env_exports.append('export DISABLE_AUTOUPDATER=1')
+    for key, value in config.wrapper.env_vars.items():
+        env_exports.append(f'export {key}="{value}"')
+    env_section = "\n            ".join(env_exports) if env_exports else ""
+
+    node_flags = " ".join(config.wrapper.node_flags) if config.wrapper.node_flags else ""
+    node_flags_arg = f" {node_flags}" if node_flags else ""
+
+    return dedent(
+        f"""\
+        # {config.pname} package - auto-generated by nix-devenv-wrapper
+        {{ lib
+        , buildNpmPackage
+        , importNpmLock
+        , {runtime_pkg}
+        , bash
+        }}:
+
+        buildNpmPackage rec {{
+          pname = "{config.pname}";
+          version = "{version}";
+
+          src = ./{project_dir};
+          nodejs = {runtime_pkg};
+
+          npmDeps = importNpmLock {{
+            npmRoot = ./{project_dir};
+          }};
+          npmConfigHook = importNpmLock.npmConfigHook;
+
+          dontNpmBuild = true;
+
+          installPhase = ''
+            runHook preInstall
+
+            mkdir -p $out/lib $out/bin
+            cp -r node_modules $out/lib/node_modules
+
+            cat > $out/bin/{binary_name} << 'EOF'
+            #!${{bash}}/bin/bash
+            export NODE_PATH="{module_path}"
+            {env_section}
+            exec ${{{runtime_pkg}}}/bin/node{node_flags_arg} "{module_path}/{entry_point}" "$@"
+        EOF
+            chmod +x $out/bin/{binary_name}
+
+            substituteInPlace $out/bin/{binary_name} \
+              --replace '{module_path}' "$out/lib/node_modules/{package_name}"
+
+            runHook postInstall
+          '';
+
+          meta = with lib; {{
+            description = "{config.meta.description}";
+            homepage = "{config.meta.homepage}";
+            license = licenses.{config.meta.license};
+            platforms = {config.meta.platforms};
+            mainProgram = "{config.meta.main_program or binary_name}";
+          }};
+        }}
+        """
+    )
+
+
+# Platforms Requires-Dist markers are evaluated for; a dependency needed on any of them is kept.
+_MARKER_PLATFORMS = (
+    {"sys_platform": "linux", "platform_system": "Linux"},
+    {"sys_platform": "darwin", "platform_system": "Darwin"},
+)
+_NIX_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_'-]*")
+
+
+def _python_inputs(config: FlakeConfig, metadata: PythonMetadata | None) -> str:
+    """Return a propagatedBuildInputs section for the runtime dependencies in Requires-Dist."""
+    if metadata is None:
+        return ""
+    runtime_pkg = config.runtime.nix_package
+    environment = {"extra": "", "os_name": "posix", "implementation_name": "cpython"}
+    python_version = python_version_for(runtime_pkg)
+    if python_version is not None:
+        environment["python_version"] = "{}.{}".format(*python_version)
+        environment["python_full_version"] = "{}.{}.0".format(*python_version)
+
+    names: dict[str, None] = {}
+    for line in metadata.requires_dist:
+        try:
+            requirement = Requirement(line)
+        except InvalidRequirement:
+            continue
+        marker: Marker | None = requirement.marker
+        # Optional extras are not installed; markers for other interpreters and platforms drop out here too.
+        if marker is None or any(marker.evaluate({**environment, **platform}) for platform in _MARKER_PLATFORMS):
+            names[canonicalize_name(requirement.name)] = None
+    if not names:
+        return ""
+    # nixpkgs names Python packages by their normalized PyPI name.
+    entries = "\n            ".join(
+        name if _NIX_IDENTIFIER_RE.fullmatch(name) else f'{runtime_pkg}.pkgs."{name}"' for name in names
+    )
+    return f"""
+          propagatedBuildInputs = with {runtime_pkg}.pkgs; [
+            {entries}
+          ];
+"""
+
+
+def _python_main_program(config: FlakeConfig, metadata: PythonMetadata | None) -> str:
+    """Return mainProgram: the configured one, else binary_name if it is a console script, else the only script."""
+    binary_name = config.wrapper.binary_name
+    if config.meta.main_program:
+        return config.meta.main_program
+    scripts = metadata.console_scripts if metadata is not None else {}
+    if binary_name not in scripts and len(scripts) == 1:
+        return next(iter(scripts))
+    return binary_name
+
+
+def _generate_pypi_package(config: FlakeConfig, version: str, sha256: str, metadata: PythonMetadata | None) -> str:
+    """Generate package.nix for a PyPI package."""
+    package_name = config.source.name
+    runtime_pkg = config.runtime.nix_package
+    inputs_section = _python_inputs(config, metadata)
 
     return dedent(
         f"""\
@@ -134,41 +312,114 @@ def _generate_pypi_package(config: FlakeConfig, version: str, sha256: str) -> st
             inherit pname version;
             sha256 = "{sha256}";
           }};
-
+{inputs_section}
           meta = with lib; {{
             description = "{config.meta.description}";
             homepage = "{config.meta.homepage}";
             license = licenses.{config.meta.license};
             platforms = {config.meta.platforms};
-            mainProgram = "{config.meta.main_program or binary_name}";
+            mainProgram = "{_python_main_program(config, metadata)}";
           }};
         }}
         """
     )
 
 
-def _generate_github_package(config: FlakeConfig, version: str, sha256: str) -> str:
-    """Generate package.nix for a GitHub release."""
-    package_name = config.source.name  # Format: owner/repo
-    owner, repo = package_name.split("/")
-    binary_name = config.wrapper.binary_name
-    entry_point = config.wrapper.entry_point
-    runtime_type = config.runtime.runtime_type.value
+def _generate_pypi_wheel_package(
+    config: FlakeConfig,
+    version: str,
+    wheels: dict[str, WheelFile],
+    metadata: PythonMetadata | None,
+) -> str:
+    """Generate package.nix that installs a prebuilt wheel for the host system."""
+    runtime_pkg = config.runtime.nix_package
+    inputs_section = _python_inputs(config, metadata)
+
+    wheel_entries = "\n".join(
+        f'            "{system}" = {{\n'
+        f'              url = "{wheel.url}";\n'
+        f'              sha256 = "{wheel.sha256}";\n'
+        f"            }};"
+        for system, wheel in sorted(wheels.items())
+    )
 
-    # Determine the tag format (try with 'v' prefix)
-    tag = f"v{version}" if not version.startswith("v") else version
+    return dedent(
+        f"""\
+        # {config.pname} package - auto-generated by nix-devenv-wrapper
+        {{ lib
+        , stdenv
+        , {runtime_pkg}
+        , fetchurl
+        , autoPatchelfHook
+        }}:
 
-    # Build dependencies based on runtime type
-    build_inputs = []
-    if config.runtime.extra_packages:
-        build_inputs.extend(config.runtime.extra_packages)
+        let
+          version = "{version}";
 
-    build_inputs_str = "\n    ".join(build_inputs) if build_inputs else ""
-    build_inputs_section = f"""
-  buildInputs = [
-    {build_inputs_str}
-  ];
-""" if build_inputs else ""
+          wheels = {{
+{wheel_entries}
+          }};
+
+          wheel = wheels.${{stdenv.hostPlatform.system}}
+            or (throw "{config.pname}: no wheel selected for ${{stdenv.hostPlatform.system}}");
+        in
+        {runtime_pkg}.pkgs.buildPythonApplication {{
+          pname = "{config.pname}";
+          inherit version;
+          format = "wheel";
+
+          src = fetchurl {{
+            inherit (wheel) url sha256;
+          }};
+
+          # manylinux wheels link against the system C/C++ runtime
+          nativeBuildInputs = lib.optionals stdenv.hostPlatform.isLinux [ autoPatchelfHook ];
+          buildInputs = lib.optionals stdenv.hostPlatform.isLinux [ stdenv.cc.cc.lib ];
+{inputs_section}
+          meta = with lib; {{
+            description = "{config.meta.description}";
+            homepage = "{config.meta.homepage}";
+            license = licenses.{config.meta.license};
+            platforms = builtins.attrNames wheels;
+            mainProgram = "{_python_main_program(config, metadata)}";
+          }};
+        }}
+        """
+    )
+
+
+# Sections of a PyPI package.nix that follow the release's metadata rather than the config.
+_PYTHON_INPUTS_RE = re.compile(r"\n[ \t]*propagatedBuildInputs = with [^;]+; \[\n.*?\n[ \t]*\];\n", re.DOTALL)
+_WHEELS_RE = re.compile(r"\n[ \t]*wheels = \{\n.*?\n[ \t]*\};\n", re.DOTALL)
+_MAIN_PROGRAM_RE = re.compile(r'mainProgram = "[^"]*";')
+_BEFORE_META_RE = re.compile(r"\n(?=[ \t]*meta = with lib;)")
+
+
+def splice_python_sections(current: str, rendered: str) -> str:
+    """Copy the dependency, mainProgram and wheel sections of a freshly rendered PyPI package.nix into ``current``.
+
+    The rest of ``current``, including hand edits, is kept. A dependency
+    section is added before ``meta`` if the new release has dependencies,
+    and removed if it has none.
+    """
+    inputs = _PYTHON_INPUTS_RE.search(rendered)
+    section = inputs.group(0) if inputs else ""
+    if _PYTHON_INPUTS_RE.search(current):
+        current = _PYTHON_INPUTS_RE.sub(lambda _: section, current, count=1)
+    elif section:
+        current = _BEFORE_META_RE.sub(lambda _: section + "\n", current, count=1)
+    for pattern in (_WHEELS_RE, _MAIN_PROGRAM_RE):
+        match = pattern.search(rendered)
+        if match is not None:
+            replacement = match.group(0)
+            current = pattern.sub(lambda _: replacement, current, count=1)
+    return current
+
+
+def _runtime_wrapper(config: FlakeConfig) -> tuple[str, str, str | None]:
+    """Return the env exports and exec line of the launcher script, and the runtime package it needs."""
+    entry_point = config.wrapper.entry_point
+    runtime_type = config.runtime.runtime_type.value
 
     # Environment variable exports
     env_exports = []
@@ -183,16 +434,41 @@ def _generate_github_package(config: FlakeConfig, version: str, sha256: str) ->
     if runtime_type == "nodejs":
         node_flags = " ".join(config.wrapper.node_flags) if config.wrapper.node_flags else ""
         node_flags_arg = f" {node_flags}" if node_flags else ""
-        wrapper_exec = f'exec ${{{runtime_pkg}}}/bin/node{node_flags_arg} "$out/{entry_point}" "$@"'
-        runtime_input = runtime_pkg
-    elif runtime_type == "python":
-        wrapper_exec = f'exec ${{{runtime_pkg}}}/bin/python "$out/{entry_point}" "$@"'
-        runtime_input = runtime_pkg
-    else:
-        # For compiled binaries or no runtime
-        wrapper_exec = f'exec "$out/{entry_point}" "$@"'
-        runtime_input = None
+        return env_section, f'exec ${{{runtime_pkg}}}/bin/node{node_flags_arg} "$out/{entry_point}" "$@"', runtime_pkg
+    if runtime_type == "python":
+        return env_section, f'exec ${{{runtime_pkg}}}/bin/python "$out/{entry_point}" "$@"', runtime_pkg
+    # For compiled binaries or no runtime
+    return env_section, f'exec "$out/{entry_point}" "$@"', None
 
+
+def _generate_github_package(config: FlakeConfig, version: str, sha256: str, tag_template: str | None) -> str:
+    """Generate package.nix for a GitHub release."""
+    package_name = config.source.name  # Format: owner/repo
+    owner, repo = package_name.split("/")
+    binary_name = config.wrapper.binary_name
+
+    # Determine the tag format (learned convention, else configured prefix, else a 'v' prefix).
+    # The rev refers to ${version}, so version bumps keep it in step.
+    if tag_template is None:
+        if config.source.tag_prefix:
+            tag_template = f"{config.source.tag_prefix}{{version}}"
+        else:
+            tag_template = "v{version}" if not version.startswith("v") else "{version}"
+    rev = tag_template.replace("{version}", "${version}")
+
+    # Build dependencies based on runtime type
+    build_inputs = []
+    if config.runtime.extra_packages:
+        build_inputs.extend(config.runtime.extra_packages)
+
+    build_inputs_str = "\n    ".join(build_inputs) if build_inputs else ""
+    build_inputs_section = f"""
+  buildInputs = [
+    {build_inputs_str}
+  ];
+""" if build_inputs else ""
+
+    env_section, wrapper_exec, runtime_input = _runtime_wrapper(config)
     runtime_section = f"\n  , {runtime_input}" if runtime_input else ""
 
     return dedent(
@@ -211,7 +487,7 @@ def _generate_github_package(config: FlakeConfig, version: str, sha256: str) ->
           src = fetchFromGitHub {{
             owner = "{owner}";
             repo = "{repo}";
-            rev = "{tag}";
+            rev = "{rev}";
             sha256 = "{sha256}";
           }};
 {build_inputs_section}
@@ -237,3 +513,132 @@ def _generate_github_package(config: FlakeConfig, version: str, sha256: str) ->
         }}
         """
     )
+
+
+# Artifact suffixes stdenv's unpackPhase handles; anything else is installed as a single file.
+_ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".txz", ".tar.zst", ".zip")
+
+
+def _generate_local_package(config: FlakeConfig, version: str, sha256: str, local_path: str) -> str:
+    """Generate package.nix for an artifact from the local registry."""
+    binary_name = config.wrapper.binary_name
+    entry_point = config.wrapper.entry_point
+
+    # A filename pattern keeps the path in step with version bumps; manifest paths are used as listed.
+    pattern = config.source.name
+    if "{version}" in pattern:
+        local_path = os.path.abspath(pattern).replace("{version}", "${version}")
+    file_name = os.path.basename(local_path)
+    is_zip = file_name.endswith(".zip")
+    is_archive = file_name.endswith(_ARCHIVE_SUFFIXES)
+
+    # builtins.path copies the file into the store while evaluating; fetchurl reads it in the build sandbox.
+    if config.source.local_fetch == LocalFetchMode.FETCHURL:
+        fetcher = "fetchurl"
+        src = f"""fetchurl {{
+            name = "{file_name}";
+            url = "file://{local_path}";
+            sha256 = "{sha256}";
+          }}"""
+    else:
+        fetcher = None
+        src = f"""builtins.path {{
+            name = "{file_name}";
+            path = "{local_path}";
+            recursive = false;
+            sha256 = "{sha256}";
+          }}"""
+
+    if is_archive:
+        unpack_section = ""
+        install_files = "cp -r . $out/"
+    else:
+        unpack_section = "\n          dontUnpack = true;\n"
+        install_files = f"install -Dm755 $src $out/{entry_point}"
+
+    env_section, wrapper_exec, runtime_input = _runtime_wrapper(config)
+    inputs = [input for input in (fetcher, "bash", runtime_input, "unzip" if is_zip else None) if input]
+    inputs_section = "".join(f"\n        , {input}" for input in inputs)
+    native_section = "\n          nativeBuildInputs = [ unzip ];\n" if is_zip else ""
+
+    return dedent(
+        f"""\
+        # {config.pname} package - auto-generated by nix-devenv-wrapper
+        {{ lib
+        , stdenv{inputs_section}
+        }}:
+
+        stdenv.mkDerivation rec {{
+          pname = "{config.pname}";
+          version = "{version}";
+
+          src = {src};
+{unpack_section}{native_section}
+          installPhase = ''
+            mkdir -p $out/bin
+            {install_files}
+
+            cat > $out/bin/{binary_name} << 'EOF'
+            #!${{bash}}/bin/bash
+            {env_section}
+            {wrapper_exec}
+        EOF
+            chmod +x $out/bin/{binary_name}
+          '';
+
+          meta = with lib; {{
+            description = "{config.meta.description}";
+            homepage = "{config.meta.homepage}";
+            license = licenses.{config.meta.license};
+            platforms = {config.meta.platforms};
+            mainProgram = "{config.meta.main_program or binary_name}";
+          }};
+        }}
+        """
+    )
+
+
+def _generate_cargo_package(config: FlakeConfig, version: str, sha256: str, cargo_lock: str | None) -> str:
+    """Generate package.nix for a crates.io crate."""
+    package_name = config.source.name
+    binary_name = config.wrapper.binary_name
+
+    # The .crate checksum from the index is a flat hash, so fetch with fetchurl
+    # (not fetchCrate, which hashes the unpacked tree).
+    # Vendoring from the crate's own Cargo.lock needs no hash that goes stale with every release.
+    if cargo_lock:
+        vendor = f"cargoLock.lockFile = ./{cargo_lock};"
+    else:
+        cargo_hash = f'"{config.runtime.cargo_hash}"' if config.runtime.cargo_hash else "lib.fakeHash"
+        vendor = f"cargoHash = {cargo_hash};"
+
+    return dedent(
+        f"""\
+        # {config.pname} package - auto-generated by nix-devenv-wrapper
+        {{ lib
+        , rustPlatform
+        , fetchurl
+        }}:
+
+        rustPlatform.buildRustPackage rec {{
+          pname = "{config.pname}";
+          version = "{version}";
+
+          src = fetchurl {{
+            name = "{package_name}-${{version}}.tar.gz";
+            url = "https://static.crates.io/crates/{package_name}/{package_name}-${{version}}.crate";
+            sha256 = "{sha256}";
+          }};
+
+          {vendor}
+
+          meta = with lib; {{
+            description = "{config.meta.description}";
+            homepage = "{config.meta.homepage}";
+            license = licenses.{config.meta.license};
+            platforms = {config.meta.platforms};
+            mainProgram = "{config.meta.main_program or binary_name}";
+          }};
+        }}
+        """
+    )
@@ -0,0 +1,148 @@
+"""Generator for the GitHub Actions update workflow."""
+from __future__ import annotations
+
+import json
+from textwrap import dedent
+
+from nix_devenv_wrapper.generators.npm_lock import NPM_PROJECT_DIR
+from nix_devenv_wrapper.models import EXIT_UPDATE_AVAILABLE, FlakeConfig, GitHubActionsConfig, PackageRegistry
+
+WORKFLOW_PATH = ".github/workflows/update.yml"
+
+
+def generate_update_workflow(config: FlakeConfig) -> str:
+    """Generate a scheduled workflow that updates the wrapper and opens a PR.
+
+    The ``check`` job only queries registry metadata and ends the run when
+    nothing changed, so most scheduled runs never install Nix. Only when an
+    update exists does ``update`` prefetch the new version, ``build`` verify it
+    on every test platform with the Nix store cached by ``flake.lock``, and
+    ``pull-request`` open (and optionally auto-merge) the PR.
+    """
+    actions = config.github_actions or GitHubActionsConfig()
+    name = config.source.name
+    branch = f"ndw/update-{config.flake_name}"
+
+    cachix_step = ""
+    if config.cachix:
+        cachix_step = f"""
+              - uses: cachix/cachix-action@v15
+                with:
+                  name: {config.cachix.name}
+                  authToken: ${{{{ secrets.CACHIX_AUTH_TOKEN }}}}"""
+
+    artifact_paths = ["package.nix", f"{NPM_PROJECT_DIR}/"]
+    if config.source.registry == PackageRegistry.CARGO:
+        artifact_paths.append("Cargo.lock")
+    if config.source.channels:
+        artifact_paths += ["package-*.nix", f"{NPM_PROJECT_DIR}-*/"]
+    artifact_lines = "\n".join(f"                    {path}" for path in artifact_paths)
+
+    auto_merge_step = ""
+    if actions.auto_merge:
+        auto_merge_step = """
+              - name: Enable auto-merge
+                if: steps.pr.outputs.pull-request-number
+                env:
+                  GH_TOKEN: ${{ secrets.GITHUB_TOKEN }}
+                run: gh pr merge --auto --squash "${{ steps.pr.outputs.pull-request-number }}\""""
+
+    return dedent(
+        f"""\
+        # {WORKFLOW_PATH} - auto-generated by nix-devenv-wrapper
+        name: Update {config.flake_name}
+
+        on:
+          schedule:
+            - cron: "{actions.update_cron}"
+          workflow_dispatch:
+
+        concurrency:
+          group: update-{config.flake_name}
+          cancel-in-progress: false
+
+        permissions:
+          contents: write
+          pull-requests: write
+
+        jobs:
+          check:
+            # Metadata only: no Nix, no downloads. Most runs stop here.
+            runs-on: ubuntu-latest
+            outputs:
+              update: ${{{{ steps.check.outputs.update }}}}
+            steps:
+              - uses: actions/checkout@v4
+              - uses: astral-sh/setup-uv@v5
+              - name: Check for a new {name} release
+                id: check
+                run: |
+                  status=0
+                  uvx --from nix-devenv-wrapper ndw check --exit-code || status=$?
+                  case "$status" in
+                    0) echo "update=false" >> "$GITHUB_OUTPUT" ;;
+                    {EXIT_UPDATE_AVAILABLE}) echo "update=true" >> "$GITHUB_OUTPUT" ;;
+                    *) exit "$status" ;;
+                  esac
+
+          update:
+            needs: check
+            if: needs.check.outputs.update == 'true'
+            runs-on: ubuntu-latest
+            outputs:
+              version: ${{{{ steps.update.outputs.version }}}}
+            steps:
+              - uses: actions/checkout@v4
+              - uses: astral-sh/setup-uv@v5
+              - uses: cachix/install-nix-action@v30
+              - name: Prefetch and update package.nix
+                id: update
+                run: |
+                  uvx --from nix-devenv-wrapper ndw update
+                  version=$(sed -n 's/^ *version = "\\(.*\\)";/\\1/p' package.nix | head -n 1)
+                  echo "version=$version" >> "$GITHUB_OUTPUT"
+              - uses: actions/upload-artifact@v4
+                with:
+                  name: updated-wrapper
+                  path: |
+{artifact_lines}
+
+          build:
+            needs: update
+            strategy:
+              fail-fast: false
+              matrix:
+                os: {json.dumps(actions.test_platforms)}
+            runs-on: ${{{{ matrix.os }}}}
+            steps:
+              - uses: actions/checkout@v4
+              - uses: actions/download-artifact@v4
+                with:
+                  name: updated-wrapper
+              - uses: cachix/install-nix-action@v30
+              - uses: nix-community/cache-nix-action@v6
+                with:
+                  primary-key: nix-${{{{ runner.os }}}}-${{{{ hashFiles('flake.lock') }}}}
+                  restore-prefixes-first-match: nix-${{{{ runner.os }}}}-{cachix_step}
+              - name: Build
+                run: nix build --print-build-logs
+
+          pull-request:
+            needs: [update, build]
+            runs-on: ubuntu-latest
+            steps:
+              - uses: actions/checkout@v4
+              - uses: actions/download-artifact@v4
+                with:
+                  name: updated-wrapper
+              - name: Open pull request
+                id: pr
+                uses: peter-evans/create-pull-request@v7
+                with:
+                  branch: {branch}
+                  delete-branch: true
+                  commit-message: "chore: update {name} to ${{{{ needs.update.outputs.version }}}}"
+                  title: "chore: update {name} to ${{{{ needs.update.outputs.version }}}}"
+                  body: Automated update by nix-devenv-wrapper. Built on {", ".join(actions.test_platforms)}.{auto_merge_step}
+        """
+    )
@@ -1,15 +1,303 @@
 """Nix hash computation utilities."""
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
+import mmap
+import os
+import signal
 import subprocess
+import tempfile
+import threading
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
+from nix_devenv_wrapper.cache import default_cache_dir
 
-def prefetch_url_hash(url: str) -> str:
-    """Compute a sha256 hash for a URL using nix-prefetch-url."""
-    result = subprocess.run(
-        ["nix-prefetch-url", "--type", "sha256", url],
-        capture_output=True,
+if TYPE_CHECKING:
+    from nix_devenv_wrapper.artifacts import ArtifactStore
+
+NIX_BASE32_ALPHABET = "0123456789abcdfghijklmnpqrsvwxyz"
+
+# Well-formed but never-matching sha256, used where rendering must not pay for a download.
+PLACEHOLDER_HASH = "0" * 52
+
+
+def nix_base32(digest: bytes) -> str:
+    """Encode a digest in Nix's base32 alphabet, as printed by nix-prefetch-url."""
+    length = (len(digest) * 8 - 1) // 5 + 1
+    chars = []
+    for n in range(length - 1, -1, -1):
+        bit = n * 5
+        index, shift = divmod(bit, 8)
+        value = digest[index] >> shift
+        if index + 1 < len(digest):
+            value |= digest[index + 1] << (8 - shift)
+        chars.append(NIX_BASE32_ALPHABET[value & 0x1F])
+    return "".join(chars)
+
+
+def nix_base32_decode(text: str) -> bytes:
+    """Decode a Nix base32 string back into the digest bytes."""
+    length = len(text) * 5 // 8
+    digest = bytearray(length)
+    for n, char in enumerate(reversed(text)):
+        value = NIX_BASE32_ALPHABET.find(char)
+        if value < 0:
+            raise ValueError(f"Invalid Nix base32 character {char!r}")
+        index, shift = divmod(n * 5, 8)
+        digest[index] |= (value << shift) & 0xFF
+        carry = value >> (8 - shift)
+        if index + 1 < length:
+            digest[index + 1] |= carry
+        elif carry:
+            raise ValueError(f"Invalid Nix base32 hash: {text!r}")
+    return bytes(digest)
+
+
+def parse_sha256(value: str) -> bytes:
+    """Return the raw digest of a sha256 written in Nix base32, hex or SRI (``sha256-<base64>``) form."""
+    if value.startswith("sha256-"):
+        digest = base64.b64decode(value[len("sha256-"):], validate=True)
+    elif len(value) == 64:
+        digest = bytes.fromhex(value)
+    else:
+        digest = nix_base32_decode(value)
+    if len(digest) != 32:
+        raise ValueError(f"Not a sha256 hash: {value!r}")
+    return digest
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1 << 20) -> bytes:
+    """Return the raw sha256 digest of a file.
+
+    Regular files are memory-mapped and hashed straight from the page cache,
+    without copying them through Python buffers; files that can't be mapped
+    (empty files, pipes) are read in chunks.
+    """
+    with open(path, "rb") as handle:
+        try:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            digest = hashlib.sha256()
+            while chunk := handle.read(chunk_size):
+                digest.update(chunk)
+            return digest.digest()
+        with mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            return hashlib.sha256(mapped).digest()
+
+
+class FileHashCache:
+    """Persistent nix hashes of local files, reused while a file's mtime and size are unchanged.
+
+    Stored as one JSON file; writes merge with what is on disk and replace it
+    atomically, so concurrent processes don't lose each other's entries.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_cache_dir("file-hashes.json")
+        self._lock = threading.Lock()
+        self._entries = self._read()
+
+    def nix_hash(self, file: str | Path) -> str:
+        """Return the nix base32 sha256 of a file, hashing it only if it changed since last time."""
+        file = Path(file).resolve()
+        stat = file.stat()
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        with self._lock:
+            entry = self._entries.get(str(file))
+        if entry is not None and entry[:2] == stamp:
+            return nix_base32(bytes.fromhex(entry[2]))
+
+        digest = file_sha256(file)
+        with self._lock:
+            self._entries = {**self._read(), str(file): [*stamp, digest.hex()]}
+            self._write()
+        return nix_base32(digest)
+
+    def _read(self) -> dict[str, list[Any]]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(self._entries, handle)
+        os.replace(tmp, self.path)
+
+
+def prefetch_url_hash(
+    url: str,
+    timeout: float | None = None,
+    on_start: Callable[[subprocess.Popen[str]], None] | None = None,
+) -> str:
+    """Compute a sha256 hash for a URL using nix-prefetch-url.
+
+    Args:
+        url: URL to fetch and hash
+        timeout: Seconds before the prefetch is killed and TimeoutExpired is raised
+        on_start: Called with the running process, e.g. to allow cancellation
+    """
+    return prefetch_url(url, timeout, on_start)[0]
+
+
+def prefetch_url(
+    url: str,
+    timeout: float | None = None,
+    on_start: Callable[[subprocess.Popen[str]], None] | None = None,
+    unpack: bool = False,
+) -> tuple[str, Path | None]:
+    """Like ``prefetch_url_hash``, also returning the Nix store path the file was added to, if printed.
+
+    With ``unpack`` the archive is unpacked and the NAR hash of its contents is
+    returned, which is what ``fetchFromGitHub`` and ``fetchzip`` pin.
+    """
+    command = ["nix-prefetch-url", "--type", "sha256", "--print-path", *(["--unpack"] if unpack else []), url]
+    with subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
         text=True,
-        check=True,
-    )
-    return result.stdout.strip()
+        start_new_session=True,
+    ) as process:
+        if on_start:
+            on_start(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_group(process)
+            process.communicate()
+            raise
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    sha256, _, path = stdout.strip().partition("\n")
+    return sha256.strip(), Path(path.strip()) if path.strip() else None
+
+
+def kill_process_group(process: subprocess.Popen[str]) -> None:
+    """Kill a process started in its own session along with its children."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+class PrefetchPool:
+    """Bounded pool of nix-prefetch-url jobs with single-flight de-duplication.
+
+    Concurrent submissions of the same URL share one in-flight job and
+    therefore one Future; cancelling it cancels it for every caller. With an
+    artifact store, URLs are downloaded into the store and hashed in-process
+    instead of running nix-prefetch-url.
+    """
+
+    def __init__(self, max_workers: int = 4, timeout: float | None = 600.0, store: ArtifactStore | None = None):
+        """
+        Initialize the prefetch pool.
+
+        Args:
+            max_workers: Maximum number of concurrent prefetch jobs
+            timeout: Default per-job timeout in seconds
+            store: Optional artifact store to download and hash through
+        """
+        self.timeout = timeout
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future[str]] = {}
+        self._processes: dict[str, subprocess.Popen[str]] = {}
+        self._cancelled: set[str] = set()
+        self._paths: dict[str, Path] = {}
+
+    def submit(self, url: str, timeout: float | None = None) -> Future[str]:
+        """Schedule a prefetch, joining an in-flight job for the same URL."""
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                return future
+            self._cancelled.discard(url)
+            future = self._executor.submit(self._run, url, timeout if timeout is not None else self.timeout)
+            self._inflight[url] = future
+        future.add_done_callback(lambda _: self._forget(url, future))
+        return future
+
+    def hash(self, url: str, timeout: float | None = None) -> str:
+        """Prefetch a URL through the pool and wait for its hash."""
+        return self.submit(url, timeout).result()
+
+    def local_path(self, url: str) -> Path | None:
+        """Return the local copy of a URL hashed through the pool (store blob or Nix store path), if any."""
+        if self.store is not None:
+            return self.store.lookup(url)
+        with self._lock:
+            path = self._paths.get(url)
+        return path if path is not None and path.is_file() else None
+
+    def cancel(self, url: str) -> bool:
+        """Cancel the job for a URL, killing nix-prefetch-url if it is running."""
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is None:
+                return False
+            self._cancelled.add(url)
+            process = self._processes.get(url)
+        if future.cancel():
+            return True
+        if process is not None:
+            kill_process_group(process)
+        return True
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Stop accepting jobs, optionally cancelling queued and running ones."""
+        if cancel_pending:
+            with self._lock:
+                urls = list(self._inflight)
+            for url in urls:
+                self.cancel(url)
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def _run(self, url: str, timeout: float | None) -> str:
+        def register(process: subprocess.Popen[str]) -> None:
+            with self._lock:
+                self._processes[url] = process
+                cancelled = url in self._cancelled
+            if cancelled:
+                kill_process_group(process)
+
+        if self.store is not None:
+            return self.store.nix_hash(url, timeout=timeout, cancelled=lambda: url in self._cancelled)
+
+        try:
+            sha256, path = prefetch_url(url, timeout=timeout, on_start=register)
+        except subprocess.CalledProcessError:
+            with self._lock:
+                if url in self._cancelled:
+                    raise CancelledError(f"Prefetch of {url} was cancelled") from None
+            raise
+        finally:
+            with self._lock:
+                self._processes.pop(url, None)
+        if path is not None:
+            with self._lock:
+                self._paths[url] = path
+        return sha256
+
+    def _forget(self, url: str, future: Future[str]) -> None:
+        with self._lock:
+            if self._inflight.get(url) is future:
+                del self._inflight[url]
+
+    def __enter__(self) -> PrefetchPool:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.shutdown(cancel_pending=args[0] is not None)
@@ -0,0 +1,192 @@
+"""Local SQLite index of every release seen for each wrapped package."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from nix_devenv_wrapper.cache import default_cache_dir
+from nix_devenv_wrapper.models import PackageRegistry, VersionInfo
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS releases (
+    registry     TEXT NOT NULL,
+    package      TEXT NOT NULL,
+    version      TEXT NOT NULL,
+    tarball_url  TEXT NOT NULL,
+    sha256       TEXT,
+    published_at TEXT,
+    tag          TEXT,
+    first_seen   REAL NOT NULL,
+    last_seen    REAL NOT NULL,
+    PRIMARY KEY (registry, package, version)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    registry TEXT NOT NULL,
+    package  TEXT NOT NULL,
+    tag      TEXT NOT NULL,
+    version  TEXT NOT NULL,
+    PRIMARY KEY (registry, package, tag)
+);
+CREATE TABLE IF NOT EXISTS syncs (
+    registry  TEXT NOT NULL,
+    package   TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (registry, package)
+);
+"""
+
+_UPSERT = """
+INSERT INTO releases (registry, package, version, tarball_url, sha256, published_at, tag, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (registry, package, version) DO UPDATE SET
+    sha256 = CASE
+        WHEN excluded.tarball_url != releases.tarball_url THEN excluded.sha256
+        ELSE COALESCE(excluded.sha256, releases.sha256)
+    END,
+    tarball_url = excluded.tarball_url,
+    published_at = COALESCE(excluded.published_at, releases.published_at),
+    tag = COALESCE(excluded.tag, releases.tag),
+    last_seen = excluded.last_seen
+"""
+
+
+class ReleaseHistory:
+    """Versions, publish times, tarball URLs and digests seen for each package.
+
+    The index is filled from metadata the registries already return and from
+    hashes computed during updates, so history, offline checks and rollbacks
+    can be answered without network access. Writes are upserts: a release is
+    never forgotten, and a known digest survives later metadata that lacks it
+    unless the tarball URL changed.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_cache_dir("history.sqlite3")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record(
+        self,
+        registry: PackageRegistry,
+        package_name: str,
+        releases: Iterable[VersionInfo],
+        tags: dict[str, str] | None = None,
+    ) -> None:
+        """Merge a fetched version list into the index and mark the package as synced.
+
+        ``tags`` (registry channel -> version) replace the previously recorded ones.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._upsert(registry, package_name, releases, now)
+            self._conn.execute(
+                "DELETE FROM tags WHERE registry = ? AND package = ?", (registry.value, package_name)
+            )
+            self._conn.executemany(
+                "INSERT INTO tags (registry, package, tag, version) VALUES (?, ?, ?, ?)",
+                [(registry.value, package_name, tag, version) for tag, version in (tags or {}).items()],
+            )
+            self._conn.execute(
+                "INSERT INTO syncs (registry, package, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (registry, package) DO UPDATE SET synced_at = excluded.synced_at",
+                (registry.value, package_name, now),
+            )
+
+    def record_hash(self, registry: PackageRegistry, package_name: str, release: VersionInfo, sha256: str) -> None:
+        """Remember the nix hash computed for a release's tarball.
+
+        The hash is attached to every known release with that tarball URL; the
+        release itself is added if it was never seen in a version list.
+        """
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE releases SET sha256 = ?, last_seen = ? WHERE registry = ? AND package = ? AND tarball_url = ?",
+                (sha256, time.time(), registry.value, package_name, release.tarball_url),
+            ).rowcount
+            if not updated:
+                self._upsert(registry, package_name, [release.model_copy(update={"sha256": sha256})], time.time())
+
+    def _upsert(
+        self,
+        registry: PackageRegistry,
+        package_name: str,
+        releases: Iterable[VersionInfo],
+        now: float,
+    ) -> None:
+        self._conn.executemany(
+            _UPSERT,
+            [
+                (
+                    registry.value,
+                    package_name,
+                    release.version,
+                    release.tarball_url,
+                    release.sha256,
+                    release.published_at,
+                    release.tag,
+                    now,
+                    now,
+                )
+                for release in releases
+            ],
+        )
+
+    def releases(self, registry: PackageRegistry, package_name: str) -> list[VersionInfo]:
+        """Return every known release of a package, in insertion order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, tarball_url, sha256, published_at, tag FROM releases "
+                "WHERE registry = ? AND package = ? ORDER BY first_seen, rowid",
+                (registry.value, package_name),
+            ).fetchall()
+        return [
+            VersionInfo(version=version, tarball_url=url, sha256=sha256, published_at=published_at, tag=tag)
+            for version, url, sha256, published_at, tag in rows
+        ]
+
+    def get(self, registry: PackageRegistry, package_name: str, version: str) -> VersionInfo | None:
+        """Return a single known release, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tarball_url, sha256, published_at, tag FROM releases "
+                "WHERE registry = ? AND package = ? AND version = ?",
+                (registry.value, package_name, version),
+            ).fetchone()
+        if row is None:
+            return None
+        url, sha256, published_at, tag = row
+        return VersionInfo(version=version, tarball_url=url, sha256=sha256, published_at=published_at, tag=tag)
+
+    def tags(self, registry: PackageRegistry, package_name: str) -> dict[str, str]:
+        """Return the registry channels recorded at the last sync (tag -> version)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT tag, version FROM tags WHERE registry = ? AND package = ?",
+                (registry.value, package_name),
+            ).fetchall()
+        return dict(rows)
+
+    def last_synced(self, registry: PackageRegistry, package_name: str) -> float | None:
+        """Return when the full version list was last recorded (epoch seconds), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at FROM syncs WHERE registry = ? AND package = ?",
+                (registry.value, package_name),
+            ).fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> ReleaseHistory:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
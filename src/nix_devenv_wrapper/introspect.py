@@ -0,0 +1,275 @@
+"""Streaming inspection of release archives for the binaries they provide.
+
+Archives are decompressed on the fly as they download and never extracted
+or held in memory whole: only member headers and the few small manifests
+that declare binaries are read, and the download stops as soon as those
+answer the question.
+"""
+from __future__ import annotations
+
+import configparser
+import io
+import json
+import posixpath
+import tarfile
+import tomllib
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from pydantic import BaseModel, Field
+
+from nix_devenv_wrapper.models import FlakeConfig, PackageRegistry
+from nix_devenv_wrapper.transport import Session, borrow
+
+# Manifests larger than this are not binary declarations worth reading.
+MAX_MANIFEST_SIZE = 4 * 1024**2
+CHUNK_SIZE = 64 * 1024
+
+
+class DetectedBinaries(BaseModel):
+    """Binaries declared by (or found in) one release archive."""
+
+    binaries: dict[str, str] = Field(
+        default_factory=dict,
+        description="Binary name -> entry point: a path relative to the package root, or module:function for "
+        "Python console scripts",
+    )
+    source: str | None = Field(None, description="Where they were found, e.g. package.json or executables")
+
+    class Config:
+        frozen = True
+
+    def default(self, preferred: str | None = None) -> tuple[str, str] | None:
+        """Return the binary to wrap: ``preferred`` if provided, else the only or first one found."""
+        if preferred in self.binaries:
+            return preferred, self.binaries[preferred]
+        return next(iter(self.binaries.items()), None)
+
+
+def inspect_url(url: str, registry: PackageRegistry, session: Session | None = None) -> DetectedBinaries:
+    """Stream a release archive from an HTTP(S) or file:// URL and return the binaries it provides."""
+    with _stream(url, session) as chunks:
+        return inspect_archive(chunks, registry)
+
+
+def read_archive_file(url: str, path: str, session: Session | None = None) -> str | None:
+    """Stream a release archive and return one small file's text, by path below its top-level directory.
+
+    The download stops at that file; None if the archive doesn't have it.
+    """
+    with _stream(url, session) as chunks:
+        with tarfile.open(fileobj=io.BufferedReader(_ChunkReader(chunks)), mode="r|*") as archive:
+            for member in _members(archive):
+                if member.path == path:
+                    return member.read_text()
+    return None
+
+
+def inspect_archive(chunks: Iterable[bytes], registry: PackageRegistry) -> DetectedBinaries:
+    """Return the binaries provided by a (compressed) tar archive given as a stream of chunks.
+
+    Raises ``tarfile.TarError`` for anything that isn't a tar archive (e.g.
+    zip sdists, which can't be read front to back).
+    """
+    scan = _SCANNERS.get(registry, _scan_tree)
+    with tarfile.open(fileobj=io.BufferedReader(_ChunkReader(chunks)), mode="r|*") as archive:
+        return scan(_members(archive))
+
+
+def config_warnings(config: FlakeConfig, version: str, detected: DetectedBinaries) -> list[str]:
+    """Describe how a wrapper config disagrees with the binaries a version provides."""
+    if not detected.binaries:
+        return []
+    binary_name = config.wrapper.binary_name
+    provided = ", ".join(sorted(detected.binaries))
+    declared = detected.binaries.get(binary_name)
+    if declared is None:
+        return [f"{config.source.name} {version} provides no binary {binary_name!r} ({detected.source}: {provided})"]
+    # PyPI applications install their console scripts themselves; the entry point is unused.
+    if config.source.registry != PackageRegistry.PYPI and _normalize(config.wrapper.entry_point) != declared:
+        return [
+            f"{config.source.name} {version} declares {binary_name!r} as {declared!r} in {detected.source}, "
+            f"not {config.wrapper.entry_point!r}"
+        ]
+    return []
+
+
+@contextmanager
+def _stream(url: str, session: Session | None) -> Iterator[Iterator[bytes]]:
+    """Yield the chunks of an HTTP(S) or file:// URL; leaving the block early stops the download."""
+    if url.startswith("file://"):
+        with open(url2pathname(urlsplit(url).path), "rb") as handle:
+            yield iter(lambda: handle.read(CHUNK_SIZE), b"")
+        return
+    client = session or borrow(timeout=60.0)
+    with client.stream("GET", url, follow_redirects=True) as response:
+        response.raise_for_status()
+        yield response.iter_bytes(CHUNK_SIZE)
+
+
+class _ChunkReader(io.RawIOBase):
+    """Raw binary stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class _Member:
+    """An archive member, with its path relative to the archive's top-level directory."""
+
+    def __init__(self, archive: tarfile.TarFile, info: tarfile.TarInfo, path: str):
+        self.archive = archive
+        self.info = info
+        self.path = path
+
+    @property
+    def depth(self) -> int:
+        return self.path.count("/")
+
+    @property
+    def executable(self) -> bool:
+        return self.info.isfile() and bool(self.info.mode & 0o111)
+
+    def read_text(self) -> str | None:
+        """Return a small file member's text; only valid while the stream is positioned on it."""
+        if not self.info.isfile() or self.info.size > MAX_MANIFEST_SIZE:
+            return None
+        handle = self.archive.extractfile(self.info)
+        return handle.read().decode("utf-8", "replace") if handle is not None else None
+
+
+def _members(archive: tarfile.TarFile) -> Iterator[_Member]:
+    """Yield members in stream order, relative to a leading top-level directory if there is one."""
+    root: str | None = None
+    for info in archive:
+        name = posixpath.normpath(info.name).lstrip("/")
+        if name == ".":
+            continue
+        if root is None:
+            # Release archives (npm's package/, GitHub's owner-repo-sha/, sdists' name-version/) share one root.
+            head, separator, rest = name.partition("/")
+            root = head if separator or info.isdir() else ""
+            if root and not rest:
+                continue
+        if root:
+            if not name.startswith(root + "/"):
+                root = ""
+            else:
+                name = name[len(root) + 1:]
+        yield _Member(archive, info, name)
+
+
+def _scan_npm(members: Iterable[_Member]) -> DetectedBinaries:
+    for member in members:
+        if member.path == "package.json":
+            return _from_package_json(member.read_text())
+    return DetectedBinaries()
+
+
+def _scan_python(members: Iterable[_Member]) -> DetectedBinaries:
+    for member in members:
+        detected = _from_python_metadata(member)
+        if detected.binaries:
+            return detected
+    return DetectedBinaries()
+
+
+def _scan_tree(members: Iterable[_Member]) -> DetectedBinaries:
+    """Binaries of a source tree: its package manifest if it declares any, else its top-level executables."""
+    executables: dict[str, str] = {}
+    for member in members:
+        if member.depth == 0 and member.path == "package.json":
+            detected = _from_package_json(member.read_text())
+        else:
+            detected = _from_python_metadata(member)
+        if detected.binaries:
+            return detected
+        if member.executable and (member.depth == 0 or (member.depth == 1 and member.path.startswith("bin/"))):
+            executables.setdefault(posixpath.basename(member.path), member.path)
+    return DetectedBinaries(binaries=executables, source="executables" if executables else None)
+
+
+_SCANNERS: dict[PackageRegistry, Callable[[Iterable[_Member]], DetectedBinaries]] = {
+    PackageRegistry.NPM: _scan_npm,
+    PackageRegistry.PYPI: _scan_python,
+}
+
+
+def _from_package_json(text: str | None) -> DetectedBinaries:
+    try:
+        manifest = json.loads(text or "")
+    except ValueError:
+        return DetectedBinaries()
+    if not isinstance(manifest, dict):
+        return DetectedBinaries()
+    bin_field = manifest.get("bin")
+    if isinstance(bin_field, str):
+        # A single bin is named after the package, without its scope.
+        bin_field = {str(manifest.get("name", "")).rsplit("/", 1)[-1]: bin_field}
+    if not isinstance(bin_field, dict):
+        return DetectedBinaries()
+    binaries = {str(name): _normalize(str(path)) for name, path in bin_field.items() if name}
+    return DetectedBinaries(binaries=binaries, source="package.json")
+
+
+def _from_python_metadata(member: _Member) -> DetectedBinaries:
+    """Console scripts from pyproject.toml, setup.cfg or an egg-info entry_points.txt."""
+    name = posixpath.basename(member.path)
+    if member.depth == 0 and name == "pyproject.toml":
+        try:
+            pyproject = tomllib.loads(member.read_text() or "")
+        except tomllib.TOMLDecodeError:
+            return DetectedBinaries()
+        scripts = pyproject.get("project", {}).get("scripts") or pyproject.get("tool", {}).get("poetry", {}).get(
+            "scripts", {}
+        )
+        binaries = {
+            str(script): str(target.get("callable", "") if isinstance(target, dict) else target)
+            for script, target in scripts.items()
+        }
+        return DetectedBinaries(binaries=binaries, source="pyproject.toml")
+    if member.depth == 0 and name == "setup.cfg":
+        return _from_ini(member.read_text(), "options.entry_points", "setup.cfg")
+    if 1 <= member.depth <= 2 and name == "entry_points.txt" and member.path.split("/")[-2].endswith(".egg-info"):
+        return _from_ini(member.read_text(), None, "entry_points.txt")
+    return DetectedBinaries()
+
+
+def _from_ini(text: str | None, section: str | None, source: str) -> DetectedBinaries:
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.optionxform = str  # type: ignore[assignment,method-assign]
+    try:
+        parser.read_string(text or "")
+    except configparser.Error:
+        return DetectedBinaries()
+    if section is None:
+        scripts = dict(parser["console_scripts"]) if parser.has_section("console_scripts") else {}
+    else:
+        # setup.cfg nests entry points as "console_scripts = \n name = module:function" lines.
+        value = parser.get(section, "console_scripts", fallback="")
+        scripts = dict(line.split("=", 1) for line in value.splitlines() if "=" in line)
+    binaries = {script.strip(): target.strip() for script, target in scripts.items() if script.strip()}
+    return DetectedBinaries(binaries=binaries, source=source)
+
+
+def _normalize(path: str) -> str:
+    return posixpath.normpath(path).lstrip("/")
+
@@ -0,0 +1,316 @@
+"""Streaming extraction of selected paths from JSON documents.
+
+Registry documents (npm packuments, PyPI project pages, GitHub release lists)
+can be tens of megabytes while a check needs a handful of fields. The
+extractor walks the byte stream, descends only into containers that can lead
+to a requested path, skips everything else without building Python objects,
+and stops as soon as every requested path is resolved. Peak memory is bounded
+by the largest selected value plus one network chunk.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import re
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Any, Union
+
+if TYPE_CHECKING:
+    from nix_devenv_wrapper.transport import Session
+
+# Matches any object key or array index in a path pattern.
+WILDCARD = "*"
+
+PathElement = Union[str, int]
+Path = tuple[PathElement, ...]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR_END = re.compile(r"[,}\]\s]")
+
+
+class _ValueScanner:
+    """Resumable scanner that finds the end of one JSON value, optionally keeping its text."""
+
+    def __init__(self, capture: bool):
+        self.pieces: list[str] | None = [] if capture else None
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._scalar = False
+
+    def feed(self, buf: str, pos: int, final: bool) -> int | None:
+        """Scan from ``pos``; return the end index once the value is complete, else None."""
+        i, n = pos, len(buf)
+        if not self._started:
+            self._started = True
+            char = buf[i]
+            if char == '"':
+                self._in_string = True
+                i += 1
+            elif char in "{[":
+                self._depth = 1
+                i += 1
+            else:
+                self._scalar = True
+
+        while i < n:
+            if self._escaped:
+                self._escaped = False
+                i += 1
+                continue
+            if self._scalar:
+                match = _SCALAR_END.search(buf, i)
+                if match is None:
+                    i = n
+                    break
+                return self._finish(buf, pos, match.start())
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buf, i)
+                if match is None:
+                    i = n
+                    break
+                if match.group() == "\\":
+                    self._escaped = True
+                    i = match.end()
+                    continue
+                self._in_string = False
+                i = match.end()
+                if self._depth == 0:
+                    return self._finish(buf, pos, i)
+                continue
+            match = _STRUCTURAL.search(buf, i)
+            if match is None:
+                i = n
+                break
+            char, i = match.group(), match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._finish(buf, pos, i)
+
+        if final and self._scalar:
+            return self._finish(buf, pos, n)
+        if self.pieces is not None:
+            self.pieces.append(buf[pos:n])
+        return None
+
+    def _finish(self, buf: str, pos: int, end: int) -> int:
+        if self.pieces is not None:
+            self.pieces.append(buf[pos:end])
+        return end
+
+    def value(self) -> Any:
+        assert self.pieces is not None
+        return json.loads("".join(self.pieces))
+
+
+class _Frame:
+    __slots__ = ("is_object", "path", "state", "key", "index")
+
+    def __init__(self, is_object: bool, path: Path):
+        self.is_object = is_object
+        self.path = path
+        self.state = "start"
+        self.key: str | None = None
+        self.index = 0
+
+
+class JsonPathExtractor:
+    """Incrementally extract values at path patterns from a JSON byte stream.
+
+    Patterns are tuples of object keys and array indexes; ``WILDCARD`` matches
+    any key or index, e.g. ``("versions", WILDCARD, "dist", "tarball")``.
+    Matches are collected in ``results`` keyed by their concrete path, in
+    document order. ``done`` becomes True once no pattern can match any more
+    of the document, after which further input is ignored.
+    """
+
+    def __init__(self, patterns: Iterable[Sequence[PathElement]]):
+        self._patterns = [tuple(pattern) for pattern in patterns]
+        self._open = set(range(len(self._patterns)))
+        self.results: dict[Path, Any] = {}
+        self.done = not self._open
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._stack: list[_Frame] = []
+        self._scanner: _ValueScanner | None = None
+        self._scan_target: Path | None = None
+        self._root_done = False
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the document."""
+        if not self.done:
+            self._buf += self._decoder.decode(chunk)
+            self._run(final=False)
+
+    def close(self) -> dict[Path, Any]:
+        """Signal the end of the document and return the results."""
+        if not self.done:
+            self._buf += self._decoder.decode(b"", final=True)
+            self._run(final=True)
+            if not self._root_done:
+                raise ValueError("Truncated JSON document")
+        return self.results
+
+    def _matches(self, pattern: Path, path: Path) -> bool:
+        return all(want == WILDCARD or want == got for want, got in zip(pattern, path))
+
+    def _wants(self, path: Path) -> bool:
+        return any(
+            len(self._patterns[i]) == len(path) and self._matches(self._patterns[i], path) for i in self._open
+        )
+
+    def _leads(self, path: Path) -> bool:
+        return any(len(self._patterns[i]) > len(path) and self._matches(self._patterns[i], path) for i in self._open)
+
+    def _resolve(self, path: Path) -> None:
+        """Close patterns that cannot match again once the value at ``path`` is finished."""
+        for i in list(self._open):
+            pattern = self._patterns[i]
+            if len(pattern) >= len(path) and WILDCARD not in pattern[: len(path)] and pattern[: len(path)] == path:
+                self._open.discard(i)
+        if not self._open:
+            self.done = True
+
+    def _run(self, final: bool) -> None:
+        buf, i = self._buf, 0
+        while not self.done:
+            if self._scanner is not None:
+                end = self._scanner.feed(buf, i, final)
+                if end is None:
+                    i = len(buf)
+                    break
+                i = end
+                self._scanned()
+                continue
+
+            i = _WHITESPACE.match(buf, i).end()  # type: ignore[union-attr]
+            if i >= len(buf):
+                break
+            char = buf[i]
+
+            if not self._stack:
+                if self._root_done:
+                    raise ValueError(f"Unexpected data after JSON document: {char!r}")
+                i = self._begin_value((), char, i)
+                continue
+
+            frame = self._stack[-1]
+            if frame.state == "next":
+                if char == ",":
+                    if frame.is_object:
+                        frame.state = "key"
+                    else:
+                        frame.state = "value"
+                        frame.index += 1
+                    i += 1
+                elif char in "}]":
+                    i = self._close(i)
+                else:
+                    raise ValueError(f"Expected ',' or end of container, got {char!r}")
+            elif frame.state == "start" and char in "}]":
+                i = self._close(i)
+            elif frame.is_object and frame.state in ("start", "key"):
+                if char != '"':
+                    raise ValueError(f"Expected object key, got {char!r}")
+                frame.state = "key"
+                self._scanner, self._scan_target = _ValueScanner(capture=True), None
+            elif frame.is_object and frame.state == "colon":
+                if char != ":":
+                    raise ValueError(f"Expected ':', got {char!r}")
+                frame.state = "value"
+                i += 1
+            else:
+                key: PathElement = frame.key if frame.is_object else frame.index  # type: ignore[assignment]
+                i = self._begin_value((*frame.path, key), char, i)
+
+        self._buf = buf[i:]
+
+    def _begin_value(self, path: Path, char: str, i: int) -> int:
+        if char in "{[" and not self._wants(path) and self._leads(path):
+            self._stack.append(_Frame(char == "{", path))
+            return i + 1
+        self._scanner = _ValueScanner(capture=self._wants(path))
+        self._scan_target = path
+        return i
+
+    def _scanned(self) -> None:
+        scanner, path = self._scanner, self._scan_target
+        self._scanner = self._scan_target = None
+        assert scanner is not None
+        if path is None:
+            frame = self._stack[-1]
+            frame.key = scanner.value()
+            frame.state = "colon"
+            return
+        if scanner.pieces is not None:
+            value = scanner.value()
+            self.results[path] = value
+            # Longer patterns nested under a captured value are matched in memory.
+            for i in list(self._open):
+                pattern = self._patterns[i]
+                if len(pattern) > len(path) and self._matches(pattern, path):
+                    self._collect(value, pattern[len(path):], path)
+            self._resolve(path)
+        self._value_done()
+
+    def _collect(self, value: Any, rest: Path, path: Path) -> None:
+        if not rest:
+            self.results[path] = value
+            return
+        want = rest[0]
+        if isinstance(value, dict):
+            items: Iterable[tuple[PathElement, Any]] = value.items()
+        elif isinstance(value, list):
+            items = enumerate(value)
+        else:
+            return
+        for key, child in items:
+            if want == WILDCARD or want == key:
+                self._collect(child, rest[1:], (*path, key))
+
+    def _close(self, i: int) -> int:
+        frame = self._stack.pop()
+        self._resolve(frame.path)
+        self._value_done()
+        return i + 1
+
+    def _value_done(self) -> None:
+        if self._stack:
+            self._stack[-1].state = "next"
+        else:
+            self._root_done = True
+            self.done = True
+
+
+def extract_paths(chunks: Iterable[bytes], patterns: Iterable[Sequence[PathElement]]) -> dict[Path, Any]:
+    """Extract the values at ``patterns`` from a stream of JSON chunks, stopping early when possible."""
+    extractor = JsonPathExtractor(patterns)
+    for chunk in chunks:
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+    return extractor.close()
+
+
+def fetch_paths(
+    session: Session,
+    url: str,
+    patterns: Iterable[Sequence[PathElement]],
+    **kwargs: Any,
+) -> dict[Path, Any]:
+    """GET a JSON document and extract only the requested paths from the response stream.
+
+    The response is closed as soon as the extraction is complete, so the rest
+    of a large document is never read.
+    """
+    with session.stream("GET", url, **kwargs) as response:
+        response.raise_for_status()
+        return extract_paths(response.iter_bytes(), patterns)
@@ -0,0 +1,212 @@
+"""Registry and artifact mirrors with latency-based selection and failover."""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections.abc import Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any
+
+import httpx
+
+from nix_devenv_wrapper.transport import Session, borrow
+
+# Responses that mean "try another mirror" rather than "the answer is no".
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class MirrorSet:
+    """Interchangeable base URLs for one upstream, fastest healthy mirror first.
+
+    Mirrors are probed concurrently on first use. Every answered request then
+    updates an exponentially weighted moving average of that mirror's
+    latency, and a failure (connection error, timeout, 429 or 5xx) takes it
+    out of rotation for ``cooldown`` seconds. The upstream itself is always
+    the last resort unless it is listed explicitly.
+    """
+
+    def __init__(
+        self,
+        upstream: str,
+        mirrors: Sequence[str],
+        cooldown: float = 60.0,
+        alpha: float = 0.3,
+        probe_timeout: float = 5.0,
+    ):
+        self.upstream = upstream.rstrip("/")
+        bases = [mirror.rstrip("/") for mirror in mirrors]
+        self.bases = bases if self.upstream in bases else [*bases, self.upstream]
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self.probe_timeout = probe_timeout
+        self._latency: dict[str, float] = {}
+        self._down_until: dict[str, float] = {}
+        self._probed = False
+        self._lock = threading.Lock()
+
+    def owns(self, url: str) -> bool:
+        """Return True if the URL lives under this set's upstream."""
+        return url == self.upstream or url.startswith(self.upstream + "/")
+
+    def candidates(self, url: str) -> list[tuple[str, str]]:
+        """Return (mirror base, rewritten URL) pairs to try for an upstream URL, best first."""
+        suffix = url[len(self.upstream):]
+        return [(base, base + suffix) for base in self.ranked()]
+
+    def ranked(self) -> list[str]:
+        """Healthy mirrors by measured latency (configured order breaks ties), then those cooling down."""
+        self._probe_once()
+        now = time.monotonic()
+        with self._lock:
+            healthy = [base for base in self.bases if self._down_until.get(base, 0.0) <= now]
+            cooling = sorted((base for base in self.bases if base not in healthy), key=self._down_until.__getitem__)
+            healthy.sort(key=lambda base: (self._latency.get(base, math.inf), self.bases.index(base)))
+        return healthy + cooling
+
+    def record_latency(self, base: str, seconds: float) -> None:
+        """Fold a successful response time into the mirror's moving average."""
+        with self._lock:
+            previous = self._latency.get(base)
+            self._latency[base] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+            self._down_until.pop(base, None)
+
+    def record_failure(self, base: str) -> None:
+        """Take a mirror out of rotation for the cooldown period."""
+        with self._lock:
+            self._down_until[base] = time.monotonic() + self.cooldown
+
+    def probe(self) -> None:
+        """Measure every mirror with a concurrent HEAD request to its base URL."""
+        # Any HTTP answer proves the mirror is reachable; only transport errors count as failures.
+        session = borrow(timeout=self.probe_timeout)
+
+        def measure(base: str) -> None:
+            started = time.monotonic()
+            try:
+                session.head(base)
+            except httpx.TransportError:
+                self.record_failure(base)
+            else:
+                self.record_latency(base, time.monotonic() - started)
+
+        with ThreadPoolExecutor(max_workers=len(self.bases)) as executor:
+            list(executor.map(measure, self.bases))
+
+    def _probe_once(self) -> None:
+        with self._lock:
+            if self._probed or len(self.bases) < 2:
+                return
+            self._probed = True
+        self.probe()
+
+
+class MirroredSession:
+    """Session wrapper that sends requests for mirrored upstreams to the best mirror.
+
+    Requests whose URL falls under a mirror set are tried against each
+    candidate in turn; other requests pass through unchanged. Failover happens
+    before any response body is consumed, so streamed responses are safe.
+    """
+
+    def __init__(self, session: Session, mirror_sets: Sequence[MirrorSet]):
+        self._session = session
+        self._mirror_sets = list(mirror_sets)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        mirror_set, candidates = self._candidates(url)
+        for position, (base, candidate) in enumerate(candidates):
+            last = position == len(candidates) - 1
+            started = time.monotonic()
+            try:
+                response = self._session.request(method, candidate, **kwargs)
+            except httpx.TransportError:
+                if mirror_set is None or last:
+                    raise
+                mirror_set.record_failure(base)
+                continue
+            if mirror_set is not None and self._record(mirror_set, base, response, started) and not last:
+                continue
+            return response
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        mirror_set, candidates = self._candidates(url)
+        for position, (base, candidate) in enumerate(candidates):
+            last = position == len(candidates) - 1
+            started = time.monotonic()
+            with ExitStack() as stack:
+                try:
+                    response = stack.enter_context(self._session.stream(method, candidate, **kwargs))
+                except httpx.TransportError:
+                    if mirror_set is None or last:
+                        raise
+                    mirror_set.record_failure(base)
+                    continue
+                if mirror_set is not None and self._record(mirror_set, base, response, started) and not last:
+                    continue
+                yield response
+                return
+
+    def close(self) -> None:
+        self._session.close()
+
+    def _candidates(self, url: str) -> tuple[MirrorSet | None, list[tuple[str, str]]]:
+        for mirror_set in self._mirror_sets:
+            if mirror_set.owns(url):
+                return mirror_set, mirror_set.candidates(url)
+        return None, [(url, url)]
+
+    @staticmethod
+    def _record(mirror_set: MirrorSet, base: str, response: httpx.Response, started: float) -> bool:
+        """Record the outcome of a response; return True if another mirror should be tried."""
+        if response.status_code in RETRY_STATUSES:
+            mirror_set.record_failure(base)
+            return True
+        mirror_set.record_latency(base, time.monotonic() - started)
+        return False
+
+
+_mirror_sets: dict[tuple[str, tuple[str, ...]], MirrorSet] = {}
+_mirror_sets_lock = threading.Lock()
+
+
+def get_mirror_sets(mirrors: Mapping[str, Sequence[str]] | None) -> list[MirrorSet]:
+    """Return the process-wide mirror sets for a mapping of upstream base URL to mirrors.
+
+    Sets are shared per process, so latency measured by one client benefits
+    every later one.
+    """
+    sets = []
+    with _mirror_sets_lock:
+        for upstream, urls in (mirrors or {}).items():
+            key = (upstream.rstrip("/"), tuple(urls))
+            if key not in _mirror_sets:
+                _mirror_sets[key] = MirrorSet(upstream, urls)
+            sets.append(_mirror_sets[key])
+    return sets
+
+
+def mirrored(session: Session, mirrors: Mapping[str, Sequence[str]] | None) -> Session | MirroredSession:
+    """Wrap a session so requests to mirrored upstreams fail over between mirrors."""
+    mirror_sets = get_mirror_sets(mirrors)
+    return MirroredSession(session, mirror_sets) if mirror_sets else session
+
+
+def mirror_candidates(
+    url: str,
+    mirrors: Mapping[str, Sequence[str]] | None,
+) -> list[tuple[MirrorSet | None, str, str]]:
+    """Return (mirror set, mirror base, URL) candidates for fetching an upstream URL, best first."""
+    for mirror_set in get_mirror_sets(mirrors):
+        if mirror_set.owns(url):
+            return [(mirror_set, base, candidate) for base, candidate in mirror_set.candidates(url)]
+    return [(None, url, url)]
@@ -6,6 +6,9 @@ from typing import Any
 
 from pydantic import BaseModel, Field, HttpUrl
 
+# Exit status of `ndw check --exit-code` when an update is available.
+EXIT_UPDATE_AVAILABLE = 10
+
 
 class PackageRegistry(str, Enum):
     """Supported package registries."""
@@ -14,6 +17,7 @@ class PackageRegistry(str, Enum):
     PYPI = "pypi"
     CARGO = "cargo"
     GITHUB_RELEASE = "github_release"
+    LOCAL = "local"
 
 
 class RuntimeType(str, Enum):
@@ -25,12 +29,62 @@ class RuntimeType(str, Enum):
     NONE = "none"
 
 
+class NpmDependencyMode(str, Enum):
+    """How generated npm packages obtain their dependencies."""
+
+    GLOBAL_INSTALL = "global-install"
+    LOCKFILE = "lockfile"
+
+
+class PythonDistribution(str, Enum):
+    """Which PyPI distribution generated python packages install."""
+
+    SDIST = "sdist"
+    WHEEL = "wheel"
+
+
+class LocalFetchMode(str, Enum):
+    """How generated packages read artifacts of the local registry."""
+
+    PATH = "path"
+    FETCHURL = "fetchurl"
+
+
+class FlakeMode(str, Enum):
+    """Shape of the generated flake.nix."""
+
+    STANDARD = "standard"
+    FAST_EVAL = "fast-eval"
+
+
 class PackageSource(BaseModel):
     """Configuration for where to fetch the package."""
 
     registry: PackageRegistry
-    name: str = Field(..., description="Package name in the registry (e.g., @anthropic-ai/claude-code)")
-    version: str | None = Field(None, description="Specific version, or None for latest")
+    name: str = Field(
+        ...,
+        description="Package name in the registry (e.g., @anthropic-ai/claude-code); for the local registry, a "
+        "path pattern with a {version} placeholder or the path of a version manifest",
+    )
+    version: str | None = Field(
+        None,
+        description="Exact version, version constraint (npm range, PEP 440 specifier), or None for latest",
+    )
+    tag_prefix: str | None = Field(
+        None,
+        description="Only consider GitHub release tags with this prefix (e.g., release-), stripped from versions",
+    )
+    allow_downgrade: bool = Field(False, description="Allow updates that move to an older version")
+    channels: dict[str, str] = Field(
+        default_factory=dict,
+        description="Extra release channels packaged alongside the main version, mapping a channel name to an "
+        "npm dist-tag, 'prerelease' or a version constraint (e.g., next = \"next\")",
+    )
+    local_fetch: LocalFetchMode = Field(
+        LocalFetchMode.PATH,
+        description="For the local registry: read artifacts with builtins.path at evaluation time, or with "
+        "fetchurl from a file:// URL at build time",
+    )
 
     class Config:
         frozen = True
@@ -42,6 +96,22 @@ class RuntimeConfig(BaseModel):
     runtime_type: RuntimeType = Field(..., alias="type")
     nix_package: str = Field(..., description="Nix package name (e.g., nodejs_22, python312)")
     extra_packages: list[str] = Field(default_factory=list, description="Additional nix packages to include")
+    cargo_hash: str | None = Field(
+        None, description="Hash of vendored cargo dependencies, for crates that ship no Cargo.lock (rust only)"
+    )
+    npm_dependencies: NpmDependencyMode = Field(
+        NpmDependencyMode.GLOBAL_INSTALL,
+        description="npm only: 'global-install' installs the tarball in one derivation; 'lockfile' resolves a "
+        "package-lock.json so each dependency is its own fetchurl in the Nix store",
+    )
+    python_distribution: PythonDistribution = Field(
+        PythonDistribution.SDIST,
+        description="PyPI only: 'sdist' builds from source; 'wheel' installs a prebuilt wheel per system",
+    )
+    wheel_systems: list[str] = Field(
+        default_factory=lambda: ["x86_64-linux", "aarch64-linux", "x86_64-darwin", "aarch64-darwin"],
+        description="Nix systems to select wheels for (wheel mode only)",
+    )
 
     class Config:
         frozen = True
@@ -101,6 +171,16 @@ class GitHubActionsConfig(BaseModel):
         frozen = True
 
 
+class PollingConfig(BaseModel):
+    """Bounds for the adaptive interval between update checks of a fleet run."""
+
+    min_interval: float = Field(15.0, description="Minutes between checks of the most active packages")
+    max_interval: float = Field(7 * 24 * 60.0, description="Minutes between checks of dormant packages")
+
+    class Config:
+        frozen = True
+
+
 class FlakeConfig(BaseModel):
     """Complete configuration for a wrapped package flake."""
 
@@ -110,8 +190,20 @@ class FlakeConfig(BaseModel):
     meta: PackageMeta
     cachix: CachixConfig | None = None
     github_actions: GitHubActionsConfig | None = None
+    polling: PollingConfig = Field(default_factory=PollingConfig)
     flake_name: str = Field(..., description="Name for the flake (used in overlay)")
     devenv_enabled: bool = Field(True, description="Enable devenv.sh integration")
+    flake_mode: FlakeMode = Field(
+        FlakeMode.STANDARD,
+        description="'fast-eval' reuses nixpkgs.legacyPackages when the license allows, builds outputs lazily "
+        "and keeps devenv off the package evaluation path",
+    )
+    mirrors: dict[str, list[str]] = Field(
+        default_factory=dict,
+        description="Ordered mirror base URLs keyed by registry name (npm, pypi, github_release, cargo) or by the "
+        "upstream base URL they replace (e.g. a tarball host)",
+    )
+    channel: str | None = Field(None, description="Release channel this config packages (set by for_channel)")
 
     class Config:
         frozen = True
@@ -121,6 +213,20 @@ class FlakeConfig(BaseModel):
         """Get the package name for nix derivation."""
         return self.flake_name
 
+    @property
+    def package_file(self) -> str:
+        """File name of this config's package expression."""
+        return f"package-{self.channel}.nix" if self.channel else "package.nix"
+
+    def for_channel(self, channel: str) -> FlakeConfig:
+        """Return the config that packages one of ``source.channels`` as ``<flake_name>-<channel>``."""
+        if channel not in self.source.channels:
+            raise ValueError(f"Unknown channel {channel!r} for {self.source.name}")
+        source = self.source.model_copy(update={"version": self.source.channels[channel], "channels": {}})
+        return self.model_copy(
+            update={"source": source, "flake_name": f"{self.flake_name}-{channel}", "channel": channel}
+        )
+
     def to_nix_attrs(self) -> dict[str, Any]:
         """Convert to attributes suitable for nix generation."""
         return {
@@ -145,6 +251,30 @@ class VersionInfo(BaseModel):
     tarball_url: str
     sha256: str | None = None
     published_at: str | None = None
+    tag: str | None = None
+
+    class Config:
+        frozen = True
+
+
+class WheelFile(BaseModel):
+    """A published wheel selected for one Nix system."""
+
+    filename: str
+    url: str
+    sha256: str = Field(..., description="Nix base32 sha256 from the registry's published digest")
+
+    class Config:
+        frozen = True
+
+
+class PythonMetadata(BaseModel):
+    """What a Python distribution's metadata says about installing and running it."""
+
+    requires_dist: list[str] = Field(default_factory=list, description="Requirement strings from Requires-Dist")
+    console_scripts: dict[str, str] = Field(
+        default_factory=dict, description="Console script name -> module:function, from entry_points.txt"
+    )
 
     class Config:
         frozen = True
@@ -157,6 +287,46 @@ class UpdateResult(BaseModel):
     latest_version: str
     update_available: bool
     new_hash: str | None = None
+    warnings: list[str] = Field(
+        default_factory=list, description="Ways the wrapper config disagrees with the binaries of the new version"
+    )
+
+    class Config:
+        frozen = True
+
+
+class BuildResult(BaseModel):
+    """Result of verifying a wrapper with nix build."""
+
+    wrapper: str
+    success: bool
+    returncode: int | None = None
+    timed_out: bool = False
+    error: str | None = None
+    duration: float = 0.0
+    log_path: str | None = None
+    rolled_back: bool = False
+
+    class Config:
+        frozen = True
+
+
+class NpmDependency(BaseModel):
+    """A resolved npm package placed in a package-lock.json tree."""
+
+    path: str = Field(..., description="Lockfile location, e.g. node_modules/a/node_modules/b")
+    name: str
+    version: str
+    resolved: str
+    integrity: str | None = None
+    dependencies: dict[str, str] = Field(default_factory=dict)
+    optional_dependencies: dict[str, str] = Field(default_factory=dict)
+    peer_dependencies: dict[str, str] = Field(default_factory=dict, description="Required peers only")
+    optional: bool = False
+    bin: dict[str, str] | None = None
+    os: list[str] | None = None
+    cpu: list[str] | None = None
+    has_install_script: bool = False
 
     class Config:
         frozen = True
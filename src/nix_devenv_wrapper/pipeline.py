@@ -0,0 +1,179 @@
+"""Dependency-aware pipeline for generating the nix files of one or many wrappers."""
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from nix_devenv_wrapper.events import Event, EventHandler, EventType
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.generators import generate_devenv_nix, generate_flake_nix, generate_update_workflow
+from nix_devenv_wrapper.generators.workflow import WORKFLOW_PATH
+from nix_devenv_wrapper.hashing import PLACEHOLDER_HASH, PrefetchPool
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import FlakeConfig
+from nix_devenv_wrapper.updater import Updater
+
+GENERATE_TARGETS = ("package", "flake", "devenv", "workflow")
+
+
+class Pipeline:
+    """Run interdependent tasks on a thread pool, each as soon as its dependencies finish.
+
+    A task receives the results of its dependencies as positional arguments.
+    Dependencies must be added before the tasks that use them, so the graph
+    is acyclic by construction. A failed task fails its dependents with the
+    same exception without running them.
+    """
+
+    def __init__(self, max_workers: int | None = None):
+        self.max_workers = max_workers
+        self._tasks: dict[str, tuple[Callable[..., Any], tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[..., Any], *deps: str) -> str:
+        """Add a task and return its name, for use as a dependency of later tasks."""
+        if name in self._tasks:
+            raise ValueError(f"Duplicate pipeline task {name!r}")
+        unknown = [dep for dep in deps if dep not in self._tasks]
+        if unknown:
+            raise ValueError(f"Pipeline task {name!r} depends on unknown tasks: {', '.join(unknown)}")
+        self._tasks[name] = (func, deps)
+        return name
+
+    def run(self) -> dict[str, Future[Any]]:
+        """Run every task and return its finished Future, by name."""
+        futures: dict[str, Future[Any]] = {name: Future() for name in self._tasks}
+        waiting = {name: len(deps) for name, (_, deps) in self._tasks.items()}
+        dependents: dict[str, list[str]] = {name: [] for name in self._tasks}
+        for name, (_, deps) in self._tasks.items():
+            for dep in deps:
+                dependents[dep].append(name)
+        lock = threading.Lock()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline") as executor:
+
+            def start(name: str) -> None:
+                func, deps = self._tasks[name]
+                for dep in deps:
+                    if futures[dep].exception() is not None:
+                        futures[name].set_exception(futures[dep].exception())
+                        return
+                args = [futures[dep].result() for dep in deps]
+                executor.submit(execute, name, func, args)
+
+            def execute(name: str, func: Callable[..., Any], args: list[Any]) -> None:
+                try:
+                    result = func(*args)
+                except Exception as exc:  # noqa: BLE001 - delivered through the task's Future
+                    futures[name].set_exception(exc)
+                else:
+                    futures[name].set_result(result)
+
+            def finished(name: str) -> None:
+                ready = []
+                with lock:
+                    for dependent in dependents[name]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            ready.append(dependent)
+                for dependent in ready:
+                    start(dependent)
+
+            for name in self._tasks:
+                futures[name].add_done_callback(lambda _, name=name: finished(name))
+            for name, count in list(waiting.items()):
+                if count == 0:
+                    start(name)
+            # Every task's Future completes, so this also waits for work scheduled by callbacks.
+            wait(futures.values())
+        return futures
+
+
+def add_generate_tasks(
+    pipeline: Pipeline,
+    wrapper: Wrapper,
+    config: FlakeConfig,
+    targets: Sequence[str],
+    prefetch_pool: PrefetchPool | None = None,
+    history: ReleaseHistory | None = None,
+    on_event: EventHandler | None = None,
+) -> list[str]:
+    """Add the tasks that generate a wrapper's files and return the names of its final tasks.
+
+    Each package file (one per channel) is resolved, hashed and written in
+    turn; flake.nix, devenv.nix and the workflow don't depend on the version
+    or hash, so they are rendered and written while the prefetch runs. Every
+    finished or failed phase is reported to ``on_event``.
+    """
+    prefix = str(wrapper.root)
+    final = []
+    if "package" in targets:
+        updater = Updater(config, wrapper.package_nix, prefetch_pool=prefetch_pool, history=history, on_event=on_event)
+        main_resolve: tuple[str, ...] = ()
+        for package_updater in [updater, *updater.channel_updaters().values()]:
+            name = f"{prefix}:{package_updater.package_nix_path.name}"
+            # Channels wait for the main package, whose resolution fetches the shared version list.
+            resolve = pipeline.add(f"{name}:resolve", partial(_resolve, package_updater), *main_resolve)
+            main_resolve = main_resolve or (resolve,)
+            hashed = pipeline.add(f"{name}:hash", partial(_package_hash, package_updater), resolve)
+            final.append(pipeline.add(f"{name}:write", partial(_write_package, package_updater), resolve, hashed))
+
+    files: list[tuple[str, Path, Callable[[FlakeConfig], str]]] = []
+    if "flake" in targets:
+        files.append(("flake", wrapper.flake_nix, generate_flake_nix))
+    if "devenv" in targets and config.devenv_enabled:
+        files.append(("devenv", wrapper.devenv_nix, generate_devenv_nix))
+    if "workflow" in targets:
+        files.append(("workflow", wrapper.root / WORKFLOW_PATH, generate_update_workflow))
+    for label, path, generate in files:
+        final.append(pipeline.add(f"{prefix}:{label}", partial(_write_file, wrapper, path, generate, config, on_event)))
+    return final
+
+
+def _resolve(updater: Updater, *_dependencies: object) -> str:
+    with updater.reporting() as started:
+        version = updater.resolve_version()
+        updater.emit(EventType.RESOLVED, started, version=version)
+    return version
+
+
+def _package_hash(updater: Updater, version: str) -> str:
+    with updater.reporting() as started:
+        # npm lockfile and wheel modes are pinned by registry-published hashes instead.
+        sha256 = PLACEHOLDER_HASH if updater.pins_from_metadata else updater.fetch_hash(version)
+        updater.emit(EventType.HASHED, started, version=version, sha256=sha256)
+    return sha256
+
+
+def _write_package(updater: Updater, version: str, sha256: str) -> None:
+    with updater.reporting() as started:
+        paths = updater.write_package_files(version, sha256)
+        updater.emit(EventType.WRITTEN, started, version=version, paths=[str(path) for path in paths])
+
+
+def _write_file(
+    wrapper: Wrapper,
+    path: Path,
+    generate: Callable[[FlakeConfig], str],
+    config: FlakeConfig,
+    on_event: EventHandler | None,
+) -> None:
+    """Render and write a hash-independent file, reporting the outcome to ``on_event``."""
+    started = time.monotonic()
+    event = EventType.WRITTEN
+    error = None
+    try:
+        content = generate(config)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    except Exception as exc:
+        event, error = EventType.FAILED, str(exc)
+        raise
+    finally:
+        if on_event is not None:
+            duration = time.monotonic() - started
+            on_event(Event(event=event, wrapper=str(wrapper.root), paths=[str(path)], error=error, duration=duration))
@@ -0,0 +1,134 @@
+"""Reading single members of a remote zip file (e.g. a wheel) with HTTP range requests.
+
+A zip file ends with its central directory, which lists every member with
+its offset. One suffix range request fetches the end of the file; for
+wheels that usually covers the central directory and the ``.dist-info``
+files too, since they are written last. Other members cost one more range
+request each. Nothing else of the archive is transferred.
+"""
+from __future__ import annotations
+
+import re
+import struct
+import zlib
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from nix_devenv_wrapper.transport import Session
+
+# Bytes fetched from the end of the file by the first request.
+TAIL_SIZE = 16 * 1024
+
+_EOCD = b"PK\x05\x06"
+_ZIP64_LOCATOR = b"PK\x06\x07"
+_CENTRAL_ENTRY = b"PK\x01\x02"
+_LOCAL_HEADER_SIZE = 30
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class _Entry(NamedTuple):
+    method: int
+    compressed_size: int
+    offset: int
+
+
+class RemoteZip:
+    """Central directory of a remote zip file, with its members readable on demand."""
+
+    def __init__(self, session: Session, url: str, tail_size: int = TAIL_SIZE):
+        self.session = session
+        self.url = url
+        self._start, self._data, self.size = self._fetch_tail(tail_size)
+        self._entries = self._read_directory()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._entries)
+
+    def read(self, name: str) -> bytes:
+        """Return a member's uncompressed content."""
+        entry = self._entries[name]
+        # The local header's extra field can differ from the central directory's; allow for a typical one.
+        header = self._bytes(entry.offset, _LOCAL_HEADER_SIZE + len(name.encode()) + 256 + entry.compressed_size)
+        if header[:4] != b"PK\x03\x04":
+            raise ValueError(f"Corrupt zip member {name} in {self.url}")
+        name_length, extra_length = struct.unpack_from("<HH", header, 26)
+        start = _LOCAL_HEADER_SIZE + name_length + extra_length
+        data = header[start:start + entry.compressed_size]
+        if len(data) < entry.compressed_size:
+            data = self._bytes(entry.offset + start, entry.compressed_size)
+        if entry.method == 0:
+            return data
+        if entry.method == 8:
+            return zlib.decompress(data, -zlib.MAX_WBITS)
+        raise ValueError(f"Unsupported compression method {entry.method} for {name} in {self.url}")
+
+    def _fetch_tail(self, tail_size: int) -> tuple[int, bytes, int]:
+        response = self.session.get(self.url, headers={"Range": f"bytes=-{tail_size}"}, follow_redirects=True)
+        response.raise_for_status()
+        if response.status_code != 206:
+            # The server ignored the range and sent the whole file.
+            return 0, response.content, len(response.content)
+        match = _CONTENT_RANGE_RE.fullmatch(response.headers.get("Content-Range", ""))
+        if match is None:
+            raise ValueError(f"Unexpected Content-Range from {self.url}")
+        return int(match.group(1)), response.content, int(match.group(3))
+
+    def _bytes(self, start: int, length: int) -> bytes:
+        """Return ``length`` bytes at ``start`` (fewer at the end of the file), from the tail if it has them."""
+        end = min(start + length, self.size)
+        if start >= end:
+            return b""
+        if start >= self._start:
+            return self._data[start - self._start:end - self._start]
+        response = self.session.get(self.url, headers={"Range": f"bytes={start}-{end - 1}"}, follow_redirects=True)
+        response.raise_for_status()
+        if response.status_code != 206:
+            return response.content[start:end]
+        return response.content
+
+    def _read_directory(self) -> dict[str, _Entry]:
+        eocd = self._data.rfind(_EOCD)
+        if eocd < 0:
+            raise ValueError(f"No zip end of central directory in the last {len(self._data)} bytes of {self.url}")
+        directory_size, directory_offset = struct.unpack_from("<II", self._data, eocd + 12)
+        locator = eocd - 20
+        if directory_offset == 0xFFFFFFFF and locator >= 0 and self._data[locator:locator + 4] == _ZIP64_LOCATOR:
+            (zip64_offset,) = struct.unpack_from("<Q", self._data, locator + 8)
+            record = self._bytes(zip64_offset, 56)
+            directory_size, directory_offset = struct.unpack_from("<QQ", record, 40)
+
+        directory = self._bytes(directory_offset, directory_size)
+        entries: dict[str, _Entry] = {}
+        position = 0
+        while directory[position:position + 4] == _CENTRAL_ENTRY:
+            (method,) = struct.unpack_from("<H", directory, position + 10)
+            compressed_size, uncompressed_size = struct.unpack_from("<II", directory, position + 20)
+            name_length, extra_length, comment_length = struct.unpack_from("<HHH", directory, position + 28)
+            (offset,) = struct.unpack_from("<I", directory, position + 42)
+            name = directory[position + 46:position + 46 + name_length].decode("utf-8", "replace")
+            if 0xFFFFFFFF in (uncompressed_size, compressed_size, offset):
+                extra = directory[position + 46 + name_length:position + 46 + name_length + extra_length]
+                compressed_size, offset = _zip64_sizes(extra, uncompressed_size, compressed_size, offset)
+            entries[name] = _Entry(method, compressed_size, offset)
+            position += 46 + name_length + extra_length + comment_length
+        return entries
+
+
+def _zip64_sizes(extra: bytes, uncompressed_size: int, compressed_size: int, offset: int) -> tuple[int, int]:
+    """Resolve 0xFFFFFFFF placeholders from a central directory entry's zip64 extra field."""
+    position = 0
+    while position + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, position)
+        if tag == 0x0001:
+            # Only the fields that overflowed are present, in this order.
+            values = iter(struct.unpack_from(f"<{length // 8}Q", extra, position + 4))
+            if uncompressed_size == 0xFFFFFFFF:
+                next(values, None)
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = next(values, compressed_size)
+            if offset == 0xFFFFFFFF:
+                offset = next(values, offset)
+            break
+        position += 4 + length
+    return compressed_size, offset
@@ -2,8 +2,21 @@
 from __future__ import annotations
 
 from nix_devenv_wrapper.registries.base import RegistryClient
-from nix_devenv_wrapper.registries.factory import get_registry
+from nix_devenv_wrapper.registries.cargo import CargoRegistry
+from nix_devenv_wrapper.registries.factory import expand_mirrors, get_registry
+from nix_devenv_wrapper.registries.github import GitHubRegistry, TagConventions
+from nix_devenv_wrapper.registries.local import LocalRegistry
 from nix_devenv_wrapper.registries.npm import NpmRegistry
 from nix_devenv_wrapper.registries.pypi import PyPIRegistry
 
-__all__ = ["RegistryClient", "NpmRegistry", "PyPIRegistry", "get_registry"]
+__all__ = [
+    "RegistryClient",
+    "CargoRegistry",
+    "GitHubRegistry",
+    "LocalRegistry",
+    "NpmRegistry",
+    "PyPIRegistry",
+    "TagConventions",
+    "expand_mirrors",
+    "get_registry",
+]
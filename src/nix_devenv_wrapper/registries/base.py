@@ -17,6 +17,18 @@ class RegistryClient(ABC):
     def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
         """Return version info for a package."""
 
+    @abstractmethod
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        """Return info for every published version of the package."""
+
+    def list_releases(self, package_name: str) -> tuple[list[VersionInfo], dict[str, str]]:
+        """Return every published version and the registry's named channels (tag -> version).
+
+        Registries that publish channels override this to return both from a
+        single metadata fetch.
+        """
+        return self.list_versions(package_name), {}
+
     @abstractmethod
     def get_tarball_url(self, package_name: str, version: str) -> str:
         """Return tarball URL for a package version."""
@@ -0,0 +1,136 @@
+"""crates.io registry client using the sparse HTTP index."""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from collections.abc import Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any
+
+from nix_devenv_wrapper.cache import default_cache_dir
+from nix_devenv_wrapper.hashing import nix_base32
+from nix_devenv_wrapper.mirrors import mirrored
+from nix_devenv_wrapper.models import VersionInfo
+from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.transport import borrow
+from nix_devenv_wrapper.versions import ReleaseIndex, SemverScheme
+
+
+def index_path(crate: str) -> str:
+    """Return the sparse index path for a crate name."""
+    name = crate.lower()
+    if len(name) <= 2:
+        return f"{len(name)}/{name}"
+    if len(name) == 3:
+        return f"3/{name[0]}/{name}"
+    return f"{name[0:2]}/{name[2:4]}/{name}"
+
+
+class CargoRegistry(RegistryClient):
+    """Client for crates.io via the sparse index protocol.
+
+    Index files are newline-delimited JSON, one entry per published version.
+    They are streamed line by line into an on-disk cache and revalidated with
+    conditional requests (ETag / Last-Modified), so an unchanged crate costs a
+    single 304. Each entry carries the ``.crate`` sha256, which becomes the
+    nix hash directly without downloading the crate.
+    """
+
+    BASE_URL = "https://index.crates.io"
+    DOWNLOAD_URL = "https://static.crates.io/crates"
+
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        cache_dir: Path | None = None,
+        mirrors: Mapping[str, Sequence[str]] | None = None,
+    ):
+        self._client = mirrored(borrow(timeout=timeout), mirrors)
+        self._cache_dir = cache_dir or default_cache_dir("cargo-index")
+        self._entries: dict[str, list[dict[str, Any]]] = {}
+
+    def get_latest_version(self, package_name: str) -> str:
+        release = self._index(package_name).latest()
+        if release is None:
+            raise ValueError(f"No published versions found for crate {package_name}")
+        return release.version
+
+    def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
+        if version is None:
+            version = self.get_latest_version(package_name)
+        release = self._index(package_name).get(version)
+        if release is None:
+            raise ValueError(f"Crate {package_name} has no version {version}")
+        return release
+
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        return [
+            VersionInfo(
+                version=entry["vers"],
+                tarball_url=self.get_tarball_url(package_name, entry["vers"]),
+                sha256=nix_base32(bytes.fromhex(entry["cksum"])),
+                published_at=entry.get("pubtime"),
+            )
+            for entry in self._load_entries(package_name)
+            if not entry.get("yanked")
+        ]
+
+    def get_tarball_url(self, package_name: str, version: str) -> str:
+        return f"{self.DOWNLOAD_URL}/{package_name}/{package_name}-{version}.crate"
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _index(self, package_name: str) -> ReleaseIndex:
+        return ReleaseIndex(SemverScheme(), self.list_versions(package_name))
+
+    def _load_entries(self, package_name: str) -> list[dict[str, Any]]:
+        if package_name not in self._entries:
+            self._entries[package_name] = list(self._fetch_entries(package_name))
+        return self._entries[package_name]
+
+    def _fetch_entries(self, package_name: str) -> Iterator[dict[str, Any]]:
+        path = index_path(package_name)
+        body_path = self._cache_dir / path
+        meta_path = body_path.with_name(body_path.name + ".meta.json")
+
+        headers: dict[str, str] = {}
+        if body_path.exists() and meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self._client.stream("GET", f"{self.BASE_URL}/{path}", headers=headers) as response:
+            if response.status_code == 304:
+                yield from self._read_cached(body_path)
+                return
+            if response.status_code == 404:
+                raise ValueError(f"Crate {package_name} not found in the crates.io index")
+            response.raise_for_status()
+
+            body_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=body_path.parent, prefix=f".{body_path.name}.")
+            with os.fdopen(fd, "w") as cache:
+                for line in response.iter_lines():
+                    if not line.strip():
+                        continue
+                    cache.write(line + "\n")
+                    yield json.loads(line)
+            os.replace(tmp, body_path)
+            meta_path.write_text(
+                json.dumps(
+                    {
+                        "etag": response.headers.get("etag"),
+                        "last_modified": response.headers.get("last-modified"),
+                    }
+                )
+            )
+
+    def _read_cached(self, body_path: Path) -> Iterator[dict[str, Any]]:
+        with body_path.open() as cache:
+            for line in cache:
+                if line.strip():
+                    yield json.loads(line)
@@ -1,21 +1,49 @@
 """Registry factory utilities."""
 from __future__ import annotations
 
+from collections.abc import Mapping, Sequence
+
 from nix_devenv_wrapper.models import PackageRegistry
 from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.registries.cargo import CargoRegistry
 from nix_devenv_wrapper.registries.github import GitHubRegistry
+from nix_devenv_wrapper.registries.local import LocalRegistry
 from nix_devenv_wrapper.registries.npm import NpmRegistry
 from nix_devenv_wrapper.registries.pypi import PyPIRegistry
 
+# Upstream base URL that a registry name stands for in the [mirrors] table.
+REGISTRY_UPSTREAMS: dict[PackageRegistry, str] = {
+    PackageRegistry.NPM: NpmRegistry.BASE_URL,
+    PackageRegistry.PYPI: PyPIRegistry.BASE_URL,
+    PackageRegistry.GITHUB_RELEASE: GitHubRegistry.BASE_URL,
+    PackageRegistry.CARGO: CargoRegistry.BASE_URL,
+}
+
+
+def expand_mirrors(mirrors: Mapping[str, Sequence[str]]) -> dict[str, list[str]]:
+    """Key a [mirrors] table by upstream base URL, resolving registry names (e.g. ``npm``)."""
+    registries = {registry.value: upstream for registry, upstream in REGISTRY_UPSTREAMS.items()}
+    return {registries.get(key, key): list(urls) for key, urls in mirrors.items()}
+
+
+def get_registry(
+    registry_type: PackageRegistry,
+    mirrors: Mapping[str, Sequence[str]] | None = None,
+) -> RegistryClient:
+    """Return a registry client for the given registry type.
 
-def get_registry(registry_type: PackageRegistry) -> RegistryClient:
-    """Return a registry client for the given registry type."""
+    ``mirrors`` maps upstream base URLs to ordered mirror base URLs.
+    """
     match registry_type:
         case PackageRegistry.NPM:
-            return NpmRegistry()
+            return NpmRegistry(mirrors=mirrors)
         case PackageRegistry.PYPI:
-            return PyPIRegistry()
+            return PyPIRegistry(mirrors=mirrors)
         case PackageRegistry.GITHUB_RELEASE:
-            return GitHubRegistry()
+            return GitHubRegistry(mirrors=mirrors)
+        case PackageRegistry.CARGO:
+            return CargoRegistry(mirrors=mirrors)
+        case PackageRegistry.LOCAL:
+            return LocalRegistry(mirrors=mirrors)
         case _:
             raise NotImplementedError(f"Registry {registry_type} not yet implemented")
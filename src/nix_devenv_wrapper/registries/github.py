@@ -1,29 +1,135 @@
 """GitHub releases registry client."""
 from __future__ import annotations
 
-import httpx
+import json
+import os
+import re
+import tempfile
+import threading
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any
 
+from nix_devenv_wrapper.cache import default_cache_dir
+from nix_devenv_wrapper.jsonstream import WILDCARD, fetch_paths
+from nix_devenv_wrapper.mirrors import mirrored
 from nix_devenv_wrapper.models import VersionInfo
 from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.transport import borrow
+
+# Placeholder for the version in a tag template, e.g. "release-{version}".
+VERSION_FIELD = "{version}"
+
+# Templates preferred when several tags embed the same version.
+_COMMON_TEMPLATES = ("v{version}", "{version}")
+
+# Splits a tag into a non-numeric prefix and the version that follows it.
+_TAG_RE = re.compile(r"^(?P<prefix>\D*?)(?P<version>\d.*)$")
+
+
+def tag_template(tag: str, version: str) -> str | None:
+    """Return the template that renders ``version`` as ``tag``, or None if the tag doesn't embed it.
+
+    The version must stand alone: ``v1.2`` is not a tag of ``1.2`` if it is
+    followed by ``.3``, and ``v12.3`` is not a tag of ``2.3``.
+    """
+    start = tag.find(version)
+    while start >= 0:
+        prefix, suffix = tag[:start], tag[start + len(version):]
+        if not (prefix[-1:].isdigit() or prefix.endswith(".")) and not (suffix and suffix[0] in "0123456789.+-"):
+            return f"{prefix}{VERSION_FIELD}{suffix}"
+        start = tag.find(version, start + 1)
+    return None
+
+
+def render_tag(template: str, version: str) -> str:
+    """Render a tag template for a version."""
+    return template.replace(VERSION_FIELD, version)
+
+
+def parse_tag(template: str, tag: str) -> str | None:
+    """Return the version a tag encodes under a template, or None if it doesn't follow it."""
+    prefix, _, suffix = template.partition(VERSION_FIELD)
+    if len(tag) > len(prefix) + len(suffix) and tag.startswith(prefix) and tag.endswith(suffix):
+        return tag[len(prefix): len(tag) - len(suffix)]
+    return None
+
+
+class TagConventions:
+    """Persistent record of each repository's tag template.
+
+    Stored as one JSON file; writes merge with what is on disk and replace it
+    atomically, so concurrent processes don't lose each other's entries.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or default_cache_dir("github-tag-conventions.json")
+        self._lock = threading.Lock()
+        self._templates = self._read()
+
+    def get(self, repository: str) -> str | None:
+        with self._lock:
+            return self._templates.get(repository)
+
+    def put(self, repository: str, template: str) -> None:
+        with self._lock:
+            if self._templates.get(repository) == template:
+                return
+            self._templates = {**self._read(), repository: template}
+            self._write()
+
+    def forget(self, repository: str) -> None:
+        with self._lock:
+            self._templates = {key: value for key, value in self._read().items() if key != repository}
+            self._write()
+
+    def _read(self) -> dict[str, str]:
+        try:
+            data: Any = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return {str(key): str(value) for key, value in data.items()} if isinstance(data, dict) else {}
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(self._templates, handle, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
 
 
 class GitHubRegistry(RegistryClient):
-    """Client for GitHub releases."""
+    """Client for GitHub releases.
+
+    Each repository's tag convention (``v1.2.3``, ``1.2.3``, ``release-1.2``,
+    ...) is learned once, from the latest release or a single matching-refs
+    lookup, and remembered in ``TagConventions``, so later lookups go straight
+    to the right tag.
+    """
 
     BASE_URL = "https://api.github.com"
 
-    def __init__(self, timeout: float = 30.0, token: str | None = None):
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        token: str | None = None,
+        mirrors: Mapping[str, Sequence[str]] | None = None,
+        conventions: TagConventions | None = None,
+    ):
         """
         Initialize GitHub registry client.
 
         Args:
             timeout: Request timeout in seconds
             token: Optional GitHub personal access token for higher rate limits
+            mirrors: Mirror base URLs keyed by the upstream base URL they replace
+            conventions: Tag convention store (default: the shared on-disk cache)
         """
         headers = {"Accept": "application/vnd.github+json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
-        self._client = httpx.Client(timeout=timeout, headers=headers)
+        self._client = mirrored(borrow(headers=headers, timeout=timeout), mirrors)
+        self.conventions = conventions or TagConventions()
 
     def _parse_repo(self, package_name: str) -> tuple[str, str]:
         """Parse owner/repo from package name."""
@@ -35,47 +141,145 @@ class GitHubRegistry(RegistryClient):
     def get_latest_version(self, package_name: str) -> str:
         """Get the latest release version from GitHub."""
         owner, repo = self._parse_repo(package_name)
-        response = self._client.get(f"{self.BASE_URL}/repos/{owner}/{repo}/releases/latest")
-        response.raise_for_status()
-        data = response.json()
-        # GitHub tags often have a 'v' prefix, strip it for consistency
-        tag = data["tag_name"]
-        return tag.lstrip("v")
+        values = fetch_paths(self._client, f"{self.BASE_URL}/repos/{owner}/{repo}/releases/latest", [("tag_name",)])
+        return self._version_from_tag(package_name, values[("tag_name",)])
 
     def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
-        """Get version info for a specific release."""
+        """Get version info for a specific release, or the latest one."""
         owner, repo = self._parse_repo(package_name)
 
         if version is None:
-            version = self.get_latest_version(package_name)
-
-        # Try with and without 'v' prefix
-        tag = f"v{version}" if not version.startswith("v") else version
+            response = self._client.get(f"{self.BASE_URL}/repos/{owner}/{repo}/releases/latest")
+            response.raise_for_status()
+            data = response.json()
+            return self._release_info(owner, repo, self._version_from_tag(package_name, data["tag_name"]), data)
 
+        known = self.conventions.get(package_name) is not None
+        tag = self.tag_for(package_name, version)
         response = self._client.get(f"{self.BASE_URL}/repos/{owner}/{repo}/releases/tags/{tag}")
-        if response.status_code == 404:
-            # Try without 'v' prefix
-            tag = version.lstrip("v")
+        if response.status_code == 404 and known:
+            # The repository changed its convention; learn it again.
+            self.conventions.forget(package_name)
+            tag = self.tag_for(package_name, version)
             response = self._client.get(f"{self.BASE_URL}/repos/{owner}/{repo}/releases/tags/{tag}")
 
         response.raise_for_status()
-        data = response.json()
+        return self._release_info(owner, repo, version, response.json())
 
+    def _release_info(self, owner: str, repo: str, version: str, data: dict[str, Any]) -> VersionInfo:
+        tag = data["tag_name"]
         # Get tarball URL from the release
         tarball_url = data.get("tarball_url") or f"https://github.com/{owner}/{repo}/archive/refs/tags/{tag}.tar.gz"
-
         return VersionInfo(
-            version=version.lstrip("v"),
+            version=version,
             tarball_url=tarball_url,
             published_at=data.get("published_at"),
+            tag=tag,
+        )
+
+    def tag_template(self, package_name: str, version: str | None = None) -> str:
+        """Return the repository's tag template, learning it with one matching-refs lookup if unknown.
+
+        ``version`` is a published version used to recognise the convention;
+        without it the latest release's tag is used.
+        """
+        template = self.conventions.get(package_name)
+        if template is not None:
+            return template
+        if version is None:
+            self.get_latest_version(package_name)
+            template = self.conventions.get(package_name)
+            if template is None:
+                raise ValueError(f"Could not infer the tag convention of {package_name}")
+            return template
+
+        owner, repo = self._parse_repo(package_name)
+        values = fetch_paths(
+            self._client, f"{self.BASE_URL}/repos/{owner}/{repo}/git/matching-refs/tags", [(WILDCARD, "ref")]
         )
+        templates = {
+            template
+            for ref in values.values()
+            if (template := tag_template(ref.removeprefix("refs/tags/"), version)) is not None
+        }
+        if not templates:
+            raise ValueError(f"No tag of {package_name} matches version {version}")
+        template = next((common for common in _COMMON_TEMPLATES if common in templates), min(templates, key=len))
+        self.conventions.put(package_name, template)
+        return template
+
+    def tag_for(self, package_name: str, version: str) -> str:
+        """Return the tag of a version under the repository's convention."""
+        return render_tag(self.tag_template(package_name, version), version)
+
+    def _version_from_tag(self, package_name: str, tag: str, relearn: bool = True) -> str:
+        """Return the version of a tag under the repository's convention.
+
+        A tag that doesn't follow the known convention is split at its first
+        digit; with ``relearn`` (the tag is the newest one) or no known
+        convention, that split becomes the convention.
+        """
+        template = self.conventions.get(package_name)
+        if template is not None:
+            version = parse_tag(template, tag)
+            if version is not None:
+                return version
+        match = _TAG_RE.match(tag)
+        if match is None:
+            return tag
+        if relearn or template is None:
+            self.conventions.put(package_name, f"{match.group('prefix')}{VERSION_FIELD}")
+        return match.group("version")
+
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        """List all published (non-draft) releases."""
+        return self.list_releases(package_name)[0]
+
+    def list_releases(self, package_name: str) -> tuple[list[VersionInfo], dict[str, str]]:
+        """List all published (non-draft) releases.
+
+        The ``latest`` tag is the newest release not marked as a pre-release,
+        so pre-releases with plain version tags stay off the stable channel.
+        """
+        owner, repo = self._parse_repo(package_name)
+        releases = []
+        tags: dict[str, str] = {}
+        page = 1
+        while True:
+            # Release bodies and asset lists are skipped in the stream, never parsed.
+            values = fetch_paths(
+                self._client,
+                f"{self.BASE_URL}/repos/{owner}/{repo}/releases",
+                [(WILDCARD, "tag_name"), (WILDCARD, "draft"), (WILDCARD, "prerelease"), (WILDCARD, "published_at")],
+                params={"per_page": 100, "page": page},
+            )
+            tag_names = {path[0]: tag for path, tag in values.items() if path[1] == "tag_name"}
+            for index, tag in tag_names.items():
+                if values.get((index, "draft")):
+                    continue
+                # The newest release teaches the convention when none is known yet.
+                version = self._version_from_tag(package_name, tag, relearn=False)
+                # Releases are listed newest first.
+                if "latest" not in tags and not values.get((index, "prerelease")):
+                    tags["latest"] = version
+                releases.append(
+                    VersionInfo(
+                        version=version,
+                        tarball_url=f"https://github.com/{owner}/{repo}/archive/refs/tags/{tag}.tar.gz",
+                        published_at=values.get((index, "published_at")),
+                        tag=tag,
+                    )
+                )
+            if len(tag_names) < 100:
+                return releases, tags
+            page += 1
 
     def get_tarball_url(self, package_name: str, version: str) -> str:
         """Get tarball URL for a specific version."""
         owner, repo = self._parse_repo(package_name)
-        tag = f"v{version}" if not version.startswith("v") else version
+        tag = self.tag_for(package_name, version)
         return f"https://github.com/{owner}/{repo}/archive/refs/tags/{tag}.tar.gz"
 
     def close(self) -> None:
-        """Close the HTTP client."""
+        """Release the HTTP session."""
         self._client.close()
@@ -0,0 +1,132 @@
+"""Registry client for artifacts on a local disk or network share."""
+from __future__ import annotations
+
+import json
+import os
+import re
+import tomllib
+from collections.abc import Mapping, Sequence
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from nix_devenv_wrapper.hashing import FileHashCache
+from nix_devenv_wrapper.models import VersionInfo
+from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.versions import ReleaseIndex, SemverScheme
+
+VERSION_FIELD = "{version}"
+
+
+class LocalRegistry(RegistryClient):
+    """Versions of artifacts in a directory, found by filename pattern or listed in a manifest.
+
+    The package name is either a path whose last component contains
+    ``{version}`` (e.g. ``/srv/builds/mytool-{version}.tar.gz``) or the path
+    of a JSON or TOML manifest mapping versions to artifact paths (relative
+    to the manifest), optionally under a ``versions`` key. File modification
+    times stand in for publish times. Artifacts are hashed in-process through
+    a ``FileHashCache``, so unchanged files are never read twice.
+    """
+
+    def __init__(
+        self,
+        hash_cache: FileHashCache | None = None,
+        mirrors: Mapping[str, Sequence[str]] | None = None,
+    ):
+        """
+        Initialize the local registry.
+
+        Args:
+            hash_cache: Hash cache keyed by mtime and size (default: the shared on-disk cache)
+            mirrors: Accepted for a uniform registry interface; local artifacts have no mirrors
+        """
+        self.hash_cache = hash_cache or FileHashCache()
+
+    def get_latest_version(self, package_name: str) -> str:
+        release = self._index(package_name).latest()
+        if release is None:
+            raise ValueError(f"No artifacts found for {package_name}")
+        return release.version
+
+    def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
+        """Return a version's artifact with its nix hash (read only if the file changed)."""
+        if version is None:
+            version = self.get_latest_version(package_name)
+        path = self.artifact_path(package_name, version)
+        if not path.is_file():
+            raise ValueError(f"{package_name} has no version {version}")
+        return VersionInfo(
+            version=version,
+            tarball_url=path.as_uri(),
+            sha256=self.hash_cache.nix_hash(path),
+            published_at=_mtime(path.stat().st_mtime),
+        )
+
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        return [
+            VersionInfo(version=version, tarball_url=path.as_uri(), published_at=_mtime(mtime))
+            for version, (path, mtime) in self._artifacts(package_name).items()
+        ]
+
+    def get_tarball_url(self, package_name: str, version: str) -> str:
+        return self.artifact_path(package_name, version).as_uri()
+
+    def artifact_path(self, package_name: str, version: str) -> Path:
+        return artifact_path(package_name, version)
+
+    def close(self) -> None:
+        pass
+
+    def _index(self, package_name: str) -> ReleaseIndex:
+        return ReleaseIndex(SemverScheme(loose=True), self.list_versions(package_name))
+
+    def _artifacts(self, package_name: str) -> dict[str, tuple[Path, float]]:
+        """Return version -> (absolute path, mtime) for every existing artifact."""
+        if VERSION_FIELD not in package_name:
+            artifacts = {}
+            for version, relative in _read_manifest(Path(package_name)).items():
+                path = (Path(package_name).parent / relative).absolute()
+                try:
+                    artifacts[version] = (path, path.stat().st_mtime)
+                except FileNotFoundError:
+                    continue
+            return artifacts
+
+        directory, filename = os.path.split(os.path.abspath(package_name))
+        if VERSION_FIELD in directory:
+            raise ValueError(f"Only the file name may contain {VERSION_FIELD}: {package_name}")
+        prefix, _, suffix = filename.partition(VERSION_FIELD)
+        pattern = re.compile(f"{re.escape(prefix)}(?P<version>\\d.*?){re.escape(suffix)}")
+        artifacts = {}
+        # scandir reads names and stat results in one pass, which matters on network filesystems.
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                match = pattern.fullmatch(entry.name)
+                if match and entry.is_file():
+                    artifacts[match.group("version")] = (Path(entry.path), entry.stat().st_mtime)
+        return artifacts
+
+
+def artifact_path(package_name: str, version: str) -> Path:
+    """Return the absolute path of a version's artifact, from its filename pattern or manifest."""
+    if VERSION_FIELD in package_name:
+        return Path(package_name.replace(VERSION_FIELD, version)).absolute()
+    manifest = _read_manifest(Path(package_name))
+    if version not in manifest:
+        raise ValueError(f"{package_name} lists no version {version}")
+    return (Path(package_name).parent / manifest[version]).absolute()
+
+
+def _read_manifest(path: Path) -> dict[str, str]:
+    text = path.read_text()
+    data: Any = tomllib.loads(text) if path.suffix == ".toml" else json.loads(text)
+    if isinstance(data, dict) and isinstance(data.get("versions"), dict):
+        data = data["versions"]
+    if not isinstance(data, dict):
+        raise ValueError(f"Manifest {path} must map versions to artifact paths")
+    return {str(version): str(relative) for version, relative in data.items()}
+
+
+def _mtime(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
@@ -1,10 +1,19 @@
 """npm registry client."""
 from __future__ import annotations
 
-import httpx
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 
-from nix_devenv_wrapper.models import VersionInfo
+from nix_devenv_wrapper.jsonstream import WILDCARD, fetch_paths
+from nix_devenv_wrapper.mirrors import mirrored
+from nix_devenv_wrapper.models import NpmDependency, VersionInfo
 from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.transport import borrow
+from nix_devenv_wrapper.versions import ReleaseIndex, SemverScheme
+
+# Abbreviated ("corgi") packuments carry everything needed for installs and are much smaller.
+INSTALL_ACCEPT = "application/vnd.npm.install-v1+json; q=1.0, application/json; q=0.8, */*"
 
 
 class NpmRegistry(RegistryClient):
@@ -12,14 +21,12 @@ class NpmRegistry(RegistryClient):
 
     BASE_URL = "https://registry.npmjs.org"
 
-    def __init__(self, timeout: float = 30.0):
-        self._client = httpx.Client(timeout=timeout)
+    def __init__(self, timeout: float = 30.0, mirrors: Mapping[str, Sequence[str]] | None = None):
+        self._client = mirrored(borrow(timeout=timeout), mirrors)
 
     def get_latest_version(self, package_name: str) -> str:
-        response = self._client.get(f"{self.BASE_URL}/{package_name}")
-        response.raise_for_status()
-        data = response.json()
-        return data["dist-tags"]["latest"]
+        values = fetch_paths(self._client, f"{self.BASE_URL}/{package_name}", [("dist-tags", "latest")])
+        return values[("dist-tags", "latest")]
 
     def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
         if version is None:
@@ -33,6 +40,109 @@ class NpmRegistry(RegistryClient):
             published_at=data.get("time", {}).get(version),
         )
 
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        return self.list_releases(package_name)[0]
+
+    def list_releases(self, package_name: str) -> tuple[list[VersionInfo], dict[str, str]]:
+        """Return every version and the dist-tags from one packument fetch."""
+        values = fetch_paths(
+            self._client,
+            f"{self.BASE_URL}/{package_name}",
+            [("dist-tags", WILDCARD), ("versions", WILDCARD, "dist", "tarball"), ("time", WILDCARD)],
+        )
+        releases = [
+            VersionInfo(
+                version=path[1],
+                tarball_url=tarball,
+                published_at=values.get(("time", path[1])),
+            )
+            for path, tarball in values.items()
+            if path[0] == "versions"
+        ]
+        tags = {path[1]: version for path, version in values.items() if path[0] == "dist-tags"}
+        return releases, tags
+
+    def resolve_dependency_tree(self, package_name: str, version: str, max_workers: int = 16) -> list[NpmDependency]:
+        """Resolve the installed tree of a package version, as package-lock.json entries.
+
+        Ranges are resolved like npm does (dist-tag ``latest`` when it
+        satisfies the range, else the highest matching version) and packages
+        are hoisted to the shallowest ``node_modules`` where they neither
+        conflict with a package of the same name nor change what an already
+        placed package resolves that name to. The package itself is included
+        at ``node_modules/<name>``.
+        """
+        scheme = SemverScheme()
+        packuments: dict[str, dict[str, Any]] = {}
+        indexes: dict[str, ReleaseIndex] = {}
+        nodes: dict[str, NpmDependency] = {}
+        # Install name -> placed packages that depend on it, for the shadowing check.
+        dependents: dict[str, list[NpmDependency]] = {}
+        # (parent lockfile path, requesting package path, install name, real package name, range, optional)
+        queue: list[tuple[str, str, str, str, str, bool]] = [("", "", package_name, package_name, version, False)]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while queue:
+                missing = sorted({entry[3] for entry in queue} - packuments.keys())
+                packuments.update(zip(missing, executor.map(self._abbreviated_packument, missing)))
+
+                next_queue: list[tuple[str, str, str, str, str, bool]] = []
+                for parent, requester, install_name, real_name, spec, optional in queue:
+                    manifest = self._select(real_name, spec, packuments[real_name], indexes, scheme)
+                    path = _place(
+                        nodes, dependents, parent, requester, install_name, real_name, spec, manifest["version"]
+                    )
+                    if path is None:
+                        continue
+                    node = nodes[path] = _lock_entry(path, real_name, manifest, optional)
+                    for dep in _edges(node):
+                        dependents.setdefault(dep, []).append(node)
+                    for dep, dep_spec in node.dependencies.items():
+                        next_queue.append((path, path, dep, *_parse_spec(dep, dep_spec), optional))
+                    for dep, dep_spec in node.optional_dependencies.items():
+                        next_queue.append((path, path, dep, *_parse_spec(dep, dep_spec), True))
+                    # npm >= 7 installs required peers next to the package that needs them.
+                    for dep, dep_spec in node.peer_dependencies.items():
+                        next_queue.append((_parent_level(path), path, dep, *_parse_spec(dep, dep_spec), optional))
+                queue = next_queue
+
+        return [nodes[path] for path in sorted(nodes)]
+
+    def _abbreviated_packument(self, package_name: str) -> dict[str, Any]:
+        response = self._client.get(f"{self.BASE_URL}/{package_name}", headers={"Accept": INSTALL_ACCEPT})
+        response.raise_for_status()
+        data: dict[str, Any] = response.json()
+        return data
+
+    def _select(
+        self,
+        package_name: str,
+        spec: str,
+        packument: dict[str, Any],
+        indexes: dict[str, ReleaseIndex],
+        scheme: SemverScheme,
+    ) -> dict[str, Any]:
+        versions: dict[str, dict[str, Any]] = packument.get("versions", {})
+        tags: dict[str, str] = packument.get("dist-tags", {})
+        if spec in tags:
+            return versions[tags[spec]]
+        if spec in versions:
+            return versions[spec]
+
+        latest = tags.get("latest")
+        if latest in versions and scheme.parse_constraint(spec or "*").matches(latest):
+            return versions[latest]
+
+        if package_name not in indexes:
+            indexes[package_name] = ReleaseIndex(
+                scheme,
+                [VersionInfo(version=v, tarball_url=m["dist"]["tarball"]) for v, m in versions.items()],
+            )
+        release = indexes[package_name].best_match(spec or "*")
+        if release is None:
+            raise ValueError(f"No version of {package_name} satisfies {spec!r}")
+        return versions[release.version]
+
     def get_tarball_url(self, package_name: str, version: str) -> str:
         if package_name.startswith("@"):
             scope, name = package_name.split("/", 1)
@@ -41,3 +151,163 @@ class NpmRegistry(RegistryClient):
 
     def close(self) -> None:
         self._client.close()
+
+
+def _parse_spec(install_name: str, spec: str) -> tuple[str, str]:
+    """Split a dependency spec into (real package name, range), resolving npm: aliases."""
+    if spec.startswith("npm:"):
+        target = spec[len("npm:"):]
+        at = target.rfind("@")
+        if at > 0:
+            return target[:at], target[at + 1:]
+        return target, "*"
+    if spec.startswith(("git", "http:", "https:", "file:", "link:")) or ("/" in spec and not spec.startswith("@")):
+        raise ValueError(f"Unsupported dependency spec for {install_name}: {spec!r}")
+    return install_name, spec
+
+
+def _parent_level(path: str) -> str:
+    """Return the lockfile path whose node_modules contains ``path``."""
+    return path.rpartition("/node_modules/")[0]
+
+
+def _child(level: str, install_name: str) -> str:
+    return f"{level}/node_modules/{install_name}" if level else f"node_modules/{install_name}"
+
+
+def _edges(node: NpmDependency) -> dict[str, str]:
+    return {**node.dependencies, **node.optional_dependencies, **node.peer_dependencies}
+
+
+def _in_range(version_range: str, version: str) -> bool:
+    """Return True if a version satisfies a range; dist-tags and other non-ranges only match exactly."""
+    if version_range == version:
+        return True
+    try:
+        return SemverScheme().parse_constraint(version_range or "*").matches(version)
+    except ValueError:
+        return False
+
+
+def _satisfies(install_name: str, spec: str, real_name: str, version: str) -> bool:
+    """Return True if ``real_name@version`` satisfies a manifest dependency spec."""
+    try:
+        name, version_range = _parse_spec(install_name, spec)
+    except ValueError:
+        return False
+    return name == real_name and _in_range(version_range, version)
+
+
+def _resolves_to(nodes: dict[str, NpmDependency], path: str, install_name: str) -> str | None:
+    """Return the lockfile path Node's module resolution finds ``install_name`` at from ``path``."""
+    level = path
+    while True:
+        location = _child(level, install_name)
+        if location in nodes:
+            return location
+        if not level:
+            return None
+        level = _parent_level(level)
+
+
+def _shadows(
+    nodes: dict[str, NpmDependency],
+    dependents: dict[str, list[NpmDependency]],
+    level: str,
+    install_name: str,
+    real_name: str,
+    version: str,
+) -> bool:
+    """Return True if placing a package at ``level`` would break a placed package's dependency on it.
+
+    That is npm's canPlace check: the package owning ``level`` must accept the
+    new version, and so must every package below it that currently resolves
+    the name to an accepted copy above ``level``, since the new one would
+    hide it.
+    """
+    location = _child(level, install_name)
+    inside = f"{level}/node_modules/" if level else "node_modules/"
+    for dependent in dependents.get(install_name, []):
+        spec = _edges(dependent)[install_name]
+        if dependent.path != level:
+            if not dependent.path.startswith(inside):
+                continue
+            resolved = _resolves_to(nodes, dependent.path, install_name)
+            # Unaffected when a closer copy wins. Edges that don't resolve to an
+            # accepted version yet are still queued and nest themselves when placed.
+            if resolved is None or len(resolved) > len(location):
+                continue
+            if not _satisfies(install_name, spec, nodes[resolved].name, nodes[resolved].version):
+                continue
+        if not _satisfies(install_name, spec, real_name, version):
+            return True
+    return False
+
+
+def _place(
+    nodes: dict[str, NpmDependency],
+    dependents: dict[str, list[NpmDependency]],
+    parent: str,
+    requester: str,
+    install_name: str,
+    real_name: str,
+    spec: str,
+    version: str,
+) -> str | None:
+    """Pick the lockfile path for a dependency, or None if the copy it already resolves to satisfies it.
+
+    The package is hoisted from ``parent`` towards the root until a
+    conflicting package of the same name, or a placement that would shadow
+    another package's dependency, stops it. If it can't be placed even at
+    ``parent`` it is nested under the ``requester``.
+    """
+    level = parent
+    target: str | None = None
+    while True:
+        location = _child(level, install_name)
+        existing = nodes.get(location)
+        if existing is not None:
+            if existing.name == real_name and (existing.version == version or _in_range(spec, existing.version)):
+                return None
+            break
+        if _shadows(nodes, dependents, level, install_name, real_name, version):
+            break
+        target = location
+        if not level:
+            break
+        level = _parent_level(level)
+    if target is not None:
+        return target
+    nested = _child(requester, install_name)
+    if nested in nodes:
+        raise ValueError(
+            f"Cannot place {real_name}@{version} for {requester or 'the root package'}: "
+            f"{nodes[nested].name}@{nodes[nested].version} is already installed there"
+        )
+    return nested
+
+
+def _lock_entry(path: str, package_name: str, manifest: dict[str, Any], optional: bool) -> NpmDependency:
+    dist = manifest.get("dist", {})
+    bin_field = manifest.get("bin")
+    if isinstance(bin_field, str):
+        bin_field = {package_name.rsplit("/", 1)[-1]: bin_field}
+    return NpmDependency(
+        path=path,
+        name=package_name,
+        version=manifest["version"],
+        resolved=dist["tarball"],
+        integrity=dist.get("integrity"),
+        dependencies=manifest.get("dependencies", {}),
+        optional_dependencies=manifest.get("optionalDependencies", {}),
+        peer_dependencies={
+            dep: dep_spec
+            for dep, dep_spec in manifest.get("peerDependencies", {}).items()
+            if not manifest.get("peerDependenciesMeta", {}).get(dep, {}).get("optional")
+        },
+        optional=optional,
+        bin=bin_field or None,
+        os=manifest.get("os"),
+        cpu=manifest.get("cpu"),
+        has_install_script=bool(manifest.get("hasInstallScript")),
+    )
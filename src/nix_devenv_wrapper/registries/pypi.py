@@ -1,10 +1,28 @@
 """PyPI registry client."""
 from __future__ import annotations
 
+import configparser
+import re
+from collections.abc import Mapping, Sequence
+from email.parser import HeaderParser
+from typing import Any
+
 import httpx
 
-from nix_devenv_wrapper.models import VersionInfo
+from nix_devenv_wrapper.hashing import nix_base32
+from nix_devenv_wrapper.jsonstream import WILDCARD, fetch_paths
+from nix_devenv_wrapper.mirrors import mirrored
+from nix_devenv_wrapper.models import PythonMetadata, VersionInfo, WheelFile
+from nix_devenv_wrapper.rangezip import RemoteZip
 from nix_devenv_wrapper.registries.base import RegistryClient
+from nix_devenv_wrapper.transport import borrow
+
+
+# Per-file fields read when listing releases.
+_RELEASE_FILE_FIELDS = ("packagetype", "url", "yanked", "upload_time_iso_8601")
+
+_DIST_INFO_METADATA_RE = re.compile(r"[^/]+\.dist-info/METADATA")
+_DIST_INFO_ENTRY_POINTS_RE = re.compile(r"[^/]+\.dist-info/entry_points\.txt")
 
 
 class PyPIRegistry(RegistryClient):
@@ -12,13 +30,12 @@ class PyPIRegistry(RegistryClient):
 
     BASE_URL = "https://pypi.org/pypi"
 
-    def __init__(self, timeout: float = 30.0):
-        self._client = httpx.Client(timeout=timeout)
+    def __init__(self, timeout: float = 30.0, mirrors: Mapping[str, Sequence[str]] | None = None):
+        self._client = mirrored(borrow(timeout=timeout), mirrors)
 
     def get_latest_version(self, package_name: str) -> str:
-        response = self._client.get(f"{self.BASE_URL}/{package_name}/json")
-        response.raise_for_status()
-        return response.json()["info"]["version"]
+        values = fetch_paths(self._client, f"{self.BASE_URL}/{package_name}/json", [("info", "version")])
+        return values[("info", "version")]
 
     def get_version_info(self, package_name: str, version: str | None = None) -> VersionInfo:
         if version is None:
@@ -36,9 +53,95 @@ class PyPIRegistry(RegistryClient):
             published_at=sdist.get("upload_time_iso_8601"),
         )
 
+    def list_versions(self, package_name: str) -> list[VersionInfo]:
+        values = fetch_paths(
+            self._client,
+            f"{self.BASE_URL}/{package_name}/json",
+            [("releases", WILDCARD, WILDCARD, field) for field in _RELEASE_FILE_FIELDS],
+        )
+        by_version: dict[str, dict[int, dict[str, Any]]] = {}
+        for (_, version, index, field), value in values.items():
+            by_version.setdefault(version, {}).setdefault(index, {})[field] = value
+
+        releases = []
+        for version, indexed in by_version.items():
+            files = [item for _, item in sorted(indexed.items()) if not item.get("yanked")]
+            if not files:
+                continue
+            sdist = next((item for item in files if item.get("packagetype") == "sdist"), files[0])
+            releases.append(
+                VersionInfo(
+                    version=version,
+                    tarball_url=sdist["url"],
+                    published_at=sdist.get("upload_time_iso_8601"),
+                )
+            )
+        return releases
+
+    def list_wheels(self, package_name: str, version: str) -> list[WheelFile]:
+        """List the non-yanked wheels of a version with their published sha256 digests."""
+        response = self._client.get(f"{self.BASE_URL}/{package_name}/{version}/json")
+        response.raise_for_status()
+        return [
+            WheelFile(
+                filename=item["filename"],
+                url=item["url"],
+                sha256=nix_base32(bytes.fromhex(item["digests"]["sha256"])),
+            )
+            for item in response.json().get("urls", [])
+            if item.get("packagetype") == "bdist_wheel" and not item.get("yanked")
+        ]
+
+    def get_metadata(self, package_name: str, version: str) -> PythonMetadata:
+        """Return a version's requirements and console scripts without downloading a distribution.
+
+        Requires-Dist comes from the core metadata file served next to a wheel
+        (PEP 658/714), or else from the wheel's METADATA member read with HTTP
+        range requests; console scripts come from its entry_points.txt, read
+        the same way. A pure-Python wheel is preferred. Versions without
+        wheels fall back to the requirements listed by the JSON API.
+        """
+        response = self._client.get(f"{self.BASE_URL}/{package_name}/{version}/json")
+        response.raise_for_status()
+        data = response.json()
+        wheels = [
+            item
+            for item in data.get("urls", [])
+            if item.get("packagetype") == "bdist_wheel" and not item.get("yanked")
+        ]
+        if not wheels:
+            return PythonMetadata(requires_dist=data.get("info", {}).get("requires_dist") or [])
+
+        url = min(wheels, key=lambda item: not item["filename"].endswith("-none-any.whl"))["url"]
+        metadata = self._core_metadata(url)
+        archive = RemoteZip(self._client, url)
+        if metadata is None:
+            metadata = _member_text(archive, _DIST_INFO_METADATA_RE) or ""
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.optionxform = str  # type: ignore[assignment,method-assign]
+        parser.read_string(_member_text(archive, _DIST_INFO_ENTRY_POINTS_RE) or "")
+        scripts = dict(parser["console_scripts"]) if parser.has_section("console_scripts") else {}
+        return PythonMetadata(
+            requires_dist=HeaderParser().parsestr(metadata).get_all("Requires-Dist") or [],
+            console_scripts=scripts,
+        )
+
+    def _core_metadata(self, wheel_url: str) -> str | None:
+        """Return the wheel's separately served METADATA file (PEP 658), if the index has one."""
+        try:
+            response = self._client.get(f"{wheel_url}.metadata", follow_redirects=True)
+        except httpx.HTTPError:
+            return None
+        return response.text if response.status_code == 200 else None
+
     def get_tarball_url(self, package_name: str, version: str) -> str:
         info = self.get_version_info(package_name, version)
         return info.tarball_url
 
     def close(self) -> None:
         self._client.close()
+
+
+def _member_text(archive: RemoteZip, pattern: re.Pattern[str]) -> str | None:
+    name = next((name for name in archive.names if pattern.fullmatch(name)), None)
+    return archive.read(name).decode("utf-8", "replace") if name is not None else None
@@ -0,0 +1,90 @@
+"""Adaptive polling intervals derived from each package's release cadence."""
+from __future__ import annotations
+
+import time
+from collections.abc import Sequence
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, Field
+
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import FlakeConfig, VersionInfo
+
+# Checks per expected gap between releases; more catch a release sooner after it is published.
+POLLS_PER_RELEASE = 8
+# Publish times of this many recent releases estimate the release rate.
+RECENT_RELEASES = 10
+
+
+class Poll(BaseModel):
+    """When a package was last checked and when it is next due."""
+
+    interval: float = Field(..., description="Seconds between checks")
+    release_interval: float | None = Field(None, description="Estimated seconds between releases, if known")
+    last_checked: float | None = Field(None, description="Unix time of the last online check, if any")
+
+    class Config:
+        frozen = True
+
+    @property
+    def next_check(self) -> float:
+        return (self.last_checked or 0.0) + self.interval
+
+    def due(self, now: float | None = None) -> bool:
+        return self.last_checked is None or (now or time.time()) >= self.next_check
+
+
+def release_interval(releases: Sequence[VersionInfo], now: float | None = None) -> float | None:
+    """Estimate the seconds between releases from their publish times, or None with fewer than two.
+
+    The mean gap between recent releases is used, unless the package has
+    been quiet for longer than that: the silence so far then counts as the
+    gap, so dormant packages back off gradually.
+    """
+    published = sorted(filter(None, (_timestamp(release.published_at) for release in releases)))
+    recent = published[-(RECENT_RELEASES + 1):]
+    if len(recent) < 2:
+        return None
+    mean_gap = (recent[-1] - recent[0]) / (len(recent) - 1)
+    return max(mean_gap, (now or time.time()) - recent[-1])
+
+
+def plan_polls(
+    configs: Sequence[FlakeConfig],
+    history: ReleaseHistory,
+    budget: float | None = None,
+    now: float | None = None,
+) -> list[Poll]:
+    """Return each config's polling interval and last check, from the release history.
+
+    Intervals are a fraction of the estimated release interval, clamped to
+    the config's ``[polling]`` bounds (the minimum when the cadence is
+    unknown). With a ``budget`` of checks per hour for the whole fleet,
+    every interval is stretched by the same factor until the fleet fits.
+    """
+    now = now or time.time()
+    plans = []
+    for config in configs:
+        source, bounds = config.source, config.polling
+        estimate = release_interval(history.releases(source.registry, source.name), now)
+        interval = bounds.min_interval * 60.0
+        if estimate is not None:
+            interval = min(max(estimate / POLLS_PER_RELEASE, bounds.min_interval * 60.0), bounds.max_interval * 60.0)
+        plans.append((interval, estimate, history.last_synced(source.registry, source.name)))
+
+    rate = sum(3600.0 / interval for interval, _, _ in plans)
+    stretch = rate / budget if budget and rate > budget else 1.0
+    return [
+        Poll(interval=interval * stretch, release_interval=estimate, last_checked=last_checked)
+        for interval, estimate, last_checked in plans
+    ]
+
+
+def _timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return (moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)).timestamp()
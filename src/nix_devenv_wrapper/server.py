@@ -0,0 +1,179 @@
+"""Background server answering ``ndw`` commands over a local Unix socket."""
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any
+
+from nix_devenv_wrapper import __version__
+from nix_devenv_wrapper.cache import default_cache_dir
+from nix_devenv_wrapper.history import ReleaseHistory
+
+
+class _ClientStream(io.TextIOBase):
+    """Text stream relaying writes to the connected client as JSON lines."""
+
+    def __init__(self, send: Callable[[dict[str, Any]], None], name: str):
+        self._send = send
+        self._name = name
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self._send({self._name: text})
+        return len(text)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: WarmServer
+
+    def handle(self) -> None:
+        send_lock = threading.Lock()
+
+        def send(message: dict[str, Any]) -> None:
+            with send_lock:
+                self.wfile.write(json.dumps(message).encode() + b"\n")
+                self.wfile.flush()
+
+        try:
+            request = json.loads(self.rfile.readline())
+            argv, cwd = [str(arg) for arg in request["argv"]], str(request["cwd"])
+            env = {str(name): str(value) for name, value in request["env"].items()}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            send({"refused": "malformed request"})
+            return
+        if request.get("version") != __version__:
+            send({"refused": f"server runs version {__version__}"})
+            return
+        if "serve" in argv:
+            send({"refused": "cannot start a server from the server"})
+            return
+        with contextlib.suppress(OSError):
+            send({"exit": self.server.run(argv, cwd, send, env)})
+
+
+class WarmServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Runs CLI commands in one long-lived process.
+
+    Loaded configs, pooled registry connections, release indexes, mirror
+    rankings and the release history stay warm between commands, so repeated
+    invocations skip interpreter start-up, imports and TLS handshakes.
+    Commands run one at a time, since each one changes into the client's
+    working directory, takes on the client's environment (PATH, cache
+    directory, ...) and owns stdout/stderr while it runs. Commands get an
+    empty stdin; the client runs commands fed input in-process instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str | Path, idle_timeout: float | None = 3600.0):
+        self.path = str(path)
+        self.idle_timeout = idle_timeout
+        self._histories: dict[Path, ReleaseHistory] = {}
+        self._run_lock = threading.Lock()
+        self._last_active = time.monotonic()
+        _claim_socket(self.path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)  # the socket is for this user only
+        try:
+            super().__init__(self.path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def run(
+        self,
+        argv: Sequence[str],
+        cwd: str,
+        send: Callable[[dict[str, Any]], None],
+        env: dict[str, str] | None = None,
+    ) -> int:
+        """Run one command as ``ndw`` would in ``cwd`` and ``env``, relaying its output through ``send``."""
+        from nix_devenv_wrapper.cli.main import run
+
+        with self._run_lock:
+            self._last_active = time.monotonic()
+            server_env = dict(os.environ)
+            stdin, stdout, stderr = sys.stdin, sys.stdout, sys.stderr
+            sys.stdin = io.StringIO()
+            sys.stdout, sys.stderr = _ClientStream(send, "stdout"), _ClientStream(send, "stderr")
+            try:
+                if env is not None:
+                    _replace_environ(env)
+                os.chdir(cwd)
+                return run(argv, history=self._history())
+            except SystemExit as exc:
+                return exc.code if isinstance(exc.code, int) else 0 if exc.code is None else 1
+            except Exception:  # noqa: BLE001 - reported to the client like an uncaught CLI error
+                traceback.print_exc()
+                return 1
+            finally:
+                sys.stdin, sys.stdout, sys.stderr = stdin, stdout, stderr
+                _replace_environ(server_env)
+                self._last_active = time.monotonic()
+
+    def _history(self) -> ReleaseHistory:
+        """Return the open release history of the current cache directory."""
+        path = default_cache_dir("history.sqlite3")
+        if path not in self._histories:
+            self._histories[path] = ReleaseHistory(path)
+        return self._histories[path]
+
+    def serve(self) -> None:
+        """Serve until interrupted or idle for ``idle_timeout`` seconds."""
+        if self.idle_timeout:
+            threading.Thread(target=self._shutdown_when_idle, daemon=True).start()
+        # Subprocesses (nix builds, prefetches) must not read the terminal the server was started from.
+        with open(os.devnull) as devnull:
+            os.dup2(devnull.fileno(), 0)
+        try:
+            self.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+        for history in self._histories.values():
+            history.close()
+
+    def _shutdown_when_idle(self) -> None:
+        assert self.idle_timeout
+        while True:
+            time.sleep(min(self.idle_timeout, 30.0))
+            if not self._run_lock.locked() and time.monotonic() - self._last_active > self.idle_timeout:
+                self.shutdown()
+                return
+
+
+def _replace_environ(env: dict[str, str]) -> None:
+    if env != os.environ:
+        os.environ.clear()
+        os.environ.update(env)
+
+
+def _claim_socket(path: str) -> None:
+    """Remove a stale socket left by a dead server; refuse to start next to a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RuntimeError(f"An ndw server is already listening on {path}")
+    finally:
+        probe.close()
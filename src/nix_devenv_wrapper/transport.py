@@ -0,0 +1,142 @@
+"""Process-wide HTTP transport shared by all registry clients."""
+from __future__ import annotations
+
+import atexit
+import ssl
+import threading
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the httpx[http2] extra
+    HTTP2_AVAILABLE = False
+
+
+class TransportManager:
+    """Owns one pooled ``httpx.Client`` per origin.
+
+    Each origin gets its own connection limits and keep-alive pool, HTTP/2 is
+    negotiated via ALPN when the ``h2`` package is installed (hosts that only
+    speak HTTP/1.1 fall back transparently), and every client shares one SSL
+    context so the CA bundle is loaded once per process. Kept-alive
+    connections avoid repeated DNS lookups and TLS handshakes.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 10,
+        max_keepalive_per_host: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: bool | None = None,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2
+        self._ssl_context: ssl.SSLContext | None = None
+        self._clients: dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def client_for(self, url: str | httpx.URL) -> httpx.Client:
+        """Return the pooled client for the URL's origin, creating it on first use."""
+        parsed = httpx.URL(url)
+        origin = f"{parsed.scheme}://{parsed.netloc.decode('ascii')}"
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Transport manager has been shut down")
+            client = self._clients.get(origin)
+            if client is None:
+                if self._ssl_context is None:
+                    self._ssl_context = httpx.create_ssl_context()
+                client = httpx.Client(
+                    http2=self.http2,
+                    limits=self.limits,
+                    verify=self._ssl_context,
+                )
+                self._clients[origin] = client
+            return client
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._closed = True
+        for client in clients:
+            client.close()
+
+
+class Session:
+    """Request defaults (headers, timeout) on top of the shared transport.
+
+    Registry clients hold a session instead of owning sockets; closing a
+    session releases nothing because connections belong to the manager.
+    """
+
+    def __init__(self, manager: TransportManager, headers: Mapping[str, str] | None = None, timeout: float = 30.0):
+        self._manager = manager
+        self.headers = dict(headers or {})
+        self.timeout = timeout
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        kwargs = self._with_defaults(kwargs)
+        return self._manager.client_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs: Any) -> Iterator[httpx.Response]:
+        kwargs = self._with_defaults(kwargs)
+        with self._manager.client_for(url).stream(method, url, **kwargs) as response:
+            yield response
+
+    def close(self) -> None:
+        """Release the session; pooled connections stay open for other users."""
+
+    def _with_defaults(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        headers = {**self.headers, **(kwargs.pop("headers", None) or {})}
+        kwargs.setdefault("timeout", self.timeout)
+        return {"headers": headers, **kwargs}
+
+
+_manager: TransportManager | None = None
+_manager_lock = threading.Lock()
+
+
+def get_transport() -> TransportManager:
+    """Return the process-wide transport manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None or _manager._closed:
+            _manager = TransportManager()
+        return _manager
+
+
+def borrow(headers: Mapping[str, str] | None = None, timeout: float = 30.0) -> Session:
+    """Return a session on the process-wide transport."""
+    return Session(get_transport(), headers=headers, timeout=timeout)
+
+
+def shutdown_transport() -> None:
+    """Close the process-wide transport, e.g. at the end of a fleet or daemon run."""
+    global _manager
+    with _manager_lock:
+        manager, _manager = _manager, None
+    if manager is not None:
+        manager.close()
+
+
+atexit.register(shutdown_transport)
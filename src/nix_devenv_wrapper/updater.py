@@ -2,19 +2,73 @@
 from __future__ import annotations
 
 import re
+import subprocess
+import tarfile
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any, TypeVar
 
-from nix_devenv_wrapper.hashing import prefetch_url_hash
-from nix_devenv_wrapper.models import FlakeConfig, UpdateResult, VersionInfo
-from nix_devenv_wrapper.registries import get_registry
+import httpx
+
+from nix_devenv_wrapper.artifacts import ArtifactStore
+from nix_devenv_wrapper.events import Event, EventHandler, EventType
+from nix_devenv_wrapper.generators import (
+    generate_npm_lockfile,
+    generate_npm_package_json,
+    generate_package_nix,
+    splice_python_sections,
+)
+from nix_devenv_wrapper.generators.npm_lock import npm_project_dir
+from nix_devenv_wrapper.hashing import PLACEHOLDER_HASH, PrefetchPool, prefetch_url
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.introspect import DetectedBinaries, config_warnings, inspect_url, read_archive_file
+from nix_devenv_wrapper.models import (
+    FlakeConfig,
+    NpmDependency,
+    NpmDependencyMode,
+    PackageRegistry,
+    PythonDistribution,
+    PythonMetadata,
+    UpdateResult,
+    VersionInfo,
+    WheelFile,
+)
+from nix_devenv_wrapper.mirrors import mirror_candidates
+from nix_devenv_wrapper.registries import GitHubRegistry, NpmRegistry, PyPIRegistry, expand_mirrors, get_registry
+from nix_devenv_wrapper.registries.local import artifact_path
+from nix_devenv_wrapper.versions import LATEST, ReleaseIndex, get_version_scheme, release_index_cache
+from nix_devenv_wrapper.wheels import python_version_for, select_wheels
+
+T = TypeVar("T")
 
 
 class Updater:
     """Service for checking and applying version updates."""
 
-    def __init__(self, config: FlakeConfig, package_nix_path: Path | None = None):
+    def __init__(
+        self,
+        config: FlakeConfig,
+        package_nix_path: Path | None = None,
+        prefetch_pool: PrefetchPool | None = None,
+        artifact_store: ArtifactStore | None = None,
+        history: ReleaseHistory | None = None,
+        on_event: EventHandler | None = None,
+    ):
         self.config = config
         self.package_nix_path = package_nix_path or Path("package.nix")
+        self.prefetch_pool = prefetch_pool
+        self.artifact_store = artifact_store
+        self.history = history
+        self.on_event = on_event
+        self.scheme = get_version_scheme(config.source.registry)
+        self.mirrors = expand_mirrors(config.mirrors)
+        self._npm_trees: dict[str, list[NpmDependency]] = {}
+        self._wheels: dict[str, dict[str, WheelFile]] = {}
+        self._python_metadata: dict[str, PythonMetadata] = {}
+        self._cargo_locks: dict[str, str | None] = {}
+        self._prefetched: dict[str, Path] = {}
 
     def get_current_version(self) -> str:
         """Read the current version from package.nix."""
@@ -32,71 +86,546 @@ class Updater:
             raise ValueError("Could not find sha256 in package.nix")
         return match.group(1)
 
-    def check_for_updates(self) -> UpdateResult:
-        """Check if a newer version is available."""
-        current_version = self.get_current_version()
+    def get_release_index(self, refresh: bool = False, offline: bool = False) -> ReleaseIndex:
+        """Return the sorted index of published releases, cached per process.
 
-        with get_registry(self.config.source.registry) as registry:
-            latest_version = registry.get_latest_version(self.config.source.name)
+        Fetched version lists are merged into the release history. With
+        ``offline`` the index is built from the history alone.
+        """
+        source = self.config.source
+        if offline:
+            if self.history is None or self.history.last_synced(source.registry, source.name) is None:
+                raise ValueError(f"No release history for {source.name}; run a check online first")
+            releases = self.history.releases(source.registry, source.name)
+            tags = self.history.tags(source.registry, source.name)
+            return self._apply_tag_prefix(ReleaseIndex(self.scheme, releases, tags))
 
-        update_available = current_version != latest_version
+        if not refresh:
+            cached = release_index_cache.get(source.registry, source.name)
+            if cached is not None:
+                return self._apply_tag_prefix(cached)
 
-        return UpdateResult(
-            current_version=current_version,
-            latest_version=latest_version,
-            update_available=update_available,
-        )
+        with get_registry(source.registry, self.mirrors) as registry:
+            releases, tags = registry.list_releases(source.name)
+        if self.history is not None:
+            self.history.record(source.registry, source.name, releases, tags)
+        index = ReleaseIndex(self.scheme, releases, tags)
+        release_index_cache.put(source.registry, source.name, index)
+        return self._apply_tag_prefix(index)
+
+    def _apply_tag_prefix(self, index: ReleaseIndex) -> ReleaseIndex:
+        prefix = self.config.source.tag_prefix
+        if not prefix:
+            return index
+        renamed = {
+            release.version: release.model_copy(update={"version": release.tag[len(prefix):]})
+            for release in index.releases
+            if release.tag and release.tag.startswith(prefix)
+        }
+        tags = {tag: renamed[version].version for tag, version in index.tags.items() if version in renamed}
+        return ReleaseIndex(self.scheme, renamed.values(), tags)
+
+    def resolve_version(
+        self, spec: str | None = None, offline: bool = False, index: ReleaseIndex | None = None
+    ) -> str:
+        """Resolve an exact pin, constraint or "latest" to a concrete version.
+
+        Without an explicit spec, the configured source version is used. With
+        ``offline`` only the release history is consulted; a just-fetched
+        ``index`` is used as is, without another registry request.
+        """
+        if spec is None:
+            spec = self.config.source.version
+        if spec is not None and self.scheme.is_exact(spec):
+            return spec
+        if spec in (None, LATEST) and index is None and not self._resolves_from_index and not offline:
+            with get_registry(self.config.source.registry, self.mirrors) as registry:
+                return registry.get_latest_version(self.config.source.name)
+
+        release = (index or self.get_release_index(offline=offline)).resolve(spec)
+        if release is None:
+            raise ValueError(f"No release of {self.config.source.name} matches {spec!r}")
+        return release.version
+
+    @property
+    def _resolves_from_index(self) -> bool:
+        # Tag prefixes need every tag, and channels share one version-list fetch.
+        return bool(self.config.source.tag_prefix or self.config.source.channels or self.config.channel)
+
+    def channel_updaters(self) -> dict[str, Updater]:
+        """Return an updater per configured channel, writing ``package-<channel>.nix`` next to package.nix.
+
+        They share this updater's prefetch pool, artifact store, history and event handler,
+        and the process-wide release index, so all channels resolve from a
+        single metadata fetch.
+        """
+        updaters = {}
+        for channel in self.config.source.channels:
+            config = self.config.for_channel(channel)
+            updaters[channel] = Updater(
+                config,
+                self.package_nix_path.parent / config.package_file,
+                prefetch_pool=self.prefetch_pool,
+                artifact_store=self.artifact_store,
+                history=self.history,
+                on_event=self.on_event,
+            )
+        return updaters
+
+    def check_for_updates(self, offline: bool = False) -> UpdateResult:
+        """Check if a newer version matching the configured constraint is available.
+
+        Online checks also refresh the release history; offline checks answer
+        from it without network access.
+        """
+        with self.reporting() as started:
+            current_version = self.get_current_version()
+            # Recording the history needs the full version list; resolve from it rather than asking again.
+            index = self.get_release_index() if self.history is not None and not offline else None
+            latest_version = self.resolve_version(offline=offline, index=index)
+
+            # Only strictly newer versions count, so a registry rollback of its
+            # latest tag is not reported as an update.
+            update_available = self.scheme.compare(latest_version, current_version) > 0
+            self.emit(
+                EventType.RESOLVED,
+                started,
+                version=latest_version,
+                current_version=current_version,
+                update_available=update_available,
+            )
+
+            return UpdateResult(
+                current_version=current_version,
+                latest_version=latest_version,
+                update_available=update_available,
+            )
 
     def get_version_info(self, version: str | None = None) -> VersionInfo:
         """Get detailed info for a specific version."""
-        with get_registry(self.config.source.registry) as registry:
+        if self.config.source.tag_prefix:
+            release = self.get_release_index().get(self.resolve_version(version))
+            if release is None:
+                raise ValueError(f"No release of {self.config.source.name} matches {version!r}")
+            return release
+        with get_registry(self.config.source.registry, self.mirrors) as registry:
             return registry.get_version_info(self.config.source.name, version)
 
     def fetch_hash(self, version: str) -> str:
-        """Fetch the hash for a specific version's tarball."""
-        with get_registry(self.config.source.registry) as registry:
-            info = registry.get_version_info(self.config.source.name, version)
-        return prefetch_url_hash(info.tarball_url)
+        """Fetch the hash for a specific version's tarball.
+
+        A hash already in the release history is reused without any network
+        access; newly computed hashes are recorded there. Local artifacts can
+        be rebuilt in place, so their hash always comes from the file itself
+        (through the stat-keyed hash cache, which only rereads changed files).
+        """
+        known = self.known_release(version)
+        if known is not None and known.sha256 and self.config.source.registry != PackageRegistry.LOCAL:
+            return known.sha256
+
+        info = self.get_version_info(version)
+        # Some registries (e.g. the crates.io index) publish the artifact hash.
+        sha256 = info.sha256 or self._hash_url(info.tarball_url)
+
+        if self.history is not None:
+            self.history.record_hash(self.config.source.registry, self.config.source.name, info, sha256)
+        return sha256
+
+    def _hash_url(self, url: str) -> str:
+        """Hash an artifact, downloading it from the best mirror and failing over to the next."""
+        if self.prefetch_pool is not None:
+            return self._from_mirrors(url, self.prefetch_pool.hash)
+        if self.artifact_store is not None:
+            return self._from_mirrors(url, self.artifact_store.nix_hash)
+        return self._from_mirrors(url, self._prefetch)
+
+    def _prefetch(self, url: str) -> str:
+        sha256, path = prefetch_url(url)
+        if path is not None:
+            self._prefetched[url] = path
+        return sha256
+
+    def local_artifact(self, url: str) -> Path | None:
+        """Return the local copy of an artifact already downloaded for hashing, from any of its mirrors, else None."""
+        for _, _, candidate in mirror_candidates(url, self.mirrors):
+            prefetched = self._prefetched.get(candidate)
+            if prefetched is not None and prefetched.is_file():
+                return prefetched
+            if self.prefetch_pool is not None and (path := self.prefetch_pool.local_path(candidate)) is not None:
+                return path
+            if self.artifact_store is not None and (path := self.artifact_store.lookup(candidate)) is not None:
+                return path
+        return None
+
+    def _from_mirrors(self, url: str, fetch: Callable[[str], T]) -> T:
+        """Call ``fetch`` with the URL on the best mirror, failing over to the next on download errors."""
+        candidates = mirror_candidates(url, self.mirrors)
+        for position, (mirror_set, base, candidate) in enumerate(candidates):
+            try:
+                return fetch(candidate)
+            except (OSError, subprocess.SubprocessError, httpx.HTTPError):
+                if mirror_set is None or position == len(candidates) - 1:
+                    raise
+                mirror_set.record_failure(base)
+        raise AssertionError("unreachable")
+
+    def inspect_binaries(self, version: str) -> DetectedBinaries:
+        """Return the binaries a version's release archive provides.
+
+        The copy downloaded for hashing is read when there is one; otherwise
+        the archive is streamed from the best mirror.
+        """
+        if self.uses_wheels:
+            # Wheels are zip files, which can't be read front to back.
+            return DetectedBinaries()
+        registry = self.config.source.registry
+        url = self.get_version_info(version).tarball_url
+        local = self.local_artifact(url)
+        if local is not None:
+            return inspect_url(local.as_uri(), registry)
+        return self._from_mirrors(url, lambda url: inspect_url(url, registry))
+
+    def check_binaries(self, version: str) -> list[str]:
+        """Return warnings where the wrapper config disagrees with the binaries a version provides."""
+        try:
+            detected = self.inspect_binaries(version)
+        except tarfile.TarError:
+            # Not a tar archive (e.g. a zip sdist or a bare local binary); nothing to check against.
+            return []
+        except (OSError, httpx.HTTPError, ValueError) as exc:
+            return [f"Could not inspect {self.config.source.name} {version}: {exc}"]
+        return config_warnings(self.config, version, detected)
+
+    def known_release(self, version: str) -> VersionInfo | None:
+        """Return a release from the history (tag prefix applied), without network access."""
+        if self.history is None:
+            return None
+        source = self.config.source
+        index = self._apply_tag_prefix(ReleaseIndex(self.scheme, self.history.releases(source.registry, source.name)))
+        return index.get(version)
+
+    def previous_version(self) -> str | None:
+        """Return the newest known release older than the current one, from history only.
+
+        Pre-releases are skipped unless the current version is one.
+        """
+        current_version = self.get_current_version()
+        include_prereleases = self.scheme.is_prerelease(current_version)
+        for release in reversed(self.get_release_index(offline=True).older_than(current_version)):
+            if include_prereleases or not self.scheme.is_prerelease(release.version):
+                return release.version
+        return None
+
+    def rollback(self, version: str | None = None) -> UpdateResult:
+        """Move back to ``version``, or to the previous known release."""
+        target = version or self.previous_version()
+        if target is None:
+            current_version = self.get_current_version()
+            raise ValueError(f"No release of {self.config.source.name} older than {current_version} is known")
+        return self.update_to_version(target, allow_downgrade=True)
+
+    @property
+    def uses_npm_lockfile(self) -> bool:
+        """Whether package.nix installs from a generated npm lockfile."""
+        return (
+            self.config.source.registry == PackageRegistry.NPM
+            and self.config.runtime.npm_dependencies == NpmDependencyMode.LOCKFILE
+        )
+
+    @property
+    def uses_wheels(self) -> bool:
+        """Whether package.nix installs prebuilt PyPI wheels."""
+        return (
+            self.config.source.registry == PackageRegistry.PYPI
+            and self.config.runtime.python_distribution == PythonDistribution.WHEEL
+        )
+
+    @property
+    def pins_from_metadata(self) -> bool:
+        """Whether package.nix is pinned by registry-published hashes rather than a prefetched one."""
+        return self.uses_npm_lockfile or self.uses_wheels
+
+    def wheels(self, version: str) -> dict[str, WheelFile]:
+        """Select (once per version) the wheel to install on each configured system."""
+        if version not in self._wheels:
+            with PyPIRegistry(mirrors=self.mirrors) as registry:
+                published = registry.list_wheels(self.config.source.name, version)
+            self._wheels[version] = select_wheels(
+                published,
+                python_version_for(self.config.runtime.nix_package),
+                self.config.runtime.wheel_systems,
+            )
+        return self._wheels[version]
+
+    def python_metadata(self, version: str) -> PythonMetadata | None:
+        """Read (once per version) a PyPI package's requirements and console scripts, else None."""
+        if self.config.source.registry != PackageRegistry.PYPI:
+            return None
+        if version not in self._python_metadata:
+            with PyPIRegistry(mirrors=self.mirrors) as registry:
+                self._python_metadata[version] = registry.get_metadata(self.config.source.name, version)
+        return self._python_metadata[version]
+
+    def npm_dependencies(self, version: str) -> list[NpmDependency]:
+        """Resolve (once per version) the npm dependency tree for lockfile mode."""
+        if version not in self._npm_trees:
+            with NpmRegistry(mirrors=self.mirrors) as registry:
+                self._npm_trees[version] = registry.resolve_dependency_tree(self.config.source.name, version)
+        return self._npm_trees[version]
+
+    @property
+    def cargo_lock_path(self) -> Path:
+        """Where the Cargo.lock a crate ships is written, next to package.nix (one per channel)."""
+        name = f"Cargo-{self.config.channel}.lock" if self.config.channel else "Cargo.lock"
+        return self.package_nix_path.parent / name
+
+    def cargo_lockfile(self, version: str) -> str | None:
+        """Read (once per version) the Cargo.lock a crate ships, streaming the .crate only up to it; else None."""
+        if self.config.source.registry != PackageRegistry.CARGO:
+            return None
+        if version not in self._cargo_locks:
+            url = self.get_version_info(version).tarball_url
+            self._cargo_locks[version] = self._from_mirrors(url, lambda url: read_archive_file(url, "Cargo.lock"))
+        return self._cargo_locks[version]
+
+    def tag_template(self, version: str) -> str | None:
+        """Return the GitHub tag convention (e.g. ``"v{version}"``) for a released version, else None."""
+        source = self.config.source
+        if source.registry != PackageRegistry.GITHUB_RELEASE:
+            return None
+        if source.tag_prefix:
+            return f"{source.tag_prefix}{{version}}"
+        with GitHubRegistry(mirrors=self.mirrors) as registry:
+            return registry.tag_template(source.name, version)
+
+    def local_path(self, version: str) -> str | None:
+        """Return the absolute path of a local-registry artifact, else None."""
+        source = self.config.source
+        if source.registry != PackageRegistry.LOCAL:
+            return None
+        return str(artifact_path(source.name, version))
+
+    def package_file_paths(self) -> list[Path]:
+        """Return every file ``write_package_files`` can write for this package file."""
+        paths = [self.package_nix_path]
+        if self.uses_npm_lockfile:
+            project_dir = self.package_nix_path.parent / npm_project_dir(self.config)
+            paths += [project_dir / "package.json", project_dir / "package-lock.json"]
+        if self.config.source.registry == PackageRegistry.CARGO:
+            paths.append(self.cargo_lock_path)
+        return paths
+
+    def render_package_files(self, version: str, sha256: str) -> dict[Path, str]:
+        """Render package.nix and any files it references for a version."""
+        wheels = self.wheels(version) if self.uses_wheels else None
+        tag_template = self.tag_template(version)
+        local_path = self.local_path(version)
+        python_metadata = self.python_metadata(version)
+        cargo_lock = self.cargo_lockfile(version)
+        files = {
+            self.package_nix_path: generate_package_nix(
+                self.config,
+                version,
+                sha256,
+                wheels,
+                tag_template,
+                local_path,
+                python_metadata,
+                self.cargo_lock_path.name if cargo_lock is not None else None,
+            )
+        }
+        if cargo_lock is not None:
+            files[self.cargo_lock_path] = cargo_lock
+        if self.uses_npm_lockfile:
+            project_dir = self.package_nix_path.parent / npm_project_dir(self.config)
+            dependencies = self.npm_dependencies(version)
+            files[project_dir / "package.json"] = generate_npm_package_json(self.config, version)
+            files[project_dir / "package-lock.json"] = generate_npm_lockfile(self.config, version, dependencies)
+        return files
+
+    def write_package_files(self, version: str, sha256: str) -> list[Path]:
+        """Render and write package.nix and its companion files; return their paths."""
+        return self._write_files(self.render_package_files(version, sha256))
+
+    def package_file_edits(
+        self, version: str, sha256: str, regenerate: bool = False
+    ) -> tuple[dict[Path, str], list[str]]:
+        """Return the new contents of every file an update to ``version`` writes, and any warnings.
+
+        package.nix is edited in place, keeping hand edits, unless
+        ``regenerate`` asks for it to be rendered anew from the config.
+        Nothing is written.
+        """
+        registry = self.config.source.registry
+        if regenerate or self.uses_npm_lockfile or registry == PackageRegistry.LOCAL:
+            # Lockfiles and local artifact paths (from manifests) change wholesale between versions.
+            return self.render_package_files(version, sha256), []
+        if registry == PackageRegistry.PYPI:
+            return {self.package_nix_path: self._edit_python_package_nix(version, sha256)}, []
+        content = self._edit_package_nix(self.package_nix_path.read_text(), version, sha256)
+        if registry == PackageRegistry.CARGO:
+            return self._edit_cargo_vendoring(content, version)
+        return {self.package_nix_path: content}, []
+
+    @contextmanager
+    def reporting(self) -> Iterator[float]:
+        """Yield the start time of a phase; an exception escaping the block is reported as a failed event."""
+        started = time.monotonic()
+        try:
+            yield started
+        except Exception as exc:
+            self.emit(EventType.FAILED, started, error=str(exc))
+            raise
+
+    def emit(self, event: EventType, started: float, **fields: Any) -> None:
+        """Report a finished phase of this package file to the event handler, if any."""
+        if self.on_event is not None:
+            self.on_event(
+                Event(
+                    event=event,
+                    wrapper=str(self.package_nix_path.parent),
+                    package_file=self.package_nix_path.name,
+                    duration=time.monotonic() - started,
+                    **fields,
+                )
+            )
 
     def update_package_nix(self, version: str, sha256: str) -> None:
         """Update package.nix with new version and hash."""
-        content = self.package_nix_path.read_text()
+        self.package_nix_path.write_text(self._edit_package_nix(self.package_nix_path.read_text(), version, sha256))
 
+    def _edit_package_nix(self, content: str, version: str, sha256: str) -> str:
         content = re.sub(
             r'version\s*=\s*"[^"]+"',
             f'version = "{version}"',
             content,
         )
 
-        content = re.sub(
+        return re.sub(
             r'sha256\s*=\s*"[^"]+"',
             f'sha256 = "{sha256}"',
             content,
         )
 
-        self.package_nix_path.write_text(content)
+    def _edit_python_package_nix(self, version: str, sha256: str) -> str:
+        """Edit a PyPI package.nix: version, hash, and the sections that follow the release's metadata.
+
+        Dependencies, mainProgram and (in wheel mode) the wheel table are
+        taken from a fresh rendering; everything else, hand edits included,
+        is kept.
+        """
+        rendered = self.render_package_files(version, sha256)[self.package_nix_path]
+        content = re.sub(r'version\s*=\s*"[^"]+"', f'version = "{version}"', self.package_nix_path.read_text())
+        if not self.uses_wheels:
+            # In wheel mode the hashes live in the wheel table.
+            content = re.sub(r'sha256\s*=\s*"[^"]+"', f'sha256 = "{sha256}"', content)
+        return splice_python_sections(content, rendered)
+
+    def _edit_cargo_vendoring(self, content: str, version: str) -> tuple[dict[Path, str], list[str]]:
+        """Point package.nix's vendored dependencies at a new crate version.
 
-    def update_to_version(self, version: str | None = None) -> UpdateResult:
-        """Update to a specific version or latest."""
+        The crate's own Cargo.lock goes next to package.nix (replacing a
+        ``cargoHash``, which goes stale with every release). Crates without one
+        get their ``cargoHash`` reset, since the old one can't match.
+        """
+        cargo_lock = self.cargo_lockfile(version)
+        if cargo_lock is not None:
+            vendor = f"cargoLock.lockFile = ./{self.cargo_lock_path.name};"
+            content = re.sub(r"cargoHash\s*=\s*[^;]+;", vendor, content)
+            return {self.package_nix_path: content, self.cargo_lock_path: cargo_lock}, []
+        if not re.search(r"cargoHash\s*=", content):
+            return {self.package_nix_path: content}, []
+        content = re.sub(r"cargoHash\s*=\s*[^;]+;", "cargoHash = lib.fakeHash;", content)
+        return {self.package_nix_path: content}, [
+            f"{self.config.source.name} {version} ships no Cargo.lock; cargoHash was reset to lib.fakeHash, "
+            "and the next build reports the value to set"
+        ]
+
+    @staticmethod
+    def _write_files(files: dict[Path, str]) -> list[Path]:
+        for path, content in files.items():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content)
+        return list(files)
+
+    def published_hash(self, version: str) -> str:
+        """Return the registry-published hash of the main artifact, for reporting."""
+        if self.uses_wheels:
+            return next(iter(self.wheels(version).values())).sha256
+        root_path = f"node_modules/{self.config.source.name}"
+        root = next(dep for dep in self.npm_dependencies(version) if dep.path == root_path)
+        return root.integrity or PLACEHOLDER_HASH
+
+    def plan_update(self, version: str | None = None, allow_downgrade: bool | None = None) -> tuple[str, str, bool]:
+        """Resolve the target of an update; return the current and target versions and whether nothing changes.
+
+        Moving to an older version is refused unless allowed by the argument or
+        by ``source.allow_downgrade``; an implicit target that is older than the
+        current version (a registry rollback) is reported as unchanged.
+        """
         current_version = self.get_current_version()
+        if allow_downgrade is None:
+            allow_downgrade = self.config.source.allow_downgrade
 
-        if version is None:
-            with get_registry(self.config.source.registry) as registry:
-                version = registry.get_latest_version(self.config.source.name)
+        target_version = self.resolve_version(version)
+        direction = self.scheme.compare(target_version, current_version)
 
-        if version == current_version:
-            return UpdateResult(
+        unchanged = target_version == current_version or (direction < 0 and version is None and not allow_downgrade)
+        if not unchanged and direction < 0 and not allow_downgrade:
+            raise ValueError(
+                f"Refusing to downgrade {self.config.source.name} from {current_version} to {target_version}"
+            )
+        return current_version, target_version, unchanged
+
+    def update_to_version(
+        self, version: str | None = None, allow_downgrade: bool | None = None, regenerate: bool = False
+    ) -> UpdateResult:
+        """Update to a specific version or constraint, or to the configured target.
+
+        Downgrades are refused as ``plan_update`` describes; the files written
+        are those of ``package_file_edits``.
+        """
+        with self.reporting() as started:
+            current_version, target_version, unchanged = self.plan_update(version, allow_downgrade)
+            self.emit(
+                EventType.RESOLVED,
+                started,
+                version=target_version,
                 current_version=current_version,
-                latest_version=version,
-                update_available=False,
+                update_available=not unchanged,
             )
+            if unchanged:
+                return UpdateResult(
+                    current_version=current_version,
+                    latest_version=target_version,
+                    update_available=False,
+                )
 
-        new_hash = self.fetch_hash(version)
-        self.update_package_nix(version, new_hash)
+            started = time.monotonic()
+            if self.pins_from_metadata:
+                # Every artifact is pinned by a registry-published hash; nothing to download.
+                new_hash = self.published_hash(target_version)
+            else:
+                new_hash = self.fetch_hash(target_version)
+            self.emit(EventType.HASHED, started, version=target_version, sha256=new_hash)
 
-        return UpdateResult(
-            current_version=current_version,
-            latest_version=version,
-            update_available=True,
-            new_hash=new_hash,
-        )
+            started = time.monotonic()
+            files, warnings = self.package_file_edits(target_version, new_hash, regenerate)
+            paths = self._write_files(files)
+            # Catch upstream renaming or dropping the wrapped binary before a build does.
+            warnings += self.check_binaries(target_version)
+            self.emit(
+                EventType.WRITTEN,
+                started,
+                version=target_version,
+                paths=[str(path) for path in paths],
+                warnings=warnings or None,
+            )
+
+            return UpdateResult(
+                current_version=current_version,
+                latest_version=target_version,
+                update_available=True,
+                new_hash=new_hash,
+                warnings=warnings,
+            )
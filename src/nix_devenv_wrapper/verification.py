@@ -0,0 +1,184 @@
+"""Concurrent nix build verification for one or many wrappers."""
+from __future__ import annotations
+
+import hashlib
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.models import BuildResult
+
+DEFAULT_MEMORY_PER_BUILD = 2 * 1024**3
+
+
+def available_memory() -> int | None:
+    """Return available physical memory in bytes, if it can be determined."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_max_jobs(memory_per_build: int = DEFAULT_MEMORY_PER_BUILD) -> int:
+    """Return how many builds fit the CPU count and available memory."""
+    jobs = os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None and memory_per_build > 0:
+        jobs = min(jobs, memory // memory_per_build)
+    return max(1, jobs)
+
+
+class VerificationScheduler:
+    """Run `nix build` for many wrappers concurrently.
+
+    Concurrency is bounded by CPU count and available memory, each build's
+    output is streamed to its own log file, builds exceeding the timeout are
+    killed, and the package files an update wrote are restored from a
+    snapshot when a build fails.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int | None = None,
+        timeout: float | None = 3600.0,
+        memory_per_build: int = DEFAULT_MEMORY_PER_BUILD,
+        log_dir: Path | None = None,
+        nix: str = "nix",
+        on_output: Callable[[Wrapper, str], None] | None = None,
+    ):
+        self.max_jobs = max_jobs or default_max_jobs(memory_per_build)
+        self.timeout = timeout
+        self._log_dir = log_dir
+        self._log_dir_lock = threading.Lock()
+        self.nix = nix
+        self.on_output = on_output
+
+    @property
+    def log_dir(self) -> Path:
+        """Directory holding build logs, created when the first log is written.
+
+        Without a configured directory a temporary one is made, so runs that
+        build nothing leave nothing behind.
+        """
+        with self._log_dir_lock:
+            if self._log_dir is None:
+                self._log_dir = Path(tempfile.mkdtemp(prefix="ndw-verify-"))
+            else:
+                self._log_dir.mkdir(parents=True, exist_ok=True)
+            return self._log_dir
+
+    def verify(
+        self,
+        wrappers: Sequence[Wrapper],
+        snapshots: Mapping[Path, Mapping[Path, str | None]] | None = None,
+    ) -> list[BuildResult]:
+        """Build every wrapper, returning results in input order.
+
+        Args:
+            wrappers: Wrappers to build
+            snapshots: Previous package file contents (see ``snapshot_files``)
+                keyed by wrapper root; failed builds are rolled back to these
+        """
+        jobs = max(1, min(self.max_jobs, len(wrappers)))
+        # Split cores between concurrent builds so they don't oversubscribe.
+        cores = max(1, (os.cpu_count() or 1) // jobs)
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(lambda wrapper: self._build(wrapper, cores), wrappers))
+
+        if snapshots:
+            results = [self._rollback(wrapper, result, snapshots) for wrapper, result in zip(wrappers, results)]
+        return results
+
+    def _build(self, wrapper: Wrapper, cores: int) -> BuildResult:
+        log_path = self.log_dir / log_name(wrapper)
+        started = time.monotonic()
+        timed_out = threading.Event()
+
+        try:
+            process = subprocess.Popen(
+                [self.nix, "build", "--no-link", "--print-build-logs", "--option", "cores", str(cores)],
+                cwd=wrapper.root,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                start_new_session=True,
+            )
+        except OSError as exc:
+            log_path.write_text(f"{exc}\n")
+            return BuildResult(
+                wrapper=str(wrapper.root),
+                success=False,
+                error=f"could not run {self.nix}: {exc.strerror or exc}",
+                duration=time.monotonic() - started,
+                log_path=str(log_path),
+            )
+
+        def kill() -> None:
+            timed_out.set()
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+        timer = threading.Timer(self.timeout, kill) if self.timeout else None
+        if timer:
+            timer.start()
+        try:
+            assert process.stdout is not None
+            with log_path.open("w") as log:
+                for line in process.stdout:
+                    log.write(line)
+                    if self.on_output:
+                        self.on_output(wrapper, line.rstrip("\n"))
+            returncode = process.wait()
+        finally:
+            if timer:
+                timer.cancel()
+
+        return BuildResult(
+            wrapper=str(wrapper.root),
+            success=returncode == 0 and not timed_out.is_set(),
+            returncode=returncode,
+            timed_out=timed_out.is_set(),
+            duration=time.monotonic() - started,
+            log_path=str(log_path),
+        )
+
+    def _rollback(
+        self, wrapper: Wrapper, result: BuildResult, snapshots: Mapping[Path, Mapping[Path, str | None]]
+    ) -> BuildResult:
+        previous = snapshots.get(wrapper.root)
+        if result.success or not previous:
+            return result
+        for path, content in previous.items():
+            if content is None:
+                # Written by the update (e.g. a new Cargo.lock); it didn't exist before.
+                path.unlink(missing_ok=True)
+            else:
+                path.write_text(content)
+        return result.model_copy(update={"rolled_back": True})
+
+
+def log_name(wrapper: Wrapper) -> str:
+    """Return a wrapper's build log file name, unique even between wrappers in same-named directories."""
+    digest = hashlib.sha256(str(wrapper.root.resolve()).encode()).hexdigest()[:8]
+    return f"{wrapper.name}-{digest}.log"
+
+
+def snapshot_files(paths: Iterable[Path]) -> dict[Path, str | None]:
+    """Capture files' current contents (None for missing ones) so a failed build can be rolled back."""
+    return {path: path.read_text() if path.exists() else None for path in paths}
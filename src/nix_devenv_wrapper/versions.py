@@ -0,0 +1,464 @@
+"""Version parsing, constraint matching and sorted release indexes."""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from packaging.specifiers import InvalidSpecifier, SpecifierSet
+from packaging.version import InvalidVersion, Version
+
+from nix_devenv_wrapper.models import PackageRegistry, VersionInfo
+
+LATEST = "latest"
+# Channel spec for the highest release, pre-releases included.
+PRERELEASE = "prerelease"
+
+_SEMVER_RE = re.compile(
+    r"^[v=]?\s*(\d+)(?:\.(\d+))?(?:\.(\d+))?"
+    r"(?:-?((?:[0-9A-Za-z-]+)(?:\.[0-9A-Za-z-]+)*))?"
+    r"(?:\+[0-9A-Za-z.-]+)?$"
+)
+_PARTIAL_RE = re.compile(
+    r"^[v=]?\s*([0-9]+|[xX*])?(?:\.([0-9]+|[xX*]))?(?:\.([0-9]+|[xX*]))?"
+    r"(?:-((?:[0-9A-Za-z-]+)(?:\.[0-9A-Za-z-]+)*))?"
+    r"(?:\+[0-9A-Za-z.-]+)?$"
+)
+_COMPARATOR_RE = re.compile(r"^(<=|>=|<|>|=|\^|~>?)?\s*(.*)$")
+_HYPHEN_RE = re.compile(r"^\s*(\S+)\s+-\s+(\S+)\s*$")
+
+
+class Constraint(ABC):
+    """A parsed version constraint."""
+
+    @abstractmethod
+    def matches(self, version: str, include_prereleases: bool = False) -> bool:
+        """Return True if the version satisfies the constraint."""
+
+    def upper_bound(self) -> Any | None:
+        """Return an inclusive sort key no match can exceed, or None if unbounded."""
+        return None
+
+
+class VersionScheme(ABC):
+    """Ordering and constraint rules for one registry's version strings."""
+
+    @abstractmethod
+    def key(self, version: str) -> Any | None:
+        """Return a sort key for the version, or None if it cannot be parsed."""
+
+    @abstractmethod
+    def is_prerelease(self, version: str) -> bool:
+        """Return True if the version is a pre-release."""
+
+    @abstractmethod
+    def parse_constraint(self, spec: str) -> Constraint:
+        """Parse a constraint expression."""
+
+    def is_exact(self, spec: str) -> bool:
+        """Return True if the spec is a bare version rather than a constraint.
+
+        Prefixed pins such as ``=1.2.3`` or ``v1.2.3`` parse as versions too,
+        but aren't how the registry spells the release, so they resolve as
+        constraints against the index instead.
+        """
+        return spec[:1].isdigit() and spec == spec.strip() and self.key(spec) is not None
+
+    def compare(self, left: str, right: str) -> int:
+        """Compare two versions, falling back to string equality for unparsable ones."""
+        left_key, right_key = self.key(left), self.key(right)
+        if left_key is None or right_key is None:
+            return 0 if left == right else 1
+        return (left_key > right_key) - (left_key < right_key)
+
+
+# --- npm-style semver ---------------------------------------------------------
+
+
+def _prerelease_key(prerelease: str | None) -> tuple[Any, ...]:
+    if prerelease is None:
+        return (1,)
+    identifiers = tuple((0, int(part), "") if part.isdigit() else (1, 0, part) for part in prerelease.split("."))
+    return (0, identifiers)
+
+
+def _semver_key(major: int, minor: int, patch: int, prerelease: str | None) -> tuple[Any, ...]:
+    return (major, minor, patch, _prerelease_key(prerelease))
+
+
+class _Comparator:
+    """A single primitive comparison such as ``>=1.2.0``."""
+
+    __slots__ = ("operator", "key", "base")
+
+    def __init__(self, operator: str, major: int, minor: int, patch: int, prerelease: str | None = None):
+        self.operator = operator
+        self.key = _semver_key(major, minor, patch, prerelease)
+        self.base = (major, minor, patch) if prerelease else None
+
+    def test(self, key: tuple[Any, ...]) -> bool:
+        match self.operator:
+            case ">=":
+                return key >= self.key
+            case ">":
+                return key > self.key
+            case "<=":
+                return key <= self.key
+            case "<":
+                return key < self.key
+            case _:
+                return key == self.key
+
+
+class SemverConstraint(Constraint):
+    """An npm range: comparator sets joined by ``||``."""
+
+    def __init__(self, scheme: SemverScheme, sets: list[list[_Comparator]]):
+        self._scheme = scheme
+        self._sets = sets
+
+    def matches(self, version: str, include_prereleases: bool = False) -> bool:
+        parsed = self._scheme.parse(version)
+        if parsed is None:
+            return False
+        major, minor, patch, prerelease = parsed
+        key = _semver_key(major, minor, patch, prerelease)
+        for comparators in self._sets:
+            if not all(comparator.test(key) for comparator in comparators):
+                continue
+            # npm only lets a pre-release through when a comparator in the same
+            # set opts into pre-releases of that exact major.minor.patch.
+            if prerelease is None or include_prereleases:
+                return True
+            if any(c.base == (major, minor, patch) for c in comparators):
+                return True
+        return False
+
+    def upper_bound(self) -> Any | None:
+        bounds = []
+        for comparators in self._sets:
+            uppers = [c.key for c in comparators if c.operator in ("<", "<=", "=")]
+            if not uppers:
+                return None
+            bounds.append(min(uppers))
+        return max(bounds) if bounds else None
+
+
+class SemverScheme(VersionScheme):
+    """Semantic versions with npm range syntax.
+
+    With ``loose`` enabled, missing minor/patch components are treated as zero,
+    which suits free-form git tags such as ``1.2``.
+    """
+
+    def __init__(self, loose: bool = False):
+        self.loose = loose
+
+    def parse(self, version: str) -> tuple[int, int, int, str | None] | None:
+        match = _SEMVER_RE.match(version.strip())
+        if not match:
+            return None
+        major, minor, patch, prerelease = match.groups()
+        if not self.loose and (minor is None or patch is None):
+            return None
+        return int(major), int(minor or 0), int(patch or 0), prerelease
+
+    def key(self, version: str) -> Any | None:
+        parsed = self.parse(version)
+        if parsed is None:
+            return None
+        return _semver_key(*parsed)
+
+    def is_prerelease(self, version: str) -> bool:
+        parsed = self.parse(version)
+        return parsed is not None and parsed[3] is not None
+
+    def parse_constraint(self, spec: str) -> Constraint:
+        sets = [self._parse_set(part.strip()) for part in spec.split("||")]
+        return SemverConstraint(self, sets)
+
+    def _parse_set(self, text: str) -> list[_Comparator]:
+        hyphen = _HYPHEN_RE.match(text)
+        if hyphen:
+            return self._hyphen(*hyphen.groups())
+        # Allow "> = 1.2" style spacing by gluing operators to their operand.
+        text = re.sub(r"(<=|>=|<|>|=|\^|~>?)\s+", r"\1", text)
+        comparators: list[_Comparator] = []
+        for token in text.split() or ["*"]:
+            comparators.extend(self._desugar(token))
+        return comparators
+
+    def _partial(self, text: str) -> tuple[int | None, int | None, int | None, str | None]:
+        match = _PARTIAL_RE.match(text)
+        if not match:
+            raise ValueError(f"Invalid version in constraint: {text!r}")
+        parts = [None if part is None or part in "xX*" else int(part) for part in match.groups()[:3]]
+        major, minor, patch = parts
+        if major is None:
+            minor = patch = None
+        elif minor is None:
+            patch = None
+        return major, minor, patch, match.group(4)
+
+    def _desugar(self, token: str) -> list[_Comparator]:
+        match = _COMPARATOR_RE.match(token)
+        assert match is not None
+        operator, operand = match.group(1) or "", match.group(2)
+        major, minor, patch, prerelease = self._partial(operand)
+
+        if operator == "^":
+            return self._caret(major, minor, patch, prerelease)
+        if operator.startswith("~"):
+            return self._tilde(major, minor, patch, prerelease)
+
+        if major is None:
+            if operator in ("<", ">"):
+                return [_Comparator("<", 0, 0, 0, "0")]
+            return [_Comparator(">=", 0, 0, 0)]
+
+        if minor is None or patch is None:
+            lower_minor = minor or 0
+            if minor is None:
+                upper = (major + 1, 0, 0)
+            else:
+                upper = (major, minor + 1, 0)
+            match operator:
+                case ">":
+                    return [_Comparator(">=", *upper)]
+                case ">=":
+                    return [_Comparator(">=", major, lower_minor, 0)]
+                case "<":
+                    return [_Comparator("<", major, lower_minor, 0, "0")]
+                case "<=":
+                    return [_Comparator("<", *upper, "0")]
+                case _:
+                    return [_Comparator(">=", major, lower_minor, 0), _Comparator("<", *upper, "0")]
+
+        return [_Comparator(operator or "=", major, minor, patch, prerelease)]
+
+    def _tilde(self, major: int | None, minor: int | None, patch: int | None, prerelease: str | None) -> list[_Comparator]:
+        if major is None:
+            return [_Comparator(">=", 0, 0, 0)]
+        if minor is None:
+            return [_Comparator(">=", major, 0, 0), _Comparator("<", major + 1, 0, 0, "0")]
+        return [
+            _Comparator(">=", major, minor, patch or 0, prerelease),
+            _Comparator("<", major, minor + 1, 0, "0"),
+        ]
+
+    def _caret(self, major: int | None, minor: int | None, patch: int | None, prerelease: str | None) -> list[_Comparator]:
+        if major is None:
+            return [_Comparator(">=", 0, 0, 0)]
+        lower = _Comparator(">=", major, minor or 0, patch or 0, prerelease)
+        if major > 0 or minor is None:
+            upper = (major + 1, 0, 0)
+        elif minor > 0 or patch is None:
+            upper = (0, minor + 1, 0)
+        else:
+            upper = (0, 0, patch + 1)
+        return [lower, _Comparator("<", *upper, "0")]
+
+    def _hyphen(self, low: str, high: str) -> list[_Comparator]:
+        low_major, low_minor, low_patch, low_pre = self._partial(low)
+        high_major, high_minor, high_patch, high_pre = self._partial(high)
+        comparators = [_Comparator(">=", low_major or 0, low_minor or 0, low_patch or 0, low_pre)]
+        if high_major is None:
+            return comparators
+        if high_minor is None:
+            comparators.append(_Comparator("<", high_major + 1, 0, 0, "0"))
+        elif high_patch is None:
+            comparators.append(_Comparator("<", high_major, high_minor + 1, 0, "0"))
+        else:
+            comparators.append(_Comparator("<=", high_major, high_minor, high_patch, high_pre))
+        return comparators
+
+
+# --- PEP 440 --------------------------------------------------------------------
+
+
+class Pep440Constraint(Constraint):
+    """A PEP 440 specifier set such as ``>=1.4,<2``."""
+
+    def __init__(self, specifiers: SpecifierSet):
+        self._specifiers = specifiers
+
+    def matches(self, version: str, include_prereleases: bool = False) -> bool:
+        try:
+            prereleases = include_prereleases or bool(self._specifiers.prereleases)
+            return self._specifiers.contains(Version(version), prereleases=prereleases)
+        except InvalidVersion:
+            return False
+
+    def upper_bound(self) -> Any | None:
+        bounds = []
+        for specifier in self._specifiers:
+            if specifier.operator in ("<", "<=", "==", "===") and not specifier.version.endswith(".*"):
+                try:
+                    bounds.append(Version(specifier.version))
+                except InvalidVersion:
+                    return None
+        return min(bounds) if bounds else None
+
+
+class Pep440Scheme(VersionScheme):
+    """PEP 440 versions and specifiers, as used by PyPI."""
+
+    def key(self, version: str) -> Any | None:
+        try:
+            return Version(version)
+        except InvalidVersion:
+            return None
+
+    def is_prerelease(self, version: str) -> bool:
+        parsed = self.key(version)
+        return parsed is not None and parsed.is_prerelease
+
+    def parse_constraint(self, spec: str) -> Constraint:
+        try:
+            return Pep440Constraint(SpecifierSet(spec))
+        except InvalidSpecifier as exc:
+            raise ValueError(f"Invalid PEP 440 specifier: {spec!r}") from exc
+
+
+def get_version_scheme(registry: PackageRegistry) -> VersionScheme:
+    """Return the version scheme used by a registry."""
+    match registry:
+        case PackageRegistry.PYPI:
+            return Pep440Scheme()
+        case PackageRegistry.GITHUB_RELEASE | PackageRegistry.LOCAL:
+            return SemverScheme(loose=True)
+        case _:
+            return SemverScheme()
+
+
+# --- Release index --------------------------------------------------------------
+
+
+class ReleaseIndex:
+    """Releases of a single package, sorted by version for bisection.
+
+    ``tags`` maps registry-named channels (npm dist-tags such as ``next``) to
+    the version they currently point at.
+    """
+
+    def __init__(self, scheme: VersionScheme, releases: Iterable[VersionInfo], tags: dict[str, str] | None = None):
+        self.scheme = scheme
+        self.tags = dict(tags or {})
+        by_version: dict[str, tuple[Any, VersionInfo]] = {}
+        for release in releases:
+            key = scheme.key(release.version)
+            if key is not None:
+                by_version[release.version] = (key, release)
+        ordered = sorted(by_version.values(), key=lambda item: item[0])
+        self._keys = [key for key, _ in ordered]
+        self._releases = [release for _, release in ordered]
+        self._by_version = {release.version: release for release in self._releases}
+
+    def __len__(self) -> int:
+        return len(self._releases)
+
+    def __contains__(self, version: object) -> bool:
+        return version in self._by_version
+
+    @property
+    def releases(self) -> list[VersionInfo]:
+        """All releases in ascending version order."""
+        return list(self._releases)
+
+    def get(self, version: str) -> VersionInfo | None:
+        """Return the release for an exact version string."""
+        return self._by_version.get(version)
+
+    def latest(self, include_prereleases: bool = False) -> VersionInfo | None:
+        """Return the highest release, skipping pre-releases unless asked."""
+        return self._search_down(len(self._releases), lambda release: True, include_prereleases)
+
+    def best_match(self, spec: str, include_prereleases: bool = False) -> VersionInfo | None:
+        """Return the highest release satisfying a constraint expression."""
+        constraint = self.scheme.parse_constraint(spec)
+        bound = constraint.upper_bound()
+        start = len(self._keys) if bound is None else bisect_right(self._keys, bound)
+        return self._search_down(
+            start,
+            lambda release: constraint.matches(release.version, include_prereleases),
+            include_prereleases=None,
+        )
+
+    def newer_than(self, version: str) -> list[VersionInfo]:
+        """Return releases strictly newer than the given version, ascending."""
+        key = self.scheme.key(version)
+        if key is None:
+            return []
+        return self._releases[bisect_right(self._keys, key):]
+
+    def older_than(self, version: str) -> list[VersionInfo]:
+        """Return releases strictly older than the given version, ascending."""
+        key = self.scheme.key(version)
+        if key is None:
+            return []
+        return self._releases[: bisect_left(self._keys, key)]
+
+    def resolve(self, spec: str | None, include_prereleases: bool = False) -> VersionInfo | None:
+        """Resolve a registry tag, "latest", "prerelease", an exact pin or a constraint to a release.
+
+        No spec means "latest": the registry's own ``latest`` tag when it
+        publishes one (npm's dist-tag), else the highest stable release.
+        """
+        if spec is None:
+            spec = LATEST
+        if spec in self.tags:
+            return self.get(self.tags[spec])
+        if spec == PRERELEASE:
+            return self.latest(include_prereleases=True)
+        if spec == LATEST:
+            return self.latest(include_prereleases) or self.latest(include_prereleases=True)
+        if self.scheme.is_exact(spec):
+            return self.get(spec)
+        return self.best_match(spec, include_prereleases)
+
+    def _search_down(
+        self,
+        start: int,
+        predicate: Callable[[VersionInfo], bool],
+        include_prereleases: bool | None,
+    ) -> VersionInfo | None:
+        # include_prereleases=None defers entirely to the predicate, which is
+        # how constraint objects apply their own pre-release rules.
+        for position in range(start - 1, -1, -1):
+            release = self._releases[position]
+            if include_prereleases is False and self.scheme.is_prerelease(release.version):
+                continue
+            if predicate(release):
+                return release
+        return None
+
+
+class ReleaseIndexCache:
+    """Process-wide cache of release indexes keyed by registry and package."""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[float, ReleaseIndex]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, registry: PackageRegistry, package_name: str) -> ReleaseIndex | None:
+        with self._lock:
+            entry = self._entries.get((registry.value, package_name))
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, registry: PackageRegistry, package_name: str, index: ReleaseIndex) -> None:
+        with self._lock:
+            self._entries[(registry.value, package_name)] = (time.monotonic(), index)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+release_index_cache = ReleaseIndexCache()
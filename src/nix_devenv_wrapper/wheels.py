@@ -0,0 +1,123 @@
+"""Wheel tag parsing and per-system wheel selection."""
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+from nix_devenv_wrapper.models import WheelFile
+
+# Nix system -> (platform family, accepted architecture suffixes, most specific first)
+SYSTEM_PLATFORMS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "x86_64-linux": ("linux", ("x86_64",)),
+    "aarch64-linux": ("linux", ("aarch64",)),
+    "x86_64-darwin": ("darwin", ("x86_64", "intel", "universal2", "universal")),
+    "aarch64-darwin": ("darwin", ("arm64", "universal2")),
+}
+
+_LEGACY_MANYLINUX = {"manylinux1": (2, 5), "manylinux2010": (2, 12), "manylinux2014": (2, 17)}
+_MANYLINUX_RE = re.compile(r"^manylinux_(\d+)_(\d+)_(\w+)$")
+_LEGACY_MANYLINUX_RE = re.compile(r"^(manylinux1|manylinux2010|manylinux2014)_(\w+)$")
+_MACOS_RE = re.compile(r"^macosx_(\d+)_(\d+)_(\w+)$")
+_NIX_PYTHON_RE = re.compile(r"^python(\d)(\d+)")
+
+
+def python_version_for(nix_package: str) -> tuple[int, int] | None:
+    """Return the CPython version of a nixpkgs interpreter attribute (e.g. python312), if known."""
+    match = _NIX_PYTHON_RE.match(nix_package)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def parse_wheel_tags(filename: str) -> tuple[set[str], set[str], set[str]]:
+    """Split a wheel filename into its (python, abi, platform) tag sets.
+
+    Compressed tag sets such as ``py2.py3`` are expanded.
+    """
+    if not filename.endswith(".whl"):
+        raise ValueError(f"Not a wheel filename: {filename}")
+    parts = filename[: -len(".whl")].split("-")
+    if len(parts) < 5:
+        raise ValueError(f"Invalid wheel filename: {filename}")
+    python, abi, platform = parts[-3:]
+    return set(python.split(".")), set(abi.split(".")), set(platform.split("."))
+
+
+def _interpreter_score(pythons: set[str], abis: set[str], target: tuple[int, int] | None) -> int:
+    """Rank interpreter compatibility: 3 exact CPython ABI, 2 stable ABI, 1 pure, 0 incompatible."""
+    if target is not None:
+        major, minor = target
+        cpython = f"cp{major}{minor}"
+        if cpython in abis and cpython in pythons:
+            return 3
+        if "abi3" in abis:
+            for tag in pythons:
+                match = re.match(r"^cp(\d)(\d+)$", tag)
+                if match and int(match.group(1)) == major and int(match.group(2)) <= minor:
+                    return 2
+        if "none" in abis and pythons & {f"py{major}", f"py{major}{minor}", cpython}:
+            return 1
+        return 0
+    # Unknown interpreter version: only version-independent pure wheels are safe.
+    return 1 if "none" in abis and "py3" in pythons else 0
+
+
+def _platform_score(platforms: set[str], system: str) -> tuple[int, ...] | None:
+    """Rank a wheel's platform tags for a Nix system, or None if none apply.
+
+    Platform wheels beat ``any``. Among manylinux wheels the newest glibc
+    baseline wins (nixpkgs' glibc is recent); among macOS wheels the exact
+    architecture beats universal builds, then the oldest deployment target.
+    """
+    family, archs = SYSTEM_PLATFORMS[system]
+    best: tuple[int, ...] | None = None
+    for platform in platforms:
+        score: tuple[int, ...] | None = None
+        if platform == "any":
+            score = (0,)
+        elif family == "linux":
+            match = _MANYLINUX_RE.match(platform)
+            if match and match.group(3) in archs:
+                score = (1, int(match.group(1)), int(match.group(2)))
+            legacy = _LEGACY_MANYLINUX_RE.match(platform)
+            if legacy and legacy.group(2) in archs:
+                score = (1, *_LEGACY_MANYLINUX[legacy.group(1)])
+        elif family == "darwin":
+            match = _MACOS_RE.match(platform)
+            if match and match.group(3) in archs:
+                score = (1, -archs.index(match.group(3)), -int(match.group(1)), -int(match.group(2)))
+        if score is not None and (best is None or score > best):
+            best = score
+    return best
+
+
+def select_wheels(
+    wheels: Iterable[WheelFile],
+    python_version: tuple[int, int] | None,
+    systems: Iterable[str],
+) -> dict[str, WheelFile]:
+    """Pick the best wheel for each Nix system.
+
+    Raises ValueError naming the systems that no published wheel supports.
+    """
+    parsed = [(wheel, *parse_wheel_tags(wheel.filename)) for wheel in wheels]
+    selected: dict[str, WheelFile] = {}
+    missing: list[str] = []
+    for system in systems:
+        if system not in SYSTEM_PLATFORMS:
+            raise ValueError(f"Unsupported wheel system {system!r}; expected one of {sorted(SYSTEM_PLATFORMS)}")
+        best: tuple[int, tuple[int, ...]] | None = None
+        for wheel, pythons, abis, platforms in parsed:
+            interpreter = _interpreter_score(pythons, abis, python_version)
+            platform = _platform_score(platforms, system)
+            if not interpreter or platform is None:
+                continue
+            rank = (interpreter, platform)
+            if best is None or rank > best:
+                best = rank
+                selected[system] = wheel
+        if best is None:
+            missing.append(system)
+    if missing:
+        raise ValueError(f"No compatible wheel published for: {', '.join(missing)}")
+    return selected
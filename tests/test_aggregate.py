@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import tomllib
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.cli.main import run
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.generators import generate_aggregate_flake_nix
+from nix_devenv_wrapper.models import FlakeConfig
+
+WRAPPER_TOML = """
+flake_name = "{name}"
+
+[source]
+registry = "npm"
+name = "{name}"
+{channels}
+
+[runtime]
+type = "nodejs"
+nix_package = "nodejs_22"
+
+[wrapper]
+binary_name = "{name}"
+entry_point = "cli.js"
+
+[meta]
+description = "{name}"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+
+def _config(name: str, channels: str = "") -> FlakeConfig:
+    return config_from_data(tomllib.loads(WRAPPER_TOML.format(name=name, channels=channels)))
+
+
+def test_one_overlay_holds_every_package_and_channel() -> None:
+    flake = generate_aggregate_flake_nix(
+        [("tools/a", _config("a", 'channels = { next = "next" }')), ("b", _config("b"))]
+    )
+
+    assert "a = final.callPackage ./tools/a/package.nix { };" in flake
+    assert "a-next = final.callPackage ./tools/a/package-next.nix { };" in flake
+    assert "b = final.callPackage ./b/package.nix { };" in flake
+    assert flake.count("import nixpkgs") == 1
+
+
+@pytest.mark.parametrize("directory", ["/abs/a", "../a"])
+def test_wrappers_must_live_inside_the_aggregate(directory: str) -> None:
+    with pytest.raises(ValueError, match="inside the aggregate"):
+        generate_aggregate_flake_nix([(directory, _config("a"))])
+
+
+def test_duplicate_flake_names_are_rejected() -> None:
+    with pytest.raises(ValueError, match="Duplicate flake_name 'a'"):
+        generate_aggregate_flake_nix([("one", _config("a")), ("two", _config("a"))])
+
+
+def test_broken_wrapper_is_reported_and_nothing_is_written(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "wrapper.toml").write_text(WRAPPER_TOML.format(name=name, channels=""))
+    (tmp_path / "b" / "wrapper.toml").write_text("flake_name = ")
+    output = tmp_path / "flake.nix"
+
+    assert run(["--no-history", "--fleet", str(tmp_path), "aggregate", "-o", str(output)]) == 1
+
+    assert "[b] Error:" in capsys.readouterr().err
+    assert not output.exists()
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.artifacts import CHUNK_SIZE, ArtifactStore
+
+BODY = bytes(range(256)) * (CHUNK_SIZE // 256 + 1)
+
+
+class Server:
+    """Serves BODY with an ETag, honouring Range and If-Range like a static file host."""
+
+    def __init__(self, etag: str = '"v1"', body: bytes = BODY):
+        self.etag = etag
+        self.body = body
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        headers = {"etag": self.etag}
+        range_header = request.headers.get("range")
+        if range_header and request.headers.get("if-range") in (None, self.etag):
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            return httpx.Response(206, headers=headers, content=self.body[start:])
+        return httpx.Response(200, headers=headers, content=self.body)
+
+
+def _store(tmp_path: Path, server: Server, max_bytes: int = 1 << 30) -> ArtifactStore:
+    return ArtifactStore(tmp_path / "store", max_bytes, client=httpx.Client(transport=httpx.MockTransport(server)))
+
+
+def _interrupt(store: ArtifactStore, url: str) -> None:
+    # Abort after the first chunk has been written, leaving a partial download behind.
+    polls = iter([False, True])
+    with pytest.raises(CancelledError):
+        store.fetch(url, cancelled=lambda: next(polls))
+
+
+def test_interrupted_download_resumes_with_if_range(tmp_path: Path) -> None:
+    server = Server()
+    store = _store(tmp_path, server)
+    _interrupt(store, "https://example.com/a.tgz")
+
+    blob = store.fetch("https://example.com/a.tgz")
+
+    resumed = server.requests[-1]
+    assert resumed.headers["range"] == f"bytes={CHUNK_SIZE}-"
+    assert resumed.headers["if-range"] == '"v1"'
+    assert blob.read_bytes() == BODY
+    assert store.digest("https://example.com/a.tgz") == hashlib.sha256(BODY).hexdigest()
+    assert store.validator("https://example.com/a.tgz") == '"v1"'
+
+
+def test_changed_upstream_restarts_download(tmp_path: Path) -> None:
+    server = Server()
+    store = _store(tmp_path, server)
+    _interrupt(store, "https://example.com/a.tgz")
+    server.etag, server.body = '"v2"', BODY[::-1]
+
+    blob = store.fetch("https://example.com/a.tgz")
+
+    assert server.requests[-1].headers["if-range"] == '"v1"'
+    assert blob.read_bytes() == BODY[::-1]
+
+
+def test_cached_artifact_is_not_downloaded_again(tmp_path: Path) -> None:
+    server = Server()
+    store = _store(tmp_path, server)
+
+    first = store.fetch("https://example.com/a.tgz")
+    second = store.fetch("https://example.com/a.tgz", expected_digest=hashlib.sha256(BODY).hexdigest())
+
+    assert first == second
+    assert len(server.requests) == 1
+    with pytest.raises(ValueError, match="Digest mismatch"):
+        _store(tmp_path / "other", Server()).fetch("https://example.com/b.tgz", expected_digest="0" * 64)
+
+
+def test_least_recently_used_blobs_are_evicted(tmp_path: Path) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=request.url.path[-1].encode() * 100)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    store = ArtifactStore(tmp_path / "store", max_bytes=250, client=client)
+    os.utime(store.fetch("https://example.com/a"), (0, 0))
+    store.fetch("https://example.com/b")
+
+    store.fetch("https://example.com/c")
+
+    assert store.lookup("https://example.com/a") is None
+    assert store.lookup("https://example.com/b") is not None
+    assert store.lookup("https://example.com/c") is not None
+    assert store.total_size() == 200
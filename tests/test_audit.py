@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import stat
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.artifacts import ArtifactStore
+from nix_devenv_wrapper.audit import AuditStatus, HashAuditor
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.generators import generate_package_nix
+from nix_devenv_wrapper.hashing import nix_base32
+from nix_devenv_wrapper.models import VersionInfo
+from nix_devenv_wrapper.updater import Updater
+
+BODY = b"tool tarball\n"
+SHA256 = nix_base32(hashlib.sha256(BODY).digest())
+NAR_SHA256 = nix_base32(hashlib.sha256(b"unpacked tree").digest())
+URL = "https://example.com/tool-1.0.0.tgz"
+
+WRAPPER_TOML = """
+flake_name = "tool"
+
+[source]
+registry = "{registry}"
+name = "{name}"
+
+[runtime]
+type = "none"
+nix_package = "bash"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "bin/tool"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+# Stands in for nix-prefetch-url: records its arguments and prints a NAR hash.
+STUB_PREFETCH = """#!/bin/sh
+echo "$@" >> "{calls}"
+echo "{sha256}"
+"""
+
+
+class Server:
+    """Serves BODY with an ETag, answering a matching If-None-Match with 304."""
+
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, headers={"etag": '"v1"'}, content=BODY)
+
+
+def _wrapper(root: Path, sha256: str, registry: str = "npm", name: str = "tool") -> Wrapper:
+    root.mkdir()
+    (root / "wrapper.toml").write_text(WRAPPER_TOML.format(registry=registry, name=name))
+    wrapper = Wrapper.from_dir(root)
+    config = load_config(wrapper.config_path)
+    wrapper.package_nix.write_text(generate_package_nix(config, "1.0.0", sha256, tag_template="v{version}"))
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def _offline_registry(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        Updater, "get_version_info", lambda self, version: VersionInfo(version=version, tarball_url=URL)
+    )
+
+
+def _client(server: Server) -> httpx.Client:
+    return httpx.Client(transport=httpx.MockTransport(server))
+
+
+def test_shared_url_is_downloaded_once(tmp_path: Path) -> None:
+    server = Server()
+    wrappers = [_wrapper(tmp_path / "good", SHA256), _wrapper(tmp_path / "bad", "1" * 52)]
+
+    good, bad = HashAuditor(max_workers=4, session=_client(server)).audit(wrappers)  # type: ignore[arg-type]
+
+    assert good.status == AuditStatus.OK and good.actual == SHA256
+    assert bad.status == AuditStatus.MISMATCH and bad.actual == SHA256 and bad.expected == "1" * 52
+    assert len(server.requests) == 1
+
+
+def test_cached_copy_is_revalidated_instead_of_downloaded(tmp_path: Path) -> None:
+    server = Server()
+    store = ArtifactStore(tmp_path / "store", client=_client(server))
+    store.fetch(URL)
+    wrapper = _wrapper(tmp_path / "tool", SHA256)
+
+    (result,) = HashAuditor(store=store, session=_client(server)).audit([wrapper])  # type: ignore[arg-type]
+
+    assert result.status == AuditStatus.OK and result.revalidated
+    assert server.requests[-1].headers["if-none-match"] == '"v1"'
+    assert len(server.requests) == 2
+
+
+def test_github_sources_are_compared_by_nar_hash(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    script = bin_dir / "nix-prefetch-url"
+    script.write_text(STUB_PREFETCH.format(calls=calls, sha256=NAR_SHA256))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", str(bin_dir))
+    server = Server()
+    wrapper = _wrapper(tmp_path / "tool", NAR_SHA256, registry="github_release", name="owner/tool")
+
+    (result,) = HashAuditor(session=_client(server)).audit([wrapper])  # type: ignore[arg-type]
+
+    assert result.status == AuditStatus.OK
+    assert "--unpack" in calls.read_text().split()
+    assert server.requests == []
+
+
+def test_github_sources_are_skipped_without_nix(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("PATH", str(tmp_path / "missing"))
+    server = Server()
+    wrapper = _wrapper(tmp_path / "tool", SHA256, registry="github_release", name="owner/tool")
+
+    (result,) = HashAuditor(session=_client(server)).audit([wrapper])  # type: ignore[arg-type]
+
+    assert result.status == AuditStatus.SKIPPED
+    assert "--unpack" in (result.error or "")
+    assert server.requests == []
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.hashing import nix_base32
+from nix_devenv_wrapper.registries import cargo
+from nix_devenv_wrapper.registries.cargo import CargoRegistry, index_path
+
+CKSUM = hashlib.sha256(b"crate").hexdigest()
+ENTRIES = [
+    {"name": "ripgrep", "vers": "1.0.0", "cksum": CKSUM},
+    {"name": "ripgrep", "vers": "1.1.0", "cksum": CKSUM, "pubtime": "2026-01-02T00:00:00Z"},
+    {"name": "ripgrep", "vers": "1.2.0", "cksum": CKSUM, "yanked": True},
+]
+
+
+@pytest.mark.parametrize(
+    ("crate", "path"),
+    [("a", "1/a"), ("ab", "2/ab"), ("abc", "3/a/abc"), ("Serde", "se/rd/serde"), ("ripgrep", "ri/pg/ripgrep")],
+)
+def test_index_path(crate: str, path: str) -> None:
+    assert index_path(crate) == path
+
+
+def test_index_is_revalidated_with_conditional_requests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        body = "\n".join(json.dumps(entry) for entry in ENTRIES) + "\n"
+        return httpx.Response(200, headers={"etag": '"v1"'}, text=body)
+
+    monkeypatch.setattr(cargo, "borrow", lambda timeout: httpx.Client(transport=httpx.MockTransport(handler)))
+
+    with CargoRegistry(cache_dir=tmp_path) as registry:
+        fetched = registry.list_versions("ripgrep")
+    with CargoRegistry(cache_dir=tmp_path) as registry:
+        assert registry.get_latest_version("ripgrep") == "1.1.0"
+        cached = registry.list_versions("ripgrep")
+
+    assert [release.version for release in fetched] == ["1.0.0", "1.1.0"]
+    assert cached == fetched
+    assert fetched[0].sha256 == nix_base32(bytes.fromhex(CKSUM))
+    assert fetched[0].tarball_url == "https://static.crates.io/crates/ripgrep/ripgrep-1.0.0.crate"
+    assert [str(request.url) for request in requests] == ["https://index.crates.io/ri/pg/ripgrep"] * 2
+    assert [request.headers.get("if-none-match") for request in requests] == [None, '"v1"']
+
+
+def test_unknown_crate_is_reported(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+    monkeypatch.setattr(cargo, "borrow", lambda timeout: client)
+
+    with CargoRegistry(cache_dir=tmp_path) as registry, pytest.raises(ValueError, match="not found"):
+        registry.list_versions("missing")
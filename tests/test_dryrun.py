@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.dryrun import dry_run_wrapper
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.generators import generate_package_nix
+
+WRAPPER_TOML = """
+flake_name = "tool"
+devenv_enabled = true
+
+[source]
+registry = "npm"
+name = "tool"
+
+[runtime]
+type = "nodejs"
+nix_package = "nodejs_22"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "cli.js"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+HAND_EDIT = "# keep: patched by hand\n"
+
+
+def _wrapper(tmp_path: Path) -> Wrapper:
+    (tmp_path / "wrapper.toml").write_text(WRAPPER_TOML)
+    wrapper = Wrapper.from_dir(tmp_path)
+    package_nix = generate_package_nix(load_config(wrapper.config_path), "1.1.0", "1" * 52)
+    wrapper.package_nix.write_text(HAND_EDIT + package_nix)
+    wrapper.flake_nix.write_text("stale flake\n")
+    return wrapper
+
+
+def test_dry_run_previews_the_in_place_edit(tmp_path: Path) -> None:
+    wrapper = _wrapper(tmp_path)
+
+    result = dry_run_wrapper(wrapper, "1.2.0")
+
+    assert (result.current_version, result.target_version) == ("1.1.0", "1.2.0")
+    (diff,) = result.diffs
+    changed = [line for line in diff.splitlines() if line[:1] in "+-" and line[:3] not in ("+++", "---")]
+    assert changed == [
+        '-  version = "1.1.0";',
+        '+  version = "1.2.0";',
+        f'-    sha256 = "{"1" * 52}";',
+        f'+    sha256 = "{"0" * 52}";',
+    ]
+    assert "flake.nix" not in diff
+    assert wrapper.package_nix.read_text().startswith(HAND_EDIT)
+
+
+def test_dry_run_regenerate_drops_hand_edits(tmp_path: Path) -> None:
+    wrapper = _wrapper(tmp_path)
+
+    (diff,) = dry_run_wrapper(wrapper, "1.2.0", regenerate=True).diffs
+
+    assert f"-{HAND_EDIT}" in diff
+
+
+def test_dry_run_follows_downgrade_rules(tmp_path: Path) -> None:
+    wrapper = _wrapper(tmp_path)
+
+    with pytest.raises(ValueError, match="Refusing to downgrade"):
+        dry_run_wrapper(wrapper, "1.0.0")
+    assert dry_run_wrapper(wrapper, "1.0.0", allow_downgrade=True).target_version == "1.0.0"
+    assert dry_run_wrapper(wrapper, "1.1.0").diffs == []
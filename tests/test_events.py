@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import io
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.cli import main
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.events import Event, EventType, NdjsonWriter
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.generators import generate_package_nix
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import PackageRegistry, VersionInfo
+
+WRAPPER_TOML = """
+flake_name = "tool"
+
+[source]
+registry = "npm"
+name = "tool"
+
+[runtime]
+type = "nodejs"
+nix_package = "nodejs_22"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "cli.js"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+# Present on every event; everything else is omitted when unset.
+REQUIRED_FIELDS = {"event", "wrapper", "duration", "timestamp"}
+
+
+def _lines(text: str) -> list[dict[str, object]]:
+    events = [json.loads(line) for line in text.splitlines()]
+    for event in events:
+        assert REQUIRED_FIELDS <= event.keys()
+        assert event["event"] in {member.value for member in EventType}
+        assert None not in event.values()
+    return events
+
+
+def test_events_are_written_one_compact_object_per_line() -> None:
+    stream = io.StringIO()
+    writer = NdjsonWriter(stream)
+    event = Event(event=EventType.HASHED, wrapper="/w", package_file="package.nix", version="1.0.0", sha256="a" * 52)
+
+    writer(event)
+
+    (line,) = _lines(stream.getvalue())
+    assert set(line) == REQUIRED_FIELDS | {"package_file", "version", "sha256"}
+    assert Event.model_validate(line) == event
+
+
+def test_concurrent_events_are_not_interleaved() -> None:
+    stream = io.StringIO()
+    writer = NdjsonWriter(stream)
+
+    def emit(index: int) -> None:
+        for _ in range(50):
+            writer(Event(event=EventType.WRITTEN, wrapper=f"/w{index}", paths=[f"/w{index}/package.nix"] * 20))
+
+    threads = [threading.Thread(target=emit, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(_lines(stream.getvalue())) == 400
+
+
+def test_check_reports_each_wrapper_as_an_event(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    fleet = tmp_path / "fleet"
+    (fleet / "good").mkdir(parents=True)
+    (fleet / "good" / "wrapper.toml").write_text(WRAPPER_TOML)
+    good = Wrapper.from_dir(fleet / "good")
+    good.package_nix.write_text(generate_package_nix(load_config(good.config_path), "1.1.0", "1" * 52))
+    (fleet / "broken").mkdir()
+    (fleet / "broken" / "wrapper.toml").write_text("flake_name = ")
+    history = ReleaseHistory(tmp_path / "history.sqlite3")
+    history.record(PackageRegistry.NPM, "tool", [VersionInfo(version="1.2.0", tarball_url="https://e.com/t.tgz")])
+
+    argv = ["--fleet", str(fleet), "check", "--offline", "--format", "ndjson"]
+    assert main.run(argv, history=history) == 1
+
+    events = {event["wrapper"]: event for event in _lines(capsys.readouterr().out)}
+    assert events[str(fleet / "broken")]["event"] == "failed"
+    assert events[str(fleet / "good")] | {"duration": 0, "timestamp": 0} == {
+        "event": "resolved",
+        "wrapper": str(fleet / "good"),
+        "package_file": "package.nix",
+        "version": "1.2.0",
+        "current_version": "1.1.0",
+        "update_available": True,
+        "duration": 0,
+        "timestamp": 0,
+    }
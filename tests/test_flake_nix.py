@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import pytest
+
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.generators import generate_flake_nix
+
+
+def _fast_eval_flake(license: str) -> str:
+    return generate_flake_nix(
+        config_from_data(
+            {
+                "flake_name": "tool",
+                "flake_mode": "fast-eval",
+                "source": {"registry": "npm", "name": "tool"},
+                "runtime": {"type": "nodejs", "nix_package": "nodejs_22"},
+                "wrapper": {"binary_name": "tool", "entry_point": "cli.js"},
+                "meta": {"description": "tool", "homepage": "https://example.com", "license": license},
+            }
+        )
+    )
+
+
+@pytest.mark.parametrize("license", ["mit", "unfree", "unfreeRedistributable", "bsl11"])
+def test_fast_eval_lets_nixpkgs_decide_whether_the_license_is_free(license: str) -> None:
+    flake = _fast_eval_flake(license)
+
+    assert f"if nixpkgs.lib.licenses.{license}.free" in flake
+    assert "then nixpkgs.legacyPackages" in flake
+    assert "config.allowUnfree = true;" in flake
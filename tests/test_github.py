@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.registries import github
+from nix_devenv_wrapper.registries.github import GitHubRegistry, TagConventions, parse_tag, render_tag, tag_template
+
+
+@pytest.mark.parametrize(
+    ("tag", "version", "template"),
+    [
+        ("v1.2.3", "1.2.3", "v{version}"),
+        ("1.2.3", "1.2.3", "{version}"),
+        ("release-1.2", "1.2", "release-{version}"),
+        ("tool@1.2.3", "1.2.3", "tool@{version}"),
+        ("v1.2.3_linux", "1.2.3", "v{version}_linux"),
+        # The version must stand alone, not be part of a longer one.
+        ("v1.2.3", "1.2", None),
+        ("v12.3", "2.3", None),
+        ("v1.2.3", "2.3", None),
+        ("1.2.3-rc1", "1.2.3", None),
+        # A later standalone occurrence still matches.
+        ("tool2-2", "2", "tool2-{version}"),
+    ],
+)
+def test_tag_template(tag: str, version: str, template: str | None) -> None:
+    assert tag_template(tag, version) == template
+    if template is not None:
+        assert render_tag(template, version) == tag
+        assert parse_tag(template, tag) == version
+
+
+@pytest.mark.parametrize(
+    ("template", "tag", "version"),
+    [
+        ("v{version}", "v2.0.0", "2.0.0"),
+        ("release-{version}-final", "release-2.0-final", "2.0"),
+        ("v{version}", "2.0.0", None),
+        ("v{version}", "v", None),
+        ("{version}-linux", "2.0.0-darwin", None),
+    ],
+)
+def test_parse_tag(template: str, tag: str, version: str | None) -> None:
+    assert parse_tag(template, tag) == version
+
+
+def _registry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, routes: dict[str, object]) -> GitHubRegistry:
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        body = routes.get(request.url.path)
+        return httpx.Response(404) if body is None else httpx.Response(200, content=json.dumps(body).encode())
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(github, "borrow", lambda headers, timeout: client)
+    registry = GitHubRegistry(conventions=TagConventions(tmp_path / "conventions.json"))
+    registry.requests = requests  # type: ignore[attr-defined]
+    return registry
+
+
+def _release(tag: str) -> dict[str, object]:
+    return {"tag_name": tag, "tarball_url": f"https://example.com/{tag}.tgz", "published_at": None}
+
+
+def test_convention_is_learned_once_from_matching_refs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    refs = [{"ref": "refs/tags/tool-1.0"}, {"ref": "refs/tags/v1.0"}, {"ref": "refs/tags/v1.0.1"}]
+    registry = _registry(
+        tmp_path,
+        monkeypatch,
+        {
+            "/repos/owner/tool/git/matching-refs/tags": refs,
+            "/repos/owner/tool/releases/tags/v1.0": _release("v1.0"),
+            "/repos/owner/tool/releases/tags/v1.1": _release("v1.1"),
+        },
+    )
+
+    assert registry.get_version_info("owner/tool", "1.0").tag == "v1.0"
+    assert registry.get_version_info("owner/tool", "1.1").tag == "v1.1"
+
+    assert registry.requests.count("/repos/owner/tool/git/matching-refs/tags") == 1  # type: ignore[attr-defined]
+    assert TagConventions(tmp_path / "conventions.json").get("owner/tool") == "v{version}"
+
+
+def test_changed_convention_is_relearned(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(
+        tmp_path,
+        monkeypatch,
+        {
+            "/repos/owner/tool/git/matching-refs/tags": [{"ref": "refs/tags/release-2.0"}],
+            "/repos/owner/tool/releases/tags/release-2.0": _release("release-2.0"),
+        },
+    )
+    registry.conventions.put("owner/tool", "v{version}")
+
+    assert registry.get_version_info("owner/tool", "2.0").tag == "release-2.0"
+    assert registry.conventions.get("owner/tool") == "release-{version}"
+
+
+def test_latest_release_teaches_the_convention(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(tmp_path, monkeypatch, {"/repos/owner/tool/releases/latest": _release("cli-v3.1.0")})
+
+    assert registry.get_latest_version("owner/tool") == "3.1.0"
+    assert registry.tag_template("owner/tool") == "cli-v{version}"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import stat
+import time
+from concurrent.futures import CancelledError
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.hashing import PrefetchPool
+
+# Stands in for nix-prefetch-url: logs each URL it is run for, then prints a hash and store path.
+STUB_PREFETCH = """#!/bin/sh
+for url; do :; done
+echo "$url" >> "{calls}"
+sleep "{sleep}"
+echo "hash-of-$(basename "$url")"
+echo "{store}/$(basename "$url")"
+"""
+
+
+def _stub_prefetch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, sleep: float = 0.3) -> Path:
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    calls.touch()
+    script = bin_dir / "nix-prefetch-url"
+    script.write_text(STUB_PREFETCH.format(calls=calls, sleep=sleep, store=tmp_path / "store"))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    return calls
+
+
+def test_concurrent_submissions_share_one_prefetch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = _stub_prefetch(tmp_path, monkeypatch)
+
+    with PrefetchPool(max_workers=4) as pool:
+        futures = [pool.submit("https://example.com/a.tgz") for _ in range(5)]
+        other = pool.submit("https://example.com/b.tgz")
+
+        assert all(future is futures[0] for future in futures)
+        assert futures[0].result() == "hash-of-a.tgz"
+        assert other.result() == "hash-of-b.tgz"
+
+    assert sorted(calls.read_text().split()) == ["https://example.com/a.tgz", "https://example.com/b.tgz"]
+
+
+def test_finished_prefetch_is_not_reused(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = _stub_prefetch(tmp_path, monkeypatch, sleep=0)
+
+    with PrefetchPool() as pool:
+        first = pool.submit("https://example.com/a.tgz")
+        first.result()
+        second = pool.submit("https://example.com/a.tgz")
+
+        assert second is not first
+        assert second.result() == "hash-of-a.tgz"
+
+    assert len(calls.read_text().split()) == 2
+
+
+def test_cancel_kills_running_prefetch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _stub_prefetch(tmp_path, monkeypatch, sleep=30)
+
+    with PrefetchPool() as pool:
+        future = pool.submit("https://example.com/slow.tgz")
+        time.sleep(0.3)
+        started = time.monotonic()
+
+        assert pool.cancel("https://example.com/slow.tgz")
+        with pytest.raises(CancelledError):
+            future.result()
+        assert time.monotonic() - started < 10
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.cli import main
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import PackageRegistry, VersionInfo
+
+NPM = PackageRegistry.NPM
+
+
+def _release(version: str, url: str | None = None, **fields: str) -> VersionInfo:
+    return VersionInfo(version=version, tarball_url=url or f"https://example.com/tool-{version}.tgz", **fields)
+
+
+def test_upserts_keep_known_digests_and_publish_times(tmp_path: Path) -> None:
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        history.record(NPM, "tool", [_release("1.0.0", sha256="a" * 52, published_at="2026-01-01T00:00:00Z")])
+        history.record(NPM, "tool", [_release("1.0.0"), _release("1.1.0")])
+
+        assert history.get(NPM, "tool", "1.0.0") == _release(
+            "1.0.0", sha256="a" * 52, published_at="2026-01-01T00:00:00Z"
+        )
+        assert [release.version for release in history.releases(NPM, "tool")] == ["1.0.0", "1.1.0"]
+        assert history.releases(PackageRegistry.PYPI, "tool") == []
+
+
+def test_changed_tarball_url_drops_the_stale_digest(tmp_path: Path) -> None:
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        history.record(NPM, "tool", [_release("1.0.0", sha256="a" * 52)])
+        history.record(NPM, "tool", [_release("1.0.0", url="https://mirror.example.com/tool-1.0.0.tgz")])
+
+        release = history.get(NPM, "tool", "1.0.0")
+        assert release is not None
+        assert release.tarball_url == "https://mirror.example.com/tool-1.0.0.tgz"
+        assert release.sha256 is None
+
+
+def test_record_hash_attaches_to_every_release_with_the_url(tmp_path: Path) -> None:
+    shared = "https://example.com/tool-latest.tgz"
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        history.record(NPM, "tool", [_release("1.0.0", url=shared), _release("1.0.0-1", url=shared)])
+
+        history.record_hash(NPM, "tool", _release("1.0.0", url=shared), "b" * 52)
+        history.record_hash(NPM, "tool", _release("2.0.0"), "c" * 52)
+
+        assert {release.version: release.sha256 for release in history.releases(NPM, "tool")} == {
+            "1.0.0": "b" * 52,
+            "1.0.0-1": "b" * 52,
+            "2.0.0": "c" * 52,
+        }
+
+
+def test_tags_are_replaced_on_each_sync(tmp_path: Path) -> None:
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        assert history.last_synced(NPM, "tool") is None
+        history.record(NPM, "tool", [_release("1.0.0")], {"latest": "1.0.0", "next": "1.0.0"})
+        history.record(NPM, "tool", [_release("1.1.0")], {"latest": "1.1.0"})
+
+        assert history.tags(NPM, "tool") == {"latest": "1.1.0"}
+        assert history.last_synced(NPM, "tool") is not None
+
+
+def test_only_commands_that_use_the_history_open_it(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    opened: list[object] = []
+    monkeypatch.setattr(main, "ReleaseHistory", lambda: opened.append(object()) or ReleaseHistory(tmp_path / "h"))
+    (tmp_path / "fleet").mkdir()
+
+    main.run(["--fleet", str(tmp_path / "fleet"), "aggregate", "-o", str(tmp_path / "flake.nix")])
+    main.run(["--fleet", str(tmp_path / "fleet"), "verify"])
+    assert opened == []
+
+    main.run(["--fleet", str(tmp_path / "fleet"), "history"])
+    assert len(opened) == 1
+
+
+def test_rollback_reports_a_broken_config_per_wrapper(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "wrapper.toml").write_text("flake_name = ")
+
+    assert main.run(["--no-history", "--fleet", str(tmp_path), "rollback"]) == 1
+    assert main.run(["--no-history", "--fleet", str(tmp_path), "history"]) == 1
+
+    err = capsys.readouterr().err
+    assert err.count("[a] Error:") == 2 and err.count("[b] Error:") == 2
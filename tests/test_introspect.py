@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import tarfile
+from collections.abc import Iterator
+
+import pytest
+
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.introspect import DetectedBinaries, config_warnings, inspect_archive
+from nix_devenv_wrapper.models import PackageRegistry
+
+NPM = PackageRegistry.NPM
+PYPI = PackageRegistry.PYPI
+GITHUB = PackageRegistry.GITHUB_RELEASE
+
+
+def _archive(files: dict[str, str | bytes], executables: tuple[str, ...] = (), mode: str = "w:gz") -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:  # type: ignore[call-overload]
+        for name, content in files.items():
+            data = content.encode() if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o755 if name in executables else 0o644
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def _chunks(data: bytes, read: list[int] | None = None, size: int = 4096) -> Iterator[bytes]:
+    for start in range(0, len(data), size):
+        if read is not None:
+            read.append(start)
+        yield data[start:start + size]
+
+
+@pytest.mark.parametrize(
+    ("package_json", "binaries"),
+    [
+        ({"name": "tool", "bin": {"tool": "./bin/tool.js", "tool-dev": "bin/dev.js"}},
+         {"tool": "bin/tool.js", "tool-dev": "bin/dev.js"}),
+        ({"name": "@scope/tool", "bin": "cli.js"}, {"tool": "cli.js"}),
+        ({"name": "library"}, {}),
+    ],
+)
+def test_npm_bins_come_from_package_json(package_json: dict[str, object], binaries: dict[str, str]) -> None:
+    data = _archive({"package/package.json": json.dumps(package_json), "package/cli.js": ""})
+
+    detected = inspect_archive(_chunks(data), NPM)
+
+    assert detected.binaries == binaries
+
+
+def test_download_stops_at_the_manifest() -> None:
+    data = _archive(
+        {"package/package.json": json.dumps({"name": "tool", "bin": "cli.js"}), "package/blob": os.urandom(1 << 20)},
+        mode="w",
+    )
+    read: list[int] = []
+
+    assert inspect_archive(_chunks(data, read), NPM).binaries == {"tool": "cli.js"}
+    assert len(read) < len(data) // 4096 // 4
+
+
+@pytest.mark.parametrize(
+    ("files", "binaries", "source"),
+    [
+        ({"tool-1.0/pyproject.toml": '[project.scripts]\ntool = "tool.cli:main"\n'},
+         {"tool": "tool.cli:main"}, "pyproject.toml"),
+        ({"tool-1.0/pyproject.toml": '[tool.poetry.scripts]\ntool = "tool.cli:main"\n'},
+         {"tool": "tool.cli:main"}, "pyproject.toml"),
+        ({"tool-1.0/setup.cfg": "[options.entry_points]\nconsole_scripts =\n    tool = tool.cli:main\n"},
+         {"tool": "tool.cli:main"}, "setup.cfg"),
+        ({"tool-1.0/tool.egg-info/entry_points.txt": "[console_scripts]\nTool = tool.cli:main\n"},
+         {"Tool": "tool.cli:main"}, "entry_points.txt"),
+        # Nested projects (e.g. test fixtures) don't count.
+        ({"tool-1.0/tests/fixture/pyproject.toml": '[project.scripts]\nother = "other:main"\n'}, {}, None),
+    ],
+)
+def test_python_console_scripts(files: dict[str, str], binaries: dict[str, str], source: str | None) -> None:
+    detected = inspect_archive(_chunks(_archive(files)), PYPI)
+
+    assert (detected.binaries, detected.source) == (binaries, source)
+
+
+def test_source_trees_fall_back_to_top_level_executables() -> None:
+    files = {"tool/tool": "", "tool/bin/helper": "", "tool/README": "", "tool/lib/inner": "", "tool/bin/data": ""}
+    data = _archive(files, executables=("tool/tool", "tool/bin/helper", "tool/lib/inner"))
+
+    detected = inspect_archive(_chunks(data), GITHUB)
+
+    assert detected == DetectedBinaries(binaries={"tool": "tool", "helper": "bin/helper"}, source="executables")
+
+
+def test_source_trees_prefer_a_declared_manifest() -> None:
+    files = {"repo-abc/tool": "", "repo-abc/package.json": json.dumps({"name": "tool", "bin": "index.js"})}
+    data = _archive(files, executables=("repo-abc/tool",))
+
+    assert inspect_archive(_chunks(data), GITHUB).binaries == {"tool": "index.js"}
+
+
+def test_non_tar_archives_raise() -> None:
+    with pytest.raises(tarfile.TarError):
+        inspect_archive(_chunks(b"PK\x03\x04" + bytes(1024)), PYPI)
+
+
+def test_config_warnings() -> None:
+    config = config_from_data(
+        {
+            "flake_name": "tool",
+            "source": {"registry": "npm", "name": "tool"},
+            "runtime": {"type": "nodejs", "nix_package": "nodejs_22"},
+            "wrapper": {"binary_name": "tool", "entry_point": "./cli.js"},
+            "meta": {"description": "tool", "homepage": "https://example.com", "license": "mit"},
+        }
+    )
+
+
+    def warnings(binaries: dict[str, str]) -> list[str]:
+        return config_warnings(config, "1.0.0", DetectedBinaries(binaries=binaries, source="package.json"))
+
+    assert warnings({"tool": "cli.js"}) == []
+    assert warnings({}) == []
+    (renamed,) = warnings({"tool2": "cli.js"})
+    assert "provides no binary 'tool'" in renamed
+    (moved,) = warnings({"tool": "bin/cli.js"})
+    assert "declares 'tool' as 'bin/cli.js' in package.json, not './cli.js'" in moved
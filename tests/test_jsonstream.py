@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from nix_devenv_wrapper.jsonstream import WILDCARD, JsonPathExtractor, extract_paths
+
+PACKUMENT = {
+    "name": "tool",
+    "dist-tags": {"latest": "1.1.0", "next": "2.0.0-rc.1"},
+    "versions": {
+        "1.0.0": {"dist": {"tarball": "https://example.com/tool-1.0.0.tgz", "shasum": "a"}, "scripts": {"x": "\\"}},
+        "1.1.0": {"dist": {"tarball": "https://example.com/tool-1.1.0.tgz"}, "keywords": ["a", "b\"}"]},
+    },
+    "time": {"1.0.0": "2026-01-01T00:00:00Z", "1.1.0": "2026-02-01T00:00:00Z"},
+    "readme": "x" * 10_000,
+}
+
+
+def _chunks(document: object, size: int, consumed: list[int]) -> Iterator[bytes]:
+    data = json.dumps(document).encode()
+    for start in range(0, len(data), size):
+        consumed.append(start)
+        yield data[start : start + size]
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_extracts_selected_paths_at_any_chunking(size: int) -> None:
+    patterns = [("dist-tags", WILDCARD), ("versions", WILDCARD, "dist", "tarball"), ("time", "1.1.0")]
+
+    results = extract_paths(_chunks(PACKUMENT, size, []), patterns)
+
+    assert results == {
+        ("dist-tags", "latest"): "1.1.0",
+        ("dist-tags", "next"): "2.0.0-rc.1",
+        ("versions", "1.0.0", "dist", "tarball"): "https://example.com/tool-1.0.0.tgz",
+        ("versions", "1.1.0", "dist", "tarball"): "https://example.com/tool-1.1.0.tgz",
+        ("time", "1.1.0"): "2026-02-01T00:00:00Z",
+    }
+
+
+def test_stops_reading_once_every_path_is_resolved() -> None:
+    consumed: list[int] = []
+    document = {"dist-tags": {"latest": "1.1.0"}, "versions": {"1.1.0": {"big": "x" * 100_000}}}
+
+    results = extract_paths(_chunks(document, 64, consumed), [("dist-tags", "latest")])
+
+    assert results == {("dist-tags", "latest"): "1.1.0"}
+    assert len(consumed) == 1
+
+
+def test_wildcard_keeps_reading_to_the_end_of_its_container() -> None:
+    consumed: list[int] = []
+    document = {"dist-tags": {"latest": "1.1.0", "next": "2.0.0"}, "readme": "x" * 10_000}
+
+    results = extract_paths(_chunks(document, 16, consumed), [("dist-tags", WILDCARD)])
+
+    assert results == {("dist-tags", "latest"): "1.1.0", ("dist-tags", "next"): "2.0.0"}
+    assert len(consumed) < 10
+
+
+def test_nested_patterns_under_a_captured_value() -> None:
+    results = extract_paths([json.dumps(PACKUMENT).encode()], [("dist-tags",), ("dist-tags", "next")])
+
+    assert results[("dist-tags",)] == PACKUMENT["dist-tags"]
+    assert results[("dist-tags", "next")] == "2.0.0-rc.1"
+
+
+def test_array_indexes_and_missing_paths() -> None:
+    document = [{"tag_name": "v2"}, {"tag_name": "v1"}]
+
+    assert extract_paths([json.dumps(document).encode()], [(1, "tag_name"), (5, "tag_name")]) == {
+        (1, "tag_name"): "v1"
+    }
+
+
+def test_truncated_document_is_an_error() -> None:
+    extractor = JsonPathExtractor([("versions", WILDCARD)])
+    extractor.feed(b'{"versions": {"1.0.0": {')
+
+    with pytest.raises(ValueError, match="Truncated"):
+        extractor.close()
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper import hashing
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.generators import generate_package_nix
+from nix_devenv_wrapper.hashing import FileHashCache, nix_base32
+from nix_devenv_wrapper.registries.local import LocalRegistry
+
+WRAPPER_TOML = """
+flake_name = "tool"
+
+[source]
+registry = "local"
+name = "{name}"
+
+[runtime]
+type = "none"
+nix_package = "bash"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "bin/tool"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+
+def _registry(tmp_path: Path) -> LocalRegistry:
+    return LocalRegistry(hash_cache=FileHashCache(tmp_path / "file-hashes.json"))
+
+
+def test_filename_pattern_finds_matching_files(tmp_path: Path) -> None:
+    builds = tmp_path / "builds"
+    builds.mkdir()
+    for name in ("tool-1.0.0.tar.gz", "tool-1.10.0.tar.gz", "tool-1.2.0-rc.1.tar.gz", "tool-notes.tar.gz", "other"):
+        (builds / name).write_bytes(name.encode())
+    (builds / "tool-2.0.0.tar.gz").mkdir()
+    registry = _registry(tmp_path)
+    pattern = str(builds / "tool-{version}.tar.gz")
+
+    assert sorted(release.version for release in registry.list_versions(pattern)) == ["1.0.0", "1.10.0", "1.2.0-rc.1"]
+    assert registry.get_latest_version(pattern) == "1.10.0"
+    info = registry.get_version_info(pattern, "1.0.0")
+    assert info.tarball_url == (builds / "tool-1.0.0.tar.gz").as_uri()
+    assert info.sha256 == nix_base32(hashlib.sha256(b"tool-1.0.0.tar.gz").digest())
+    with pytest.raises(ValueError, match="has no version 3.0.0"):
+        registry.get_version_info(pattern, "3.0.0")
+    with pytest.raises(ValueError, match="Only the file name may contain"):
+        registry.list_versions(str(tmp_path / "{version}" / "tool.tar.gz"))
+
+
+@pytest.mark.parametrize(
+    ("manifest", "content"),
+    [
+        ("releases.toml", '[versions]\n"1.0.0" = "v1/tool.tgz"\n"1.1.0" = "v1.1/tool.tgz"\n"2.0.0" = "gone.tgz"\n'),
+        ("releases.json", json.dumps({"1.0.0": "v1/tool.tgz", "1.1.0": "v1.1/tool.tgz", "2.0.0": "gone.tgz"})),
+    ],
+)
+def test_manifest_lists_paths_relative_to_itself(tmp_path: Path, manifest: str, content: str) -> None:
+    for relative in ("v1/tool.tgz", "v1.1/tool.tgz"):
+        (tmp_path / relative).parent.mkdir()
+        (tmp_path / relative).write_text(relative)
+    (tmp_path / manifest).write_text(content)
+    registry = _registry(tmp_path)
+    name = str(tmp_path / manifest)
+
+    # Listed artifacts that don't exist (yet) are left out.
+    assert sorted(release.version for release in registry.list_versions(name)) == ["1.0.0", "1.1.0"]
+    assert registry.get_latest_version(name) == "1.1.0"
+    assert registry.artifact_path(name, "1.0.0") == tmp_path / "v1" / "tool.tgz"
+    with pytest.raises(ValueError, match="lists no version 3.0.0"):
+        registry.artifact_path(name, "3.0.0")
+
+
+def test_file_hashes_are_reused_until_the_file_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    hashed: list[Path] = []
+    file_sha256 = hashing.file_sha256
+    monkeypatch.setattr(hashing, "file_sha256", lambda path: hashed.append(path) or file_sha256(path))
+    artifact = tmp_path / "tool.tgz"
+    artifact.write_bytes(b"one")
+
+    first = FileHashCache(tmp_path / "file-hashes.json").nix_hash(artifact)
+    # A new cache (e.g. the next process) reads the stored hash instead of the file.
+    assert FileHashCache(tmp_path / "file-hashes.json").nix_hash(artifact) == first
+    assert len(hashed) == 1
+
+    artifact.write_bytes(b"two")
+    changed = FileHashCache(tmp_path / "file-hashes.json").nix_hash(artifact)
+    assert changed == nix_base32(hashlib.sha256(b"two").digest())
+    stat = artifact.stat()
+    os.utime(artifact, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    FileHashCache(tmp_path / "file-hashes.json").nix_hash(artifact)
+    assert len(hashed) == 3
+
+
+def test_relative_paths_are_relative_to_the_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    wrapper = tmp_path / "wrapper"
+    (wrapper / "builds").mkdir(parents=True)
+    (wrapper / "builds" / "tool-1.0.0").write_text("#!/bin/sh\n")
+    (wrapper / "wrapper.toml").write_text(WRAPPER_TOML.format(name="builds/tool-{version}"))
+    monkeypatch.chdir(tmp_path)
+
+    config = load_config("wrapper/wrapper.toml")
+
+    assert config.source.name == str(wrapper / "builds" / "tool-{version}")
+    assert _registry(tmp_path).get_latest_version(config.source.name) == "1.0.0"
+    package_nix = generate_package_nix(config, "1.0.0", "1" * 52, local_path=str(wrapper / "builds" / "tool-1.0.0"))
+    assert f'path = "{wrapper}/builds/tool-${{version}}";' in package_nix
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper import mirrors
+from nix_devenv_wrapper.mirrors import MirroredSession, MirrorSet
+
+UPSTREAM = "https://registry.example.com"
+FAST = "https://fast.example.com"
+SLOW = "https://slow.example.com"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Hosts:
+    """Answers per host: a status code, or an exception to raise as a transport error."""
+
+    def __init__(self, answers: dict[str, int | Exception]):
+        self.answers = answers
+        self.requests: list[str] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "HEAD":
+            return httpx.Response(200)
+        self.requests.append(f"{request.url.scheme}://{request.url.host}")
+        answer = self.answers.get(f"{request.url.scheme}://{request.url.host}", 200)
+        if isinstance(answer, Exception):
+            raise answer
+        return httpx.Response(answer, content=request.url.host.encode())
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(mirrors.time, "monotonic", clock)
+    return clock
+
+
+def _session(hosts: Hosts, mirror_set: MirrorSet, monkeypatch: pytest.MonkeyPatch) -> MirroredSession:
+    client = httpx.Client(transport=httpx.MockTransport(hosts))
+    monkeypatch.setattr(mirrors, "borrow", lambda timeout: client)
+    return MirroredSession(client, [mirror_set])  # type: ignore[arg-type]
+
+
+def test_failed_mirrors_fail_over_and_cool_down(monkeypatch: pytest.MonkeyPatch, clock: Clock) -> None:
+    hosts = Hosts({FAST: 503, SLOW: httpx.ConnectError("refused")})
+    mirror_set = MirrorSet(UPSTREAM, [FAST, SLOW], cooldown=60)
+    session = _session(hosts, mirror_set, monkeypatch)
+
+    response = session.get(f"{UPSTREAM}/tool")
+
+    assert response.text == "registry.example.com"
+    assert hosts.requests == [FAST, SLOW, UPSTREAM]
+    # Both mirrors sit out the cooldown, the one that failed first coming back first.
+    assert mirror_set.ranked() == [UPSTREAM, FAST, SLOW]
+
+    clock.now += 61
+    hosts.answers.clear()
+    session.get(f"{UPSTREAM}/tool")
+    assert hosts.requests[-1] == FAST
+
+
+def test_last_candidate_answer_is_returned(monkeypatch: pytest.MonkeyPatch, clock: Clock) -> None:
+    hosts = Hosts({FAST: 503, UPSTREAM: 503})
+    session = _session(hosts, MirrorSet(UPSTREAM, [FAST]), monkeypatch)
+
+    assert session.get(f"{UPSTREAM}/tool").status_code == 503
+
+    hosts.answers = {FAST: httpx.ConnectError("refused"), UPSTREAM: httpx.ConnectError("refused")}
+    with pytest.raises(httpx.ConnectError):
+        session.get(f"{UPSTREAM}/tool")
+
+
+def test_not_found_is_an_answer_not_a_failure(monkeypatch: pytest.MonkeyPatch, clock: Clock) -> None:
+    hosts = Hosts({FAST: 404})
+    mirror_set = MirrorSet(UPSTREAM, [FAST])
+    session = _session(hosts, mirror_set, monkeypatch)
+
+    assert session.get(f"{UPSTREAM}/missing").status_code == 404
+    assert hosts.requests == [FAST]
+    assert mirror_set.ranked()[0] == FAST
+
+
+def test_streams_fail_over_before_the_body_is_read(monkeypatch: pytest.MonkeyPatch, clock: Clock) -> None:
+    hosts = Hosts({FAST: 502})
+    session = _session(hosts, MirrorSet(UPSTREAM, [FAST, SLOW]), monkeypatch)
+
+    with session.stream("GET", f"{UPSTREAM}/tool.tgz") as response:
+        assert response.read() == b"slow.example.com"
+    assert hosts.requests == [FAST, SLOW]
+
+
+def test_mirrors_are_ranked_by_moving_average_latency(clock: Clock) -> None:
+    mirror_set = MirrorSet(UPSTREAM, [SLOW, FAST], alpha=0.5)
+    mirror_set._probed = True  # only the latencies recorded below count
+
+    assert mirror_set.ranked() == [SLOW, FAST, UPSTREAM]
+    mirror_set.record_latency(SLOW, 1.0)
+    mirror_set.record_latency(FAST, 0.2)
+    assert mirror_set.ranked() == [FAST, SLOW, UPSTREAM]
+
+    # One slow answer only moves the average halfway.
+    mirror_set.record_latency(FAST, 1.6)
+    assert mirror_set.ranked() == [FAST, SLOW, UPSTREAM]
+    mirror_set.record_latency(FAST, 3.0)
+    assert mirror_set.ranked()[:2] == [SLOW, FAST]
+
+
+def test_other_urls_pass_through(monkeypatch: pytest.MonkeyPatch, clock: Clock) -> None:
+    hosts = Hosts({})
+    session = _session(hosts, MirrorSet(UPSTREAM, [FAST]), monkeypatch)
+
+    session.get("https://registry.example.company/tool")
+
+    assert hosts.requests == ["https://registry.example.company"]
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.models import NpmDependency
+from nix_devenv_wrapper.registries import npm
+from nix_devenv_wrapper.registries.npm import NpmRegistry
+from nix_devenv_wrapper.versions import SemverScheme
+
+
+def _registry(monkeypatch: pytest.MonkeyPatch, packages: dict[str, dict[str, dict[str, Any]]]) -> NpmRegistry:
+    """Serve abbreviated packuments for ``{name: {version: manifest fields}}``; the highest version is latest."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.path.lstrip("/")
+        versions = {
+            version: {
+                "name": name,
+                "version": version,
+                "dist": {"tarball": f"https://registry.npmjs.org/{name}/-/{name}-{version}.tgz"},
+                **fields,
+            }
+            for version, fields in packages[name].items()
+        }
+        latest = max(versions, key=SemverScheme().key)
+        return httpx.Response(200, json={"name": name, "dist-tags": {"latest": latest}, "versions": versions})
+
+    monkeypatch.setattr(npm, "borrow", lambda timeout: httpx.Client(transport=httpx.MockTransport(handler)))
+    return NpmRegistry()
+
+
+def _tree(dependencies: list[NpmDependency]) -> dict[str, str]:
+    return {dependency.path: dependency.version for dependency in dependencies}
+
+
+def _assert_resolvable(dependencies: list[NpmDependency]) -> None:
+    """Every dependency must resolve, by Node's lookup from its dependent, to a version it accepts."""
+    nodes = {dependency.path: dependency for dependency in dependencies}
+    for dependency in dependencies:
+        for name, spec in {**dependency.dependencies, **dependency.peer_dependencies}.items():
+            level = dependency.path
+            while f"{level}/node_modules/{name}".lstrip("/") not in nodes:
+                assert level, f"{dependency.path} can't find {name}"
+                level = level.rpartition("/node_modules/")[0]
+            resolved = nodes[f"{level}/node_modules/{name}".lstrip("/")]
+            assert SemverScheme().parse_constraint(spec).matches(resolved.version), (dependency.path, name)
+
+
+def test_hoisting_does_not_shadow_placed_dependents(monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(
+        monkeypatch,
+        {
+            "root": {"1.0.0": {"dependencies": {"w": "^1", "y": "^1"}}},
+            "y": {"1.0.0": {"dependencies": {"w": "^2", "c": "^1"}}},
+            "w": {"1.0.0": {"dependencies": {"c": "^1"}}, "2.0.0": {"dependencies": {"c": "^2"}}},
+            "c": {"1.0.0": {}, "2.0.0": {}},
+        },
+    )
+
+    dependencies = registry.resolve_dependency_tree("root", "1.0.0")
+
+    assert _tree(dependencies) == {
+        "node_modules/root": "1.0.0",
+        "node_modules/w": "1.0.0",
+        "node_modules/y": "1.0.0",
+        "node_modules/c": "1.0.0",
+        "node_modules/y/node_modules/w": "2.0.0",
+        "node_modules/y/node_modules/w/node_modules/c": "2.0.0",
+    }
+    _assert_resolvable(dependencies)
+
+
+def test_peer_conflicting_with_parent_level_nests_under_requester(monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(
+        monkeypatch,
+        {
+            "root": {"1.0.0": {"dependencies": {"a": "^1", "p": "^2"}}},
+            "a": {"1.0.0": {"peerDependencies": {"p": "^1"}}},
+            "p": {"1.0.0": {}, "2.0.0": {}},
+        },
+    )
+
+    dependencies = registry.resolve_dependency_tree("root", "1.0.0")
+
+    assert _tree(dependencies)["node_modules/p"] == "2.0.0"
+    assert _tree(dependencies)["node_modules/a/node_modules/p"] == "1.0.0"
+    _assert_resolvable(dependencies)
+
+
+def test_peer_does_not_shadow_the_owning_package(monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(
+        monkeypatch,
+        {
+            "root": {"1.0.0": {"dependencies": {"a": "^1", "q": "^2"}}},
+            "a": {"1.0.0": {"dependencies": {"q": "^1", "p": "^2"}}},
+            "q": {"1.0.0": {"peerDependencies": {"p": "^1"}}, "2.0.0": {}},
+            "p": {"1.0.0": {}, "2.0.0": {}},
+        },
+    )
+
+    dependencies = registry.resolve_dependency_tree("root", "1.0.0")
+
+    assert "node_modules/a/node_modules/p" not in _tree(dependencies)
+    assert _tree(dependencies)["node_modules/a/node_modules/q/node_modules/p"] == "1.0.0"
+    _assert_resolvable(dependencies)
+
+
+def test_satisfying_copy_is_reused(monkeypatch: pytest.MonkeyPatch) -> None:
+    registry = _registry(
+        monkeypatch,
+        {
+            "root": {"1.0.0": {"dependencies": {"a": "^1", "b": "^1", "c": "~1.0.0"}}},
+            "a": {"1.0.0": {"dependencies": {"c": "^1"}}},
+            "b": {"1.0.0": {"dependencies": {"c": "^1"}}},
+            "c": {"1.0.0": {}, "1.1.0": {}},
+        },
+    )
+
+    dependencies = registry.resolve_dependency_tree("root", "1.0.0")
+
+    assert _tree(dependencies) == {
+        "node_modules/root": "1.0.0",
+        "node_modules/a": "1.0.0",
+        "node_modules/b": "1.0.0",
+        "node_modules/c": "1.0.0",
+    }
+    _assert_resolvable(dependencies)
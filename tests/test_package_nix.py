@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from nix_devenv_wrapper.generators import splice_python_sections
+
+CURRENT = """python312.pkgs.buildPythonApplication rec {
+  pname = "mytool";
+  version = "2.0.0";
+  doCheck = false; # hand edit
+
+  propagatedBuildInputs = with python312.pkgs; [
+    oldpkg
+  ];
+
+  meta = with lib; {
+    mainProgram = "old";
+  };
+}
+"""
+
+RENDERED = """python312.pkgs.buildPythonApplication rec {
+  pname = "mytool";
+  version = "2.0.0";
+
+  propagatedBuildInputs = with python312.pkgs; [
+    requests
+    click
+  ];
+
+  meta = with lib; {
+    mainProgram = "mytool";
+  };
+}
+"""
+
+WITHOUT_INPUTS = RENDERED.replace(
+    """  propagatedBuildInputs = with python312.pkgs; [
+    requests
+    click
+  ];
+
+""",
+    "",
+)
+
+
+def test_splice_replaces_generated_sections_and_keeps_hand_edits() -> None:
+    spliced = splice_python_sections(CURRENT, RENDERED)
+
+    hand_edited = RENDERED.replace('  version = "2.0.0";\n', '  version = "2.0.0";\n  doCheck = false; # hand edit\n')
+    assert spliced == hand_edited
+
+
+def test_splice_adds_and_removes_dependency_section() -> None:
+    bare = splice_python_sections(CURRENT, WITHOUT_INPUTS)
+    assert "propagatedBuildInputs" not in bare
+    assert "doCheck = false; # hand edit" in bare
+
+    assert splice_python_sections(bare, RENDERED) == splice_python_sections(CURRENT, RENDERED)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.config import load_config
+from nix_devenv_wrapper.events import Event, EventType
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.pipeline import Pipeline, add_generate_tasks
+
+WRAPPER_TOML = """
+flake_name = "tool"
+devenv_enabled = true
+
+[source]
+registry = "npm"
+name = "tool"
+
+[runtime]
+type = "nodejs"
+nix_package = "nodejs_22"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "cli.js"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+
+def test_tasks_run_after_their_dependencies_with_their_results() -> None:
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def task(name: str, value: int) -> Callable[..., int]:
+        def run(*args: int) -> int:
+            with lock:
+                order.append(name)
+            return value + sum(args)
+
+        return run
+
+    pipeline = Pipeline(max_workers=4)
+    a = pipeline.add("a", task("a", 1))
+    b = pipeline.add("b", task("b", 10))
+    c = pipeline.add("c", task("c", 100), a, b)
+    d = pipeline.add("d", task("d", 1000), c, a)
+
+    futures = pipeline.run()
+
+    assert {name: future.result() for name, future in futures.items()} == {"a": 1, "b": 10, "c": 111, "d": 1112}
+    assert order.index("c") > max(order.index("a"), order.index("b"))
+    assert order[-1] == "d"
+
+
+def test_independent_tasks_run_concurrently() -> None:
+    # Each task waits for the other to start, so they only finish if both run at once.
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = Pipeline(max_workers=2)
+    pipeline.add("a", barrier.wait)
+    pipeline.add("b", barrier.wait)
+
+    futures = pipeline.run()
+
+    assert all(future.exception() is None for future in futures.values())
+
+
+def test_failure_fails_dependents_without_running_them() -> None:
+    ran: list[str] = []
+    pipeline = Pipeline()
+
+    def fail() -> None:
+        raise ValueError("boom")
+
+    pipeline.add("broken", fail)
+    pipeline.add("dependent", lambda _: ran.append("dependent"), "broken")
+    pipeline.add("transitive", lambda _: ran.append("transitive"), "dependent")
+    pipeline.add("independent", lambda: ran.append("independent"))
+
+    futures = pipeline.run()
+
+    assert ran == ["independent"]
+    for name in ("broken", "dependent", "transitive"):
+        with pytest.raises(ValueError, match="boom"):
+            futures[name].result()
+
+
+def test_tasks_must_be_added_after_their_dependencies() -> None:
+    pipeline = Pipeline()
+    pipeline.add("a", lambda: None)
+
+    with pytest.raises(ValueError, match="Duplicate pipeline task 'a'"):
+        pipeline.add("a", lambda: None)
+    with pytest.raises(ValueError, match="depends on unknown tasks: b"):
+        pipeline.add("c", lambda _: None, "b")
+
+
+def test_hash_independent_files_are_written_and_reported(tmp_path: Path) -> None:
+    (tmp_path / "wrapper.toml").write_text(WRAPPER_TOML)
+    wrapper = Wrapper.from_dir(tmp_path)
+    events: list[Event] = []
+    pipeline = Pipeline()
+
+    final = add_generate_tasks(
+        pipeline, wrapper, load_config(wrapper.config_path), ["flake", "devenv"], on_event=events.append
+    )
+    futures = pipeline.run()
+
+    assert all(futures[name].exception() is None for name in final)
+    assert wrapper.flake_nix.exists() and wrapper.devenv_nix.exists()
+    assert sorted(event.paths[0] for event in events) == sorted([str(wrapper.devenv_nix), str(wrapper.flake_nix)])
+    assert {event.event for event in events} == {EventType.WRITTEN}
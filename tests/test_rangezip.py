@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import io
+import re
+import struct
+import zipfile
+import zlib
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.rangezip import RemoteZip
+
+URL = "https://files.example.com/tool-1.0-py3-none-any.whl"
+MEMBERS = {
+    "tool/__init__.py": b"print('hello')\n" * 200,
+    "tool-1.0.dist-info/METADATA": b"Metadata-Version: 2.1\nName: tool\nVersion: 1.0\n",
+    "tool-1.0.dist-info/RECORD": b"",
+}
+
+
+class Server:
+    """Serves a file, honouring suffix and closed byte ranges unless ``ranges`` is off."""
+
+    def __init__(self, body: bytes, ranges: bool = True):
+        self.body = body
+        self.ranges = ranges
+        self.requests: list[str | None] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        requested = request.headers.get("range")
+        self.requests.append(requested)
+        if not self.ranges or requested is None:
+            return httpx.Response(200, content=self.body)
+        suffix = re.fullmatch(r"bytes=-(\d+)", requested)
+        if suffix:
+            start, end = max(0, len(self.body) - int(suffix.group(1))), len(self.body) - 1
+        else:
+            start, end = (int(value) for value in requested.removeprefix("bytes=").split("-"))
+        headers = {"content-range": f"bytes {start}-{end}/{len(self.body)}"}
+        return httpx.Response(206, headers=headers, content=self.body[start:end + 1])
+
+
+def _zip64(members: dict[str, bytes], overflow: tuple[str, ...] = ("size", "offset")) -> bytes:
+    """Write a zip whose central directory defers sizes and/or offsets to zip64 extra fields."""
+    out = io.BytesIO()
+    central = io.BytesIO()
+    for name, content in members.items():
+        compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        data = compressor.compress(content) + compressor.flush()
+        encoded, crc, offset = name.encode(), zlib.crc32(content), out.tell()
+        header = (b"PK\x03\x04", 45, 0, 8, 0, 0x21, crc, len(data), len(content), len(encoded), 0)
+        out.write(struct.pack("<4sHHHHHIIIHH", *header))
+        out.write(encoded + data)
+
+        sizes = "size" in overflow
+        extra_values = ([len(content), len(data)] if sizes else []) + ([offset] if "offset" in overflow else [])
+        extra = struct.pack(f"<HH{len(extra_values)}Q", 1, 8 * len(extra_values), *extra_values)
+        central.write(
+            struct.pack(
+                "<4sHHHHHHIIIHHHHHII", b"PK\x01\x02", 45, 45, 0, 8, 0, 0x21, crc,
+                0xFFFFFFFF if sizes else len(data), 0xFFFFFFFF if sizes else len(content),
+                len(encoded), len(extra), 0, 0, 0, 0, 0xFFFFFFFF if "offset" in overflow else offset,
+            )
+        )
+        central.write(encoded + extra)
+
+    directory_offset, directory = out.tell(), central.getvalue()
+    out.write(directory)
+    record_offset = out.tell()
+    count = len(members)
+    record = (b"PK\x06\x06", 44, 45, 45, 0, 0, count, count, len(directory), directory_offset)
+    out.write(struct.pack("<4sQHHIIQQQQ", *record))
+    out.write(struct.pack("<4sIQI", b"PK\x06\x07", 0, record_offset, 1))
+    out.write(struct.pack("<4sHHHHIIH", b"PK\x05\x06", 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0))
+    return out.getvalue()
+
+
+def _remote(server: Server, tail_size: int = 16 * 1024) -> RemoteZip:
+    return RemoteZip(httpx.Client(transport=httpx.MockTransport(server)), URL, tail_size)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("overflow", [("size", "offset"), ("offset",), ("size",)])
+def test_zip64_members_are_read(overflow: tuple[str, ...]) -> None:
+    body = _zip64(MEMBERS, overflow)
+    # The stdlib agrees the fixture is a valid zip64 archive.
+    assert {name: zipfile.ZipFile(io.BytesIO(body)).read(name) for name in MEMBERS} == MEMBERS
+
+    remote = _remote(Server(body))
+
+    assert remote.names == list(MEMBERS)
+    assert {name: remote.read(name) for name in MEMBERS} == MEMBERS
+
+
+def test_a_small_tail_fetches_the_rest_by_range() -> None:
+    server = Server(_zip64(MEMBERS))
+
+    remote = _remote(server, tail_size=64)
+    # The zip64 end record and the central directory lie before the tail.
+    assert len(server.requests) == 3
+    assert remote.read("tool-1.0.dist-info/METADATA") == MEMBERS["tool-1.0.dist-info/METADATA"]
+
+    assert server.requests[0] == "bytes=-64"
+    assert all(re.fullmatch(r"bytes=\d+-\d+", str(requested)) for requested in server.requests[1:])
+
+
+def test_members_in_the_tail_need_no_more_requests() -> None:
+    server = Server(_zip64(MEMBERS))
+
+    remote = _remote(server)
+
+    assert [remote.read(name) for name in MEMBERS] == list(MEMBERS.values())
+    assert server.requests == ["bytes=-16384"]
+
+
+def test_servers_without_range_support_send_the_whole_file() -> None:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("stored", b"as is", compress_type=zipfile.ZIP_STORED)
+        archive.writestr("deflated", b"squeezed" * 100, compress_type=zipfile.ZIP_DEFLATED)
+    server = Server(buffer.getvalue(), ranges=False)
+
+    remote = _remote(server, tail_size=64)
+
+    assert (remote.read("stored"), remote.read("deflated")) == (b"as is", b"squeezed" * 100)
+    assert len(server.requests) == 1
+
+
+def test_non_zip_files_are_rejected() -> None:
+    with pytest.raises(ValueError, match="No zip end of central directory"):
+        _remote(Server(b"not a zip" * 100))
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import FlakeConfig, PackageRegistry, VersionInfo
+from nix_devenv_wrapper.schedule import POLLS_PER_RELEASE, Poll, plan_polls, release_interval
+
+NOW = 1_800_000_000.0
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def _release(version: str, published: float | None) -> VersionInfo:
+    published_at = datetime.fromtimestamp(published, tz=timezone.utc).isoformat() if published is not None else None
+    return VersionInfo(version=version, tarball_url=f"https://e.com/{version}.tgz", published_at=published_at)
+
+
+def _config(name: str, **polling: float) -> FlakeConfig:
+    return config_from_data(
+        {
+            "flake_name": name,
+            "source": {"registry": "npm", "name": name},
+            "runtime": {"type": "nodejs", "nix_package": "nodejs_22"},
+            "wrapper": {"binary_name": name, "entry_point": "cli.js"},
+            "meta": {"description": name, "homepage": "https://example.com", "license": "mit"},
+            "polling": polling,
+        }
+    )
+
+
+@pytest.fixture
+def history(tmp_path: Path) -> ReleaseHistory:
+    history = ReleaseHistory(tmp_path / "history.sqlite3")
+    # "daily" released every day up to now; "weekly" every week; "new" has a single release.
+    history.record(PackageRegistry.NPM, "daily", [_release(f"1.{n}.0", NOW - n * DAY) for n in range(5)])
+    history.record(PackageRegistry.NPM, "weekly", [_release(f"1.{n}.0", NOW - n * 7 * DAY) for n in range(5)])
+    history.record(PackageRegistry.NPM, "new", [_release("1.0.0", NOW)])
+    return history
+
+
+def test_release_interval_uses_mean_gap_or_the_silence_since() -> None:
+    releases = [_release(f"1.{n}.0", NOW - (n + 1) * DAY) for n in range(3)] + [_release("0.1.0", None)]
+
+    assert release_interval(releases, now=NOW - DAY) == DAY
+    # Quiet for ten days: the silence outweighs the daily cadence.
+    assert release_interval(releases, now=NOW + 9 * DAY) == 10 * DAY
+    assert release_interval(releases[:1], now=NOW) is None
+
+
+def test_intervals_follow_the_release_cadence_within_bounds(history: ReleaseHistory) -> None:
+    daily, weekly, new, capped = plan_polls(
+        [_config("daily"), _config("weekly"), _config("new"), _config("weekly", max_interval=60)], history, now=NOW
+    )
+
+    assert daily.interval == DAY / POLLS_PER_RELEASE
+    assert weekly.interval == 7 * DAY / POLLS_PER_RELEASE
+    assert (new.interval, new.release_interval) == (15 * 60, None)
+    assert capped.interval == HOUR
+    assert daily.last_checked is not None and not daily.due(now=daily.last_checked + 60)
+
+
+def test_budget_stretches_every_interval_by_the_same_factor(history: ReleaseHistory) -> None:
+    configs = [_config("daily"), _config("weekly"), _config("new")]
+    unbounded = plan_polls(configs, history, now=NOW)
+    rate = sum(HOUR / poll.interval for poll in unbounded)
+
+    stretched = plan_polls(configs, history, budget=rate / 4, now=NOW)
+
+    assert [poll.interval for poll in stretched] == pytest.approx([poll.interval * 4 for poll in unbounded])
+    assert sum(HOUR / poll.interval for poll in stretched) == pytest.approx(rate / 4)
+    # A budget the fleet already fits leaves the intervals alone.
+    assert plan_polls(configs, history, budget=rate * 2, now=NOW) == unbounded
+
+
+def test_budget_may_stretch_past_the_maximum_interval(history: ReleaseHistory) -> None:
+    (poll,) = plan_polls([_config("new", min_interval=60, max_interval=60)], history, budget=0.5, now=NOW)
+
+    assert poll.interval == 2 * HOUR
+
+
+def test_unchecked_packages_are_due() -> None:
+    assert Poll(interval=HOUR).due(now=NOW)
+    assert Poll(interval=HOUR, last_checked=NOW).next_check == NOW + HOUR
+    assert not Poll(interval=HOUR, last_checked=NOW).due(now=NOW + HOUR - 1)
+    assert Poll(interval=HOUR, last_checked=NOW).due(now=NOW + HOUR)
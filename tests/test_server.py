@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import threading
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.cli import client, main
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import PackageRegistry
+from nix_devenv_wrapper.server import WarmServer
+from nix_devenv_wrapper.versions import ReleaseIndex, get_version_scheme, release_index_cache
+
+SRC = Path(__file__).parent.parent / "src"
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[WarmServer]:
+    monkeypatch.setenv("NDW_SOCKET", str(tmp_path / "ndw.sock"))
+    monkeypatch.delenv(client.NO_SERVER_ENV, raising=False)
+    warm = WarmServer(tmp_path / "ndw.sock", idle_timeout=None)
+    thread = threading.Thread(target=warm.serve_forever, daemon=True)
+    thread.start()
+    yield warm
+    warm.shutdown()
+    warm.close()
+    thread.join()
+
+
+def _report(argv: Sequence[str], history: ReleaseHistory | None = None) -> int:
+    # Stands in for the CLI: shows what a command sees of its environment.
+    print(f"{os.environ.get('NDW_CACHE_DIR')} {os.getcwd()} {sys.stdin.read()!r} {history and history.path}")
+    return 3
+
+
+def test_commands_run_in_the_client_environment(
+    server: WarmServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(main, "run", _report)
+    server_env = dict(os.environ)
+    sent: list[dict[str, object]] = []
+
+    exit_code = server.run(["check"], str(tmp_path), sent.append, {"NDW_CACHE_DIR": str(tmp_path / "cache")})
+
+    assert exit_code == 3
+    assert "".join(str(message["stdout"]) for message in sent) == (
+        f"{tmp_path / 'cache'} {tmp_path} '' {tmp_path / 'cache' / 'history.sqlite3'}\n"
+    )
+    assert dict(os.environ) == server_env
+
+
+def _forward(tmp_path: Path, stdin: str | None = None) -> subprocess.CompletedProcess[str]:
+    # The client runs in its own process, as sys.stdout is swapped out while the server runs a command.
+    code = "from nix_devenv_wrapper.cli.client import forward; print(forward(['check']))"
+    env = {**os.environ, "NDW_CACHE_DIR": str(tmp_path / "cache"), "PYTHONPATH": str(SRC)}
+    return subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env=env,
+        input=stdin,
+        stdin=subprocess.DEVNULL if stdin is None else None,
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+
+
+def test_commands_are_forwarded_with_the_environment(
+    server: WarmServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(main, "run", _report)
+
+    assert _forward(tmp_path).stdout.startswith(f"{tmp_path / 'cache'} {tmp_path} ''")
+
+
+def test_piped_input_runs_in_process(server: WarmServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(main, "run", _report)
+
+    assert _forward(tmp_path, stdin="yes\n").stdout == "None\n"
+
+
+def test_update_lists_releases_afresh(tmp_path: Path) -> None:
+    index = ReleaseIndex(get_version_scheme(PackageRegistry.NPM), [], {})
+    release_index_cache.put(PackageRegistry.NPM, "tool", index)
+    (tmp_path / "fleet").mkdir()
+
+    assert main.run(["--no-history", "--fleet", str(tmp_path / "fleet"), "check"]) == 0
+    assert release_index_cache.get(PackageRegistry.NPM, "tool") is index
+    assert main.run(["--no-history", "--fleet", str(tmp_path / "fleet"), "update"]) == 0
+    assert release_index_cache.get(PackageRegistry.NPM, "tool") is None
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from nix_devenv_wrapper.transport import Session, TransportManager, get_transport, shutdown_transport
+
+
+def test_clients_are_pooled_per_origin() -> None:
+    manager = TransportManager(http2=False)
+
+    first = manager.client_for("https://registry.npmjs.org/a")
+    again = manager.client_for("https://registry.npmjs.org/b?x=1")
+    other = manager.client_for("https://registry.npmjs.org:8443/a")
+
+    assert first is again
+    assert other is not first
+    assert manager._ssl_context is not None
+    manager.close()
+    with pytest.raises(RuntimeError):
+        manager.client_for("https://registry.npmjs.org/a")
+
+
+def test_session_applies_its_defaults_on_the_shared_client() -> None:
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, text="ok")
+
+    manager = TransportManager(http2=False)
+    manager._clients["https://example.com"] = httpx.Client(transport=httpx.MockTransport(handler))
+    session = Session(manager, headers={"User-Agent": "ndw", "Accept": "application/json"})
+
+    assert session.get("https://example.com/x", headers={"Accept": "text/plain"}).text == "ok"
+    with session.stream("GET", "https://example.com/y") as response:
+        assert response.read() == b"ok"
+    session.close()
+
+    assert [request.headers["accept"] for request in seen] == ["text/plain", "application/json"]
+    assert all(request.headers["user-agent"] == "ndw" for request in seen)
+    # Closing a session leaves the pooled client usable by everyone else.
+    assert session.get("https://example.com/z").status_code == 200
+
+
+def test_process_transport_is_recreated_after_shutdown() -> None:
+    manager = get_transport()
+    assert get_transport() is manager
+
+    shutdown_transport()
+
+    assert get_transport() is not manager
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import stat
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.fleet import Wrapper
+from nix_devenv_wrapper.verification import VerificationScheduler, snapshot_files
+
+# Stands in for nix: records how many builds run at once, then sleeps and exits as the wrapper directory says.
+STUB_NIX = """#!/bin/sh
+touch "{run}/active/$$"
+ls "{run}/active" | wc -l >> "{run}/concurrency"
+echo "building $(basename "$PWD")"
+sleep "$(cat sleep 2>/dev/null || echo 0.2)"
+rm -f "{run}/active/$$"
+exit "$(cat exitcode 2>/dev/null || echo 0)"
+"""
+
+
+def _stub_nix(tmp_path: Path) -> tuple[str, Path]:
+    run = tmp_path / "run"
+    (run / "active").mkdir(parents=True)
+    nix = tmp_path / "nix"
+    nix.write_text(STUB_NIX.format(run=run))
+    nix.chmod(nix.stat().st_mode | stat.S_IXUSR)
+    return str(nix), run
+
+
+def _wrapper(root: Path, sleep: float | None = None, exitcode: int | None = None) -> Wrapper:
+    root.mkdir(parents=True)
+    (root / "package.nix").write_text("new\n")
+    if sleep is not None:
+        (root / "sleep").write_text(str(sleep))
+    if exitcode is not None:
+        (root / "exitcode").write_text(str(exitcode))
+    return Wrapper.from_dir(root)
+
+
+def test_concurrency_is_bounded(tmp_path: Path) -> None:
+    nix, run = _stub_nix(tmp_path)
+    wrappers = [_wrapper(tmp_path / f"w{index}") for index in range(6)]
+    scheduler = VerificationScheduler(max_jobs=2, log_dir=tmp_path / "logs", nix=nix)
+
+    results = scheduler.verify(wrappers)
+
+    assert all(result.success for result in results)
+    assert max(int(count) for count in (run / "concurrency").read_text().split()) <= 2
+    assert [result.wrapper for result in results] == [str(wrapper.root) for wrapper in wrappers]
+
+
+def test_timeout_kills_build(tmp_path: Path) -> None:
+    nix, _ = _stub_nix(tmp_path)
+    wrapper = _wrapper(tmp_path / "slow", sleep=30)
+    scheduler = VerificationScheduler(max_jobs=1, timeout=0.5, log_dir=tmp_path / "logs", nix=nix)
+
+    (result,) = scheduler.verify([wrapper])
+
+    assert not result.success
+    assert result.timed_out
+    assert result.duration < 10
+
+
+def test_failed_build_is_rolled_back(tmp_path: Path) -> None:
+    nix, _ = _stub_nix(tmp_path)
+    broken = _wrapper(tmp_path / "broken", exitcode=1)
+    working = _wrapper(tmp_path / "working")
+    snapshots = {broken.root: {broken.package_nix: "old\n"}, working.root: {working.package_nix: "old\n"}}
+    scheduler = VerificationScheduler(max_jobs=2, log_dir=tmp_path / "logs", nix=nix)
+
+    failed, succeeded = scheduler.verify([broken, working], snapshots)
+
+    assert not failed.success and failed.returncode == 1 and failed.rolled_back
+    assert broken.package_nix.read_text() == "old\n"
+    assert succeeded.success and not succeeded.rolled_back
+    assert working.package_nix.read_text() == "new\n"
+
+
+def test_rollback_restores_every_written_file(tmp_path: Path) -> None:
+    nix, _ = _stub_nix(tmp_path)
+    wrapper = _wrapper(tmp_path / "tool", exitcode=1)
+    lockfile = wrapper.root / "npm" / "package-lock.json"
+    created = wrapper.root / "Cargo.lock"
+    lockfile.parent.mkdir()
+    lockfile.write_text("old lock\n")
+    wrapper.package_nix.write_text("old\n")
+    snapshots = {wrapper.root: snapshot_files([wrapper.package_nix, lockfile, created])}
+    # The update writes new contents and a file that didn't exist.
+    wrapper.package_nix.write_text("new\n")
+    lockfile.write_text("new lock\n")
+    created.write_text("new\n")
+    scheduler = VerificationScheduler(max_jobs=1, log_dir=tmp_path / "logs", nix=nix)
+
+    (result,) = scheduler.verify([wrapper], snapshots)
+
+    assert result.rolled_back
+    assert wrapper.package_nix.read_text() == "old\n"
+    assert lockfile.read_text() == "old lock\n"
+    assert not created.exists()
+
+
+def test_same_named_wrappers_get_separate_logs(tmp_path: Path) -> None:
+    nix, _ = _stub_nix(tmp_path)
+    wrappers = [_wrapper(tmp_path / "a" / "tool"), _wrapper(tmp_path / "b" / "tool")]
+    scheduler = VerificationScheduler(max_jobs=2, log_dir=tmp_path / "logs", nix=nix)
+
+    first, second = scheduler.verify(wrappers)
+
+    assert first.log_path != second.log_path
+    assert Path(first.log_path).read_text() == Path(second.log_path).read_text() == "building tool\n"
+
+
+def test_missing_nix_fails_build(tmp_path: Path) -> None:
+    wrapper = _wrapper(tmp_path / "tool")
+    scheduler = VerificationScheduler(max_jobs=1, log_dir=tmp_path / "logs", nix=str(tmp_path / "missing" / "nix"))
+
+    (result,) = scheduler.verify([wrapper])
+
+    assert not result.success
+    assert result.returncode is None
+    assert "could not run" in (result.error or "")
+
+
+def test_log_dir_is_created_on_first_build(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("TMPDIR", str(tmp_path / "tmp"))
+    (tmp_path / "tmp").mkdir()
+    monkeypatch.setattr("tempfile.tempdir", None)
+    nix, _ = _stub_nix(tmp_path)
+    scheduler = VerificationScheduler(max_jobs=1, nix=nix)
+
+    assert scheduler.verify([]) == []
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+    (result,) = scheduler.verify([_wrapper(tmp_path / "tool")])
+
+    assert Path(result.log_path).parent.parent == tmp_path / "tmp"
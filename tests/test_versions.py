@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import PackageRegistry, VersionInfo
+from nix_devenv_wrapper.updater import Updater
+from nix_devenv_wrapper.versions import Pep440Scheme, ReleaseIndex, SemverScheme
+
+VERSIONS = ["1.0.0", "1.1.0", "2.0.0", "2.1.0-beta.1"]
+TAGS = {"latest": "1.1.0", "next": "2.1.0-beta.1"}
+
+
+def _releases() -> list[VersionInfo]:
+    return [VersionInfo(version=version, tarball_url=f"https://example.com/tool-{version}.tgz") for version in VERSIONS]
+
+
+def test_unpinned_resolves_to_latest_tag() -> None:
+    index = ReleaseIndex(SemverScheme(), _releases(), TAGS)
+
+    assert index.resolve(None).version == "1.1.0"
+    assert index.resolve("latest").version == "1.1.0"
+    assert index.resolve("next").version == "2.1.0-beta.1"
+
+
+def test_unpinned_without_latest_tag_resolves_to_highest_stable() -> None:
+    index = ReleaseIndex(SemverScheme(), _releases())
+
+    assert index.resolve(None).version == "2.0.0"
+
+
+def test_channels_keep_main_package_on_latest_tag(tmp_path: Path) -> None:
+    """Configuring channels must not move the unpinned main package off the registry's latest tag."""
+    config = config_from_data(
+        {
+            "flake_name": "tool",
+            "source": {"registry": "npm", "name": "tool", "channels": {"next": "next"}},
+            "runtime": {"type": "nodejs", "nix_package": "nodejs_22"},
+            "wrapper": {"binary_name": "tool", "entry_point": "cli.js"},
+            "meta": {"description": "tool", "homepage": "https://example.com", "license": "mit"},
+        }
+    )
+    package_nix = tmp_path / "package.nix"
+    package_nix.write_text('{ version = "1.0.0"; }\n')
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        history.record(PackageRegistry.NPM, "tool", _releases(), TAGS)
+        updater = Updater(config, package_nix, history=history)
+
+        assert updater.resolve_version(offline=True) == "1.1.0"
+        assert updater.check_for_updates(offline=True).latest_version == "1.1.0"
+        assert updater.channel_updaters()["next"].resolve_version(offline=True) == "2.1.0-beta.1"
+
+
+@pytest.mark.parametrize(
+    ("spec", "matching", "rejected"),
+    [
+        ("^1.2.3", ["1.2.3", "1.9.0"], ["1.2.2", "2.0.0"]),
+        ("^0.2.3", ["0.2.3", "0.2.9"], ["0.3.0"]),
+        ("^0.0.3", ["0.0.3"], ["0.0.4"]),
+        ("~1.2.3", ["1.2.3", "1.2.9"], ["1.3.0", "1.2.2"]),
+        ("~1", ["1.0.0", "1.9.9"], ["2.0.0"]),
+        ("1.x", ["1.0.0", "1.5.2"], ["2.0.0", "0.9.0"]),
+        ("1.2.*", ["1.2.0", "1.2.7"], ["1.3.0"]),
+        ("*", ["0.0.1", "9.0.0"], []),
+        ("1.2.3 - 2.3.4", ["1.2.3", "2.3.4"], ["1.2.2", "2.3.5"]),
+        ("1.2 - 2.3", ["1.2.0", "2.3.9"], ["2.4.0"]),
+        ("<1.0.0 || >=3.0.0", ["0.5.0", "3.1.0"], ["1.0.0", "2.9.9"]),
+        (">= 1.2 <1.4", ["1.2.0", "1.3.5"], ["1.4.0"]),
+    ],
+)
+def test_semver_ranges(spec: str, matching: list[str], rejected: list[str]) -> None:
+    constraint = SemverScheme().parse_constraint(spec)
+
+    assert [version for version in matching if constraint.matches(version)] == matching
+    assert [version for version in rejected if constraint.matches(version)] == []
+
+
+def test_semver_prereleases_need_a_matching_comparator() -> None:
+    scheme = SemverScheme()
+
+    assert not scheme.parse_constraint("^1.0.0").matches("1.5.0-beta.1")
+    assert scheme.parse_constraint("^1.0.0").matches("1.5.0-beta.1", include_prereleases=True)
+    assert scheme.parse_constraint(">=1.5.0-beta.1").matches("1.5.0-beta.2")
+    assert not scheme.parse_constraint(">=1.5.0-beta.1").matches("1.6.0-beta.1")
+    assert scheme.key("1.0.0-alpha") < scheme.key("1.0.0-alpha.1") < scheme.key("1.0.0-beta") < scheme.key("1.0.0")
+    assert scheme.key("1.0.0-beta.2") < scheme.key("1.0.0-beta.11")
+
+
+def test_pep440_specifiers() -> None:
+    scheme = Pep440Scheme()
+    constraint = scheme.parse_constraint(">=1.4,<2")
+
+    assert constraint.matches("1.4") and constraint.matches("1.9.post1")
+    assert not constraint.matches("2.0") and not constraint.matches("1.5rc1")
+    assert constraint.matches("1.5rc1", include_prereleases=True)
+    assert scheme.parse_constraint("~=1.4.2").matches("1.4.9")
+    assert not scheme.parse_constraint("~=1.4.2").matches("1.5.0")
+    with pytest.raises(ValueError):
+        scheme.parse_constraint("^1.0")
+
+
+@pytest.mark.parametrize("spec", ["=1.1.0", "v1.1.0", " 1.1.0"])
+def test_prefixed_pins_resolve_to_the_release(spec: str) -> None:
+    index = ReleaseIndex(SemverScheme(), _releases(), TAGS)
+
+    assert not index.scheme.is_exact(spec)
+    assert index.resolve(spec).version == "1.1.0"
+
+
+def test_exact_pins_skip_the_index_and_constraints_use_it() -> None:
+    index = ReleaseIndex(SemverScheme(), _releases(), TAGS)
+
+    assert index.scheme.is_exact("1.1.0")
+    assert index.resolve("1.1.0").version == "1.1.0"
+    assert index.resolve("^1.0.0").version == "1.1.0"
+    assert index.resolve("~2.1.0-beta.0").version == "2.1.0-beta.1"
+    assert index.resolve("3.0.0") is None
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+
+from nix_devenv_wrapper.models import WheelFile
+from nix_devenv_wrapper.wheels import parse_wheel_tags, python_version_for, select_wheels
+
+SYSTEMS = ["x86_64-linux", "aarch64-linux", "x86_64-darwin", "aarch64-darwin"]
+
+
+def _wheels(*filenames: str) -> list[WheelFile]:
+    return [WheelFile(filename=name, url=f"https://files.example.com/{name}", sha256="0" * 52) for name in filenames]
+
+
+def _selected(wheels: list[WheelFile], python: tuple[int, int] | None = (3, 12)) -> dict[str, str]:
+    return {system: wheel.filename for system, wheel in select_wheels(wheels, python, SYSTEMS).items()}
+
+
+def test_parse_wheel_tags_expands_compressed_sets() -> None:
+    assert parse_wheel_tags("tool-1.0-py2.py3-none-any.whl") == ({"py2", "py3"}, {"none"}, {"any"})
+    assert python_version_for("python312") == (3, 12)
+    assert python_version_for("pypy3") is None
+    with pytest.raises(ValueError):
+        parse_wheel_tags("tool-1.0.tar.gz")
+
+
+def test_platform_wheels_beat_pure_and_match_architecture() -> None:
+    wheels = _wheels(
+        "tool-1.0-py3-none-any.whl",
+        "tool-1.0-cp312-cp312-manylinux_2_17_x86_64.manylinux2014_x86_64.whl",
+        "tool-1.0-cp312-cp312-manylinux_2_28_x86_64.whl",
+        "tool-1.0-cp312-cp312-manylinux_2_17_aarch64.whl",
+        "tool-1.0-cp312-cp312-macosx_10_12_universal2.whl",
+        "tool-1.0-cp312-cp312-macosx_11_0_arm64.whl",
+    )
+
+    assert _selected(wheels) == {
+        "x86_64-linux": "tool-1.0-cp312-cp312-manylinux_2_28_x86_64.whl",
+        "aarch64-linux": "tool-1.0-cp312-cp312-manylinux_2_17_aarch64.whl",
+        "x86_64-darwin": "tool-1.0-cp312-cp312-macosx_10_12_universal2.whl",
+        "aarch64-darwin": "tool-1.0-cp312-cp312-macosx_11_0_arm64.whl",
+    }
+
+
+def test_interpreter_compatibility() -> None:
+    abi3 = _wheels("tool-1.0-cp38-abi3-manylinux2014_x86_64.whl", "tool-1.0-py3-none-any.whl")
+    other_python = _wheels("tool-1.0-cp311-cp311-manylinux2014_x86_64.whl", "tool-1.0-py3-none-any.whl")
+
+    assert _selected(abi3)["x86_64-linux"] == "tool-1.0-cp38-abi3-manylinux2014_x86_64.whl"
+    assert _selected(other_python)["x86_64-linux"] == "tool-1.0-py3-none-any.whl"
+    # Without a known interpreter version only pure wheels are safe.
+    assert set(_selected(abi3, python=None).values()) == {"tool-1.0-py3-none-any.whl"}
+
+
+def test_missing_systems_are_named() -> None:
+    with pytest.raises(ValueError, match="aarch64-linux, x86_64-darwin, aarch64-darwin"):
+        _selected(_wheels("tool-1.0-cp312-cp312-manylinux2014_x86_64.whl"))
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nix_devenv_wrapper.cli.main import run
+from nix_devenv_wrapper.config import config_from_data
+from nix_devenv_wrapper.generators.workflow import generate_update_workflow
+from nix_devenv_wrapper.history import ReleaseHistory
+from nix_devenv_wrapper.models import EXIT_UPDATE_AVAILABLE, PackageRegistry, VersionInfo
+
+yaml = pytest.importorskip("yaml")
+
+CONFIG: dict[str, Any] = {
+    "flake_name": "tool",
+    "source": {"registry": "npm", "name": "tool"},
+    "runtime": {"type": "nodejs", "nix_package": "nodejs_22"},
+    "wrapper": {"binary_name": "tool", "entry_point": "cli.js"},
+    "meta": {"description": "tool", "homepage": "https://example.com", "license": "mit"},
+}
+WRAPPER_TOML = """
+flake_name = "tool"
+
+[source]
+registry = "npm"
+name = "tool"
+
+[runtime]
+type = "nodejs"
+nix_package = "nodejs_22"
+
+[wrapper]
+binary_name = "tool"
+entry_point = "cli.js"
+
+[meta]
+description = "tool"
+homepage = "https://example.com"
+license = "mit"
+"""
+
+
+def test_check_job_gates_the_rest_on_the_exit_status() -> None:
+    workflow = yaml.safe_load(generate_update_workflow(config_from_data(CONFIG)))
+    jobs = workflow["jobs"]
+
+    check = jobs["check"]["steps"][-1]["run"]
+    assert "ndw check --exit-code" in check
+    assert f'{EXIT_UPDATE_AVAILABLE}) echo "update=true"' in check
+    assert jobs["update"]["if"] == "needs.check.outputs.update == 'true'"
+    assert "uses: cachix/install-nix-action" not in str(jobs["check"])
+    assert jobs["pull-request"]["needs"] == ["update", "build"]
+
+
+def test_update_artifact_carries_every_written_file() -> None:
+    cargo = {
+        **CONFIG,
+        "source": {"registry": "cargo", "name": "tool"},
+        "runtime": {"type": "rust", "nix_package": "rustc"},
+    }
+    channels = {**CONFIG, "source": {**CONFIG["source"], "channels": {"next": "next"}}}
+
+    def artifact_paths(data: dict[str, Any]) -> list[str]:
+        steps = yaml.safe_load(generate_update_workflow(config_from_data(data)))["jobs"]["update"]["steps"]
+        return steps[-1]["with"]["path"].split()
+
+    assert "Cargo.lock" in artifact_paths(cargo)
+    assert "package-*.nix" in artifact_paths(channels)
+    assert artifact_paths(CONFIG)[0] == "package.nix"
+
+
+def test_check_exit_code_matches_the_workflow(tmp_path: Path) -> None:
+    (tmp_path / "wrapper.toml").write_text(WRAPPER_TOML)
+    (tmp_path / "package.nix").write_text('{ version = "1.0.0"; }\n')
+    argv = ["-c", str(tmp_path / "wrapper.toml"), "--package-nix", str(tmp_path / "package.nix"), "check"]
+    releases = [VersionInfo(version=v, tarball_url=f"https://example.com/{v}.tgz") for v in ("1.0.0", "1.1.0")]
+
+    with ReleaseHistory(tmp_path / "history.sqlite3") as history:
+        history.record(PackageRegistry.NPM, "tool", releases, {"latest": "1.1.0"})
+
+        assert run([*argv, "--exit-code", "--offline"], history=history) == EXIT_UPDATE_AVAILABLE
+        assert run([*argv, "--offline"], history=history) == 0